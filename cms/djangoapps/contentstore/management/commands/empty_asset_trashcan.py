@@ -22,7 +22,7 @@ class Command(BaseCommand):
 
             course_ids = [course_key]
         else:
-            course_ids = [course.id for course in modulestore().get_courses()]
+            course_ids = modulestore().get_courses_keys()
 
         if query_yes_no("Emptying trashcan. Confirm?", default="no"):
             empty_asset_trashcan(course_ids)
@@ -1,6 +1,13 @@
-from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content
+from StringIO import StringIO
+
+from cache_toolbox.core import (
+    ChunkedCachedContent, get_cached_content, set_cached_content, set_cached_content_in_chunks, del_cached_content
+)
+from django.core.cache import cache
+from mock import patch
 from opaque_keys.edx.locations import Location
 from django.test import TestCase
+from xmodule.contentstore.content import StaticContent, StaticContentStream
 
 
 class Content(object):
@@ -38,3 +45,66 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+
+class ChunkedCachingTestCase(TestCase):
+    """
+    Tests for caching content in chunks.
+    """
+    location = Location(u'c4x', u'mitX', u'800', u'run', u'asset', u'large.pdf')
+    data = ''.join(chr(index % 256) for index in xrange(25))
+
+    def make_content(self):
+        """
+        Returns a stream of the content's data, as found in the contentstore.
+        """
+        return StaticContentStream(
+            self.location, u'large.pdf', 'application/pdf', StringIO(self.data),
+            length=len(self.data), content_digest='digest'
+        )
+
+    def test_put_and_get(self):
+        set_cached_content_in_chunks(self.make_content(), 10)
+        cached = get_cached_content(self.location)
+        self.assertIsInstance(cached, ChunkedCachedContent)
+        self.assertEqual(cached.num_chunks, 3)
+        self.assertEqual(cached.length, len(self.data))
+        self.assertEqual(cached.content_type, 'application/pdf')
+        self.assertEqual(''.join(cached.stream_data()), self.data)
+
+    def test_stream_range(self):
+        cached = set_cached_content_in_chunks(self.make_content(), 10)
+        for first, last in ((0, 0), (0, 9), (5, 21), (10, 19), (24, 24), (0, 24)):
+            self.assertEqual(''.join(cached.stream_data_in_range(first, last)), self.data[first:last + 1])
+
+    def test_delete(self):
+        set_cached_content_in_chunks(self.make_content(), 10)
+        del_cached_content(self.location)
+        self.assertIsNone(get_cached_content(self.location))
+
+    def test_versions_not_mixed(self):
+        old = set_cached_content_in_chunks(self.make_content(), 10)
+        new = set_cached_content_in_chunks(self.make_content(), 10)
+        self.assertNotEqual(old.chunk_key(0), new.chunk_key(0))
+
+    @patch('cache_toolbox.core.contentstore')
+    def test_missing_chunk(self, mock_contentstore):
+        cached = set_cached_content_in_chunks(self.make_content(), 10)
+        cache.delete(cached.chunk_key(1))
+        mock_contentstore.return_value.find.return_value = self.make_content()
+
+        self.assertEqual(''.join(cached.stream_data_in_range(5, 21)), self.data[5:22])
+        mock_contentstore.return_value.find.assert_called_once_with(self.location, as_stream=True)
+        # The content is cached again on its next request
+        self.assertIsNone(get_cached_content(self.location))
+
+    @patch('cache_toolbox.core.contentstore')
+    def test_missing_chunk_of_changed_content(self, mock_contentstore):
+        cached = set_cached_content_in_chunks(self.make_content(), 10)
+        cache.delete(cached.chunk_key(1))
+        changed = self.make_content()
+        changed.content_digest = 'other digest'
+        mock_contentstore.return_value.find.return_value = changed
+
+        with self.assertRaises(IOError):
+            ''.join(cached.stream_data())
@@ -273,6 +273,20 @@ DATABASES = AUTH_TOKENS['DATABASES']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
+
+COURSE_STRUCTURE_LOCAL_CACHE_ENABLED = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_ENABLED', COURSE_STRUCTURE_LOCAL_CACHE_ENABLED
+)
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES', COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES
+)
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES', COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES
+)
+COURSE_STRUCTURE_CACHE_CODEC = ENV_TOKENS.get('COURSE_STRUCTURE_CACHE_CODEC', COURSE_STRUCTURE_CACHE_CODEC)
+COURSE_STRUCTURE_CACHE_COMPRESSOR = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_CACHE_COMPRESSOR', COURSE_STRUCTURE_CACHE_COMPRESSOR
+)
 # Datadog for events!
 DATADOG = AUTH_TOKENS.get("DATADOG", {})
 DATADOG.update(ENV_TOKENS.get("DATADOG", {}))
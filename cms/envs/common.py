@@ -400,6 +400,19 @@ MODULESTORE = {
     }
 }
 
+# Process-local cache of deserialized split modulestore course structures, in
+# front of the 'course_structure_cache' cache. Sizes are of the serialized structures.
+COURSE_STRUCTURE_LOCAL_CACHE_ENABLED = False
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES = 64 * 1024 * 1024
+
+# How split modulestore course structures are serialized and compressed in the
+# 'course_structure_cache' cache: see xmodule.modulestore.split_mongo.structure_codecs.
+# Only the default pickle and zlib can be read by servers which predate the codecs,
+# so don't change these while any such server shares the cache.
+COURSE_STRUCTURE_CACHE_CODEC = 'pickle'
+COURSE_STRUCTURE_CACHE_COMPRESSOR = 'zlib'
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
@@ -8,12 +8,19 @@ Core methods
 
 """
 
+import logging
+import uuid
+
 from django.core.cache import cache
 from django.db import DEFAULT_DB_ALIAS
 from opaque_keys import InvalidKeyError
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
 
 from . import app_settings
 
+log = logging.getLogger(__name__)
+
 
 def get_instance(model, instance_or_pk, timeout=None, using=None):
     """
@@ -118,6 +125,91 @@ def get_cached_content(location):
     return cache.get(unicode(location).encode("utf-8"))
 
 
+class ChunkedCachedContent(StaticContent):
+    """
+    Content cached in fixed size chunks by `set_cached_content_in_chunks`.
+
+    This is what is cached under the content's location: its attributes
+    without its data, which is read from the cache one chunk at a time as it
+    is streamed, so that content too large for a single cache entry can be
+    cached without ever being held in memory as a whole.
+    """
+    def __init__(self, content, chunk_size):
+        super(ChunkedCachedContent, self).__init__(
+            content.location, content.name, content.content_type, None,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=content.locked,
+            content_digest=content.content_digest
+        )
+        self.chunk_size = chunk_size
+        self.num_chunks = (content.length + chunk_size - 1) // chunk_size
+        # Chunks are keyed by a token of their own, so that the chunks of
+        # different versions of the content are never mixed.
+        self.chunk_key_prefix = '{}:chunks:{}'.format(unicode(content.location).encode("utf-8"), uuid.uuid4().hex)
+
+    def chunk_key(self, index):
+        """
+        Returns the cache key of the chunk at `index`.
+        """
+        return '{}:{}'.format(self.chunk_key_prefix, index)
+
+    def stream_data(self, chunk_size=None):
+        """
+        Stream the data, in the chunks it was cached in.
+        """
+        return self.stream_data_in_range(0, self.length - 1, chunk_size)
+
+    def stream_data_in_range(self, first_byte, last_byte, chunk_size=None):  # pylint: disable=unused-argument
+        """
+        Stream the data between first_byte and last_byte (included), in the
+        chunks it was cached in.
+        """
+        for index in xrange(first_byte // self.chunk_size, last_byte // self.chunk_size + 1):
+            chunk_start = index * self.chunk_size
+            chunk = cache.get(self.chunk_key(index))
+            if chunk is None:
+                # The chunk has been evicted: read the rest from the contentstore.
+                for chunk in self._stream_from_contentstore(max(first_byte, chunk_start), last_byte):
+                    yield chunk
+                return
+            yield chunk[max(first_byte - chunk_start, 0):last_byte - chunk_start + 1]
+
+    def _stream_from_contentstore(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included) from the
+        contentstore, and uncache the content so that it is cached again.
+        """
+        log.warning(u"Chunks of cached content %s are missing, reading them from the contentstore", self.location)
+        del_cached_content(self.location)
+        content = contentstore().find(self.location, as_stream=True)
+        if content.length != self.length or content.content_digest != self.content_digest:
+            # What was already sent is part of another version of the content.
+            content.close()
+            raise IOError(u"Content {} changed while it was being streamed".format(self.location))
+        try:
+            for chunk in content.stream_data_in_range(first_byte, last_byte, self.chunk_size):
+                yield chunk
+        finally:
+            content.close()
+
+
+def set_cached_content_in_chunks(content, chunk_size):
+    """
+    Cache the streamed `content` in chunks of `chunk_size` bytes, as a
+    `ChunkedCachedContent`, reading it one chunk at a time. Returns the
+    `ChunkedCachedContent`.
+
+    The chunks are cached before the `ChunkedCachedContent` is, so they are
+    there when it is found, unless they are evicted from the cache. Chunks of
+    content that is uncached or cached again are left to expire.
+    """
+    cached_content = ChunkedCachedContent(content, chunk_size)
+    for index, chunk in enumerate(content.stream_data_in_range(0, content.length - 1, chunk_size)):
+        cache.set(cached_content.chunk_key(index), chunk)
+    set_cached_content(cached_content)
+    return cached_content
+
+
 def del_cached_content(location):
     """
     delete content for the given location, as well as for content with run=None.
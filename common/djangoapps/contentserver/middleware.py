@@ -2,19 +2,24 @@
 Middleware to serve assets.
 """
 
+import calendar
 import logging
+import uuid
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, STREAM_DATA_CHUNK_SIZE, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locator import AssetLocator
-from cache_toolbox.core import get_cached_content, set_cached_content
+from cache_toolbox.core import get_cached_content, set_cached_content, set_cached_content_in_chunks
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -23,6 +28,12 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# The format of the Last-Modified header before it followed the HTTP spec.
+LEGACY_LAST_MODIFIED_FORMAT = "%a, %d-%b-%Y %H:%M:%S GMT"
+
+# Range headers with more ranges than this are ignored.
+MAX_RANGES = 20
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -52,13 +63,16 @@ class StaticContentServer(object):
                     response.status_code = 404
                     return response
 
-                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
+                # since we fetched it from DB, let's cache it going forward. Content of 1MB or more
+                # doesn't fit in a single memcached entry, so it is cached in chunks, up to a maximum size.
                 if content.length is not None:
                     if content.length < 1048576:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    elif content.length <= getattr(settings, 'STATIC_CONTENT_CACHE_MAX_SIZE', 0):
+                        # the stream is read one chunk at a time, and rewound when the response is streamed
+                        set_cached_content_in_chunks(content, settings.STATIC_CONTENT_CACHE_CHUNK_SIZE)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -77,29 +91,29 @@ class StaticContentServer(object):
                     ):
                         return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # Strong validators: the content's hash and upload date change
+            # whenever it does.
+            etag = get_content_etag(content)
+            last_modified = calendar.timegm(content.last_modified_at.utctimetuple())
+            cache_control = get_cache_control(loc, content)
+
+            # see if the client has cached this content, if so then just return
+            # a 304 (Not Modified)
+            if is_not_modified(request, etag, content.last_modified_at):
+                response = HttpResponseNotModified()
+                set_cache_headers(response, etag, last_modified, cache_control)
+                return response
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            chunk_size = getattr(settings, 'STATIC_CONTENT_STREAM_CHUNK_SIZE', STREAM_DATA_CHUNK_SIZE)
 
-            # *** File streaming within a byte range ***
+            # *** File streaming within byte ranges ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
-            # Request -> Range attribute structure: "Range: bytes=first-[last]"
+            # Request -> Range attribute structure: "Range: bytes=first-[last][, first-[last]...]"
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -112,43 +126,200 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
+                    elif len(ranges) > MAX_RANGES:
+                        # Servers may ignore Range headers, so we send back the full content
+                        # rather than very many small parts.
                         log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            u"More than %s ranges in Range header: %s for content: %s",
+                            MAX_RANGES, header_value, unicode(loc)
                         )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        # Unsatisfiable ranges are ignored, as long as one can be satisfied.
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = HttpResponse(content.stream_data_in_range(first, last, chunk_size))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
+                            response['Content-Type'] = content.content_type
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # Content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            response = multipart_byteranges_response(content, ranges, chunk_size)
+                        response.status_code = 206  # Partial Content
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = HttpResponse(content.stream_data(chunk_size))
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
-            response['Last-Modified'] = last_modified_at_str
+            set_cache_headers(response, etag, last_modified, cache_control)
 
             return response
 
 
+def get_content_etag(content):
+    """
+    Returns the strong ETag of `content`, based on the hash of its data, or
+    None if its hash isn't known.
+    """
+    # getattr b/c cached content may have been pickled before it had a digest
+    content_digest = getattr(content, 'content_digest', None)
+    if content_digest is None:
+        return None
+    return quote_etag(content_digest)
+
+
+def is_not_modified(request, etag, last_modified_at):
+    """
+    Returns whether the client's cached copy of content, as identified by the
+    conditional headers of `request`, is still current.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        if etag is None:
+            return False
+        return if_none_match.strip() == '*' or etag in [quote_etag(tag) for tag in parse_etags(if_none_match)]
+
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since is None:
+        return False
+    # Clients may send back the Last-Modified format we used to send
+    if if_modified_since == last_modified_at.strftime(LEGACY_LAST_MODIFIED_FORMAT):
+        return True
+    if_modified_since = parse_http_date_safe(if_modified_since)
+    return (
+        if_modified_since is not None and
+        calendar.timegm(last_modified_at.utctimetuple()) <= if_modified_since
+    )
+
+
+def get_cache_control(location, content):
+    """
+    Returns the Cache-Control header value for `content` at `location`, or
+    None if clients should use their own heuristics.
+
+    The max-age is looked up in settings.STATIC_CONTENT_COURSE_MAX_AGE for the
+    asset's course, then in settings.STATIC_CONTENT_MAX_AGE. Both map the
+    content type, its major type (e.g. 'image') or '*' to a number of seconds
+    (see lms/envs/common.py). Locked content is only cached privately.
+    """
+    max_age_policies = [
+        get_course_max_age_policy(location),
+        getattr(settings, 'STATIC_CONTENT_MAX_AGE', {}),
+    ]
+    content_type = (content.content_type or '').split(';')[0].strip()
+    for policy in max_age_policies:
+        for key in (content_type, content_type.split('/')[0], '*'):
+            if key in policy:
+                max_age = policy[key]
+                if max_age is None:
+                    return None
+                visibility = 'private' if getattr(content, 'locked', False) else 'public'
+                return '{}, max-age={}'.format(visibility, max_age)
+    return None
+
+
+def get_course_max_age_policy(location):
+    """
+    Returns the max-age policy of the course of the asset at `location`.
+    """
+    policies_by_course_key, policies_by_org_course = _parse_course_max_age_policies(
+        getattr(settings, 'STATIC_CONTENT_COURSE_MAX_AGE', {})
+    )
+    if getattr(location, 'deprecated', False):
+        # Deprecated asset locations don't include the course run
+        return policies_by_org_course.get((location.org, location.course), {})
+    return policies_by_course_key.get(location.course_key, {})
+
+
+# The last STATIC_CONTENT_COURSE_MAX_AGE setting parsed, and what it was parsed into
+_PARSED_COURSE_MAX_AGE_POLICIES = (None, None)
+
+
+def _parse_course_max_age_policies(course_policies):
+    """
+    Returns the policies of `course_policies` (the STATIC_CONTENT_COURSE_MAX_AGE
+    setting) by CourseKey and by (org, course), skipping invalid course ids.
+    The setting is only parsed again when it's replaced (e.g. by tests).
+    """
+    global _PARSED_COURSE_MAX_AGE_POLICIES  # pylint: disable=global-statement
+    parsed_setting, parsed_policies = _PARSED_COURSE_MAX_AGE_POLICIES
+    if parsed_setting is course_policies:
+        return parsed_policies
+
+    policies_by_course_key = {}
+    policies_by_org_course = {}
+    for course_id, policy in course_policies.iteritems():
+        try:
+            course_key = CourseKey.from_string(course_id)
+        except InvalidKeyError:
+            log.error(u"Ignoring the STATIC_CONTENT_COURSE_MAX_AGE policy of invalid course id %r", course_id)
+            continue
+        policies_by_course_key[course_key] = policy
+        policies_by_org_course.setdefault((course_key.org, course_key.course), policy)
+
+    parsed_policies = (policies_by_course_key, policies_by_org_course)
+    _PARSED_COURSE_MAX_AGE_POLICIES = (course_policies, parsed_policies)
+    return parsed_policies
+
+
+def set_cache_headers(response, etag, last_modified, cache_control):
+    """
+    Sets the validator and Cache-Control headers of `response`. `last_modified`
+    is in seconds since the epoch.
+    """
+    if etag is not None:
+        response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if cache_control is not None:
+        response['Cache-Control'] = cache_control
+
+
+def multipart_byteranges_response(content, ranges, chunk_size):
+    """
+    Returns a multipart/byteranges response with the parts of `content` in
+    `ranges`, a list of satisfiable (first, last) byte ranges.
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        '--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {first}-{last}/{length}\r\n\r\n'.format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        )
+        for first, last in ranges
+    ]
+    closing = '--{boundary}--\r\n'.format(boundary=boundary)
+
+    def stream_parts():
+        """Yields the parts, with their headers."""
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last, chunk_size):
+                yield chunk
+            yield '\r\n'
+        yield closing
+
+    response = HttpResponse(stream_parts(), content_type='multipart/byteranges; boundary={}'.format(boundary))
+    response['Content-Length'] = str(
+        sum(len(part_header) + last - first + 1 + 2 for part_header, (first, last) in zip(part_headers, ranges)) +
+        len(closing)
+    )
+    return response
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
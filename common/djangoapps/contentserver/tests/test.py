@@ -10,13 +10,17 @@ from uuid import uuid4
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
+from mock import patch
+from opaque_keys.edx.keys import CourseKey
 
+from xmodule.contentstore.content import StaticContent
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
+from cache_toolbox.core import get_cached_content
 from contentserver.middleware import parse_range_header
 from student.models import CourseEnrollment
 
@@ -146,18 +150,166 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message with
+        each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -10'.format(
             first=first_byte, last=last_byte)
         )
 
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        data = self.contentstore.find(self.unlocked_asset).data
+        for first, last in ((first_byte, last_byte), (self.length_unlocked - 10, self.length_unlocked - 1)):
+            self.assertIn(
+                'Content-Range: bytes {first}-{last}/{length}\r\n\r\n{data}\r\n'.format(
+                    first=first, last=last, length=self.length_unlocked, data=data[first:last + 1]
+                ),
+                resp.content
+            )
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that a request for very many ranges outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=' + ', '.join(['0-0'] * 21))
+
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
 
+    def test_range_request_cached_content(self):
+        """
+        Test that range requests for content that has been cached are served
+        from the cache.
+        """
+        self.client.get(self.url_unlocked)
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-4')
+        self.assertFalse(mock_find.called)
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, self.contentstore.find(self.unlocked_asset).data[:5])
+
+    @override_settings(STATIC_CONTENT_CACHE_MAX_SIZE=4 * 1024 * 1024, STATIC_CONTENT_CACHE_CHUNK_SIZE=256 * 1024)
+    def test_large_content_cached_in_chunks(self):
+        """
+        Test that content of 1MB or more is cached in chunks, and served from
+        the cache.
+        """
+        data = ''.join(chr(index % 251) for index in xrange(1536 * 1024))
+        asset_key = self.course_key.make_asset_key('asset', 'large.bin')
+        self.contentstore.save(StaticContent(asset_key, 'large.bin', 'application/octet-stream', data))
+        url = unicode(asset_key)
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, data)
+
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(url)
+            self.assertEqual(resp.content, data)
+            resp = self.client.get(url, HTTP_RANGE='bytes=262000-800000')
+            self.assertEqual(resp.status_code, 206)
+            self.assertEqual(resp.content, data[262000:800001])
+        self.assertFalse(mock_find.called)
+
+    @override_settings(STATIC_CONTENT_CACHE_MAX_SIZE=1024 * 1024, STATIC_CONTENT_CACHE_CHUNK_SIZE=256 * 1024)
+    def test_content_too_large_to_cache(self):
+        """
+        Test that content larger than the maximum size isn't cached.
+        """
+        data = 'x' * (1536 * 1024)
+        asset_key = self.course_key.make_asset_key('asset', 'larger.bin')
+        self.contentstore.save(StaticContent(asset_key, 'larger.bin', 'application/octet-stream', data))
+        url = unicode(asset_key)
+
+        self.client.get(url)
+        resp = self.client.get(url)
+        self.assertEqual(resp.content, data)
+        self.assertIsNone(get_cached_content(asset_key))
+
+    def test_etag(self):
+        """
+        Test that the ETag is the content's hash, and that requests for content
+        that matches it are answered with 304 Not Modified.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+        self.assertEqual(etag, '"{}"'.format(self.contentstore.fs.get(self.contentstore.asset_db_key(
+            self.unlocked_asset
+        )[0]).md5))
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", {}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200)
+
+        # If-None-Match takes precedence
+        resp = self.client.get(
+            self.url_unlocked, HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    def test_if_modified_since(self):
+        """
+        Test that requests for content that hasn't been modified since the given
+        date are answered with 304 Not Modified.
+        """
+        last_modified = self.client.get(self.url_unlocked)['Last-Modified']
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2000 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 200)
+
+    @ddt.data(
+        ({}, {}, None),
+        ({'*': 60}, {}, 'public, max-age=60'),
+        ({'*': 60, 'text': 120}, {}, 'public, max-age=120'),
+        ({'*': 60, 'text': 120, 'text/plain': 180}, {}, 'public, max-age=180'),
+        ({'*': 60}, {'*': 240}, 'public, max-age=240'),
+        ({'*': 60}, {'text': None}, None),
+    )
+    @ddt.unpack
+    def test_cache_control(self, max_age, course_max_age, expected):
+        """
+        Test that the Cache-Control max-age is set by content type and course.
+        """
+        with override_settings(
+            STATIC_CONTENT_MAX_AGE=max_age,
+            STATIC_CONTENT_COURSE_MAX_AGE={unicode(self.course_key): course_max_age},
+        ):
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.get('Cache-Control'), expected)
+
+    def test_course_max_age_parsed_once(self):
+        """
+        Test that the course max-age policies are parsed once, skipping invalid course ids.
+        """
+        course_max_age = {'not a course id': {'*': 120}, unicode(self.course_key): {'*': 240}}
+        with override_settings(STATIC_CONTENT_MAX_AGE={'*': 60}, STATIC_CONTENT_COURSE_MAX_AGE=course_max_age):
+            with patch('contentserver.middleware.CourseKey', wraps=CourseKey) as mock_course_key:
+                for __ in xrange(2):
+                    resp = self.client.get(self.url_unlocked)
+                    self.assertEqual(resp.get('Cache-Control'), 'public, max-age=240')
+        self.assertEqual(mock_course_key.from_string.call_count, 2)
+
+    @override_settings(STATIC_CONTENT_MAX_AGE={'*': 60})
+    def test_locked_asset_cache_control(self):
+        """
+        Test that locked assets are only cached privately.
+        """
+        self.client.login(username=self.staff_usr, password=self.staff_pwd)
+        resp = self.client.get(self.url_locked)
+        self.assertEqual(resp['Cache-Control'], 'private, max-age=60')
+
     @ddt.data(
         'bytes 0-',
         'bits=0-',
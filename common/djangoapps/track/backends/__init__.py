@@ -19,6 +19,11 @@ class BaseBackend(object):
     """
     __metaclass__ = abc.ABCMeta
 
+    # Whether the backend serializes events to JSON. Such backends are
+    # sent events with `send_serialized`, and the JSON they are given is
+    # shared with the other backends that do.
+    serializes_events = False
+
     def __init__(self, **kwargs):
         pass
 
@@ -26,3 +31,7 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_serialized(self, event, serialized_event):
+        """Send event to tracker, given its JSON serialization."""
+        self.send(event)
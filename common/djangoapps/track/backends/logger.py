@@ -20,6 +20,8 @@ class LoggerBackend(BaseBackend):
 
     """
 
+    serializes_events = True
+
     def __init__(self, name, **kwargs):
         """Event tracker backend that uses a python logger.
 
@@ -33,11 +35,12 @@ class LoggerBackend(BaseBackend):
         self.event_logger = logging.getLogger(name)
 
     def send(self, event):
-        event_str = json.dumps(event, cls=DateTimeJSONEncoder)
+        self.send_serialized(event, json.dumps(event, cls=DateTimeJSONEncoder))
 
+    def send_serialized(self, event, serialized_event):
         # TODO: remove trucation of the serialized event, either at a
         # higher level during the emittion of the event, or by
         # providing warnings when the events exceed certain size.
-        event_str = event_str[:settings.TRACK_MAX_EVENT]
+        event_str = serialized_event[:settings.TRACK_MAX_EVENT]
 
         self.event_logger.info(event_str)
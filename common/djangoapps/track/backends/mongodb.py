@@ -2,11 +2,17 @@
 
 from __future__ import absolute_import
 
+import atexit
+from collections import deque
 import logging
+import os
+import threading
+import time
 
+from dogapi import dog_stats_api
 import pymongo
 from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from pymongo.errors import AutoReconnect, PyMongoError
 from bson.errors import BSONError
 
 from track.backends import BaseBackend
@@ -14,6 +20,172 @@ from track.backends import BaseBackend
 
 log = logging.getLogger(__name__)
 
+# What to do with an event when the buffer is full.
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+# Seconds to wait before retrying an insert after a connection error.
+RETRY_DELAY = 0.5
+
+
+class EventBuffer(object):
+    """
+    A bounded in-process queue of events, written in batches by a background
+    thread.
+
+    A batch is written by calling `write` with a list of events as soon as
+    `batch_size` events are queued, or when the oldest of them has waited
+    `flush_interval` seconds. `write` returns the number of events written.
+
+    When `max_size` events are queued, new events are handled according to
+    `overflow`: they are dropped (`DROP_NEWEST`), they replace the oldest
+    queued event (`DROP_OLDEST`), or the sender waits up to `block_timeout`
+    seconds for room before dropping them (`BLOCK`).
+
+    Queued events are written when the process exits.
+    """
+    def __init__(self, write, max_size=10000, batch_size=100, flush_interval=1.0,
+                 overflow=DROP_NEWEST, block_timeout=0.1, shutdown_timeout=5.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Invalid overflow policy {!r}'.format(overflow))
+
+        self.write = write
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.shutdown_timeout = shutdown_timeout
+
+        # Number of events dropped since the buffer was created
+        self.dropped = 0
+
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._pid = None
+        self._thread = None
+
+        atexit.register(self.close)
+
+    @property
+    def depth(self):
+        """Number of events waiting to be written."""
+        return len(self._events)
+
+    def _ensure_started(self):
+        """
+        Start the writing thread, unless it's running in this process.
+        Threads don't survive forking, so processes forked after the buffer was
+        created start their own, with an empty queue.
+        """
+        if self._pid == os.getpid():
+            return
+        self._events.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='track-mongodb-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, event):
+        """
+        Queue `event` to be written. Events sent once the buffer is closed are
+        written right away.
+        """
+        with self._condition:
+            if not self._closed:
+                self._ensure_started()
+                self._put(event)
+                return
+        self._write([event])
+
+    def _put(self, event):
+        """Queue `event`, applying the overflow policy. Call with the lock held."""
+        if len(self._events) >= self.max_size:
+            if self.overflow == DROP_OLDEST:
+                self._events.popleft()
+                self._record_dropped(1, 'queue_full')
+            elif self.overflow == BLOCK:
+                deadline = time.time() + self.block_timeout
+                while len(self._events) >= self.max_size and not self._closed:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if len(self._events) >= self.max_size:
+                    self._record_dropped(1, 'queue_full')
+                    return
+            else:
+                self._record_dropped(1, 'queue_full')
+                return
+
+        self._events.append(event)
+        if len(self._events) >= self.batch_size:
+            self._condition.notify_all()
+
+    def _next_batch(self):
+        """
+        Wait until a batch is due, and take it from the queue. Returns an empty
+        list if there are no events and the buffer is closed.
+        """
+        with self._condition:
+            deadline = time.time() + self.flush_interval
+            while len(self._events) < self.batch_size and not self._closed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = [self._events.popleft() for __ in xrange(min(self.batch_size, len(self._events)))]
+            # Wake up senders waiting for room
+            self._condition.notify_all()
+            return batch
+
+    def _run(self):
+        """Write batches of events until the buffer is closed and empty."""
+        while True:
+            batch = self._next_batch()
+            if batch:
+                dog_stats_api.gauge('track.mongodb.queue_depth', self.depth)
+                self._write(batch)
+            elif self._closed:
+                break
+
+    def _write(self, events):
+        """Write `events`, counting them as dropped if that fails."""
+        try:
+            written = self.write(events)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error writing events from the MongoDB event tracker buffer')
+            written = 0
+        if written < len(events):
+            self._record_dropped(len(events) - written, 'error')
+
+    def _record_dropped(self, count, reason):
+        """Count `count` events dropped for `reason`."""
+        self.dropped += count
+        dog_stats_api.increment('track.mongodb.dropped', value=count, tags=['reason:{}'.format(reason)])
+
+    def close(self):
+        """
+        Stop accepting events, and wait up to `shutdown_timeout` seconds for
+        the queued events to be written.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread if self._pid == os.getpid() else None
+
+        if thread is not None:
+            thread.join(self.shutdown_timeout)
+        if self.depth:
+            log.warning('Dropping %d events from the MongoDB event tracker buffer at shutdown', self.depth)
+            self._record_dropped(self.depth, 'shutdown')
+
 
 class MongoBackend(BaseBackend):
     """Class for a MongoDB event tracker Backend"""
@@ -31,6 +203,14 @@ class MongoBackend(BaseBackend):
           - `database`: name of the database
           - `collection`: name of the collection
           - `extra`: parameters to pymongo.MongoClient not listed above
+          - `max_retries`: number of times to retry an insert after a
+            connection error
+          - `buffered`: whether to queue events and insert them in
+            batches from a background thread, instead of inserting
+            each event in the thread that sends it
+          - `buffer`: options of the `EventBuffer` used when `buffered`
+            is set (`max_size`, `batch_size`, `flush_interval`,
+            `overflow`, `block_timeout`, `shutdown_timeout`)
 
         """
 
@@ -74,6 +254,12 @@ class MongoBackend(BaseBackend):
 
         self._create_indexes()
 
+        self.max_retries = kwargs.get('max_retries', 0)
+
+        self.buffer = None
+        if kwargs.get('buffered', False):
+            self.buffer = EventBuffer(self._insert, **kwargs.get('buffer', {}))
+
     def _create_indexes(self):
         """Ensures the proper fields are indexed"""
         # WARNING: The collection will be locked during the index
@@ -88,12 +274,38 @@ class MongoBackend(BaseBackend):
 
     def send(self, event):
         """Insert the event in to the Mongo collection"""
-        try:
-            self.collection.insert(event, manipulate=False)
-        except (PyMongoError, BSONError):
-            # The event will be lost in case of a connection error or any error
-            # that occurs when trying to insert the event into Mongo.
-            # pymongo will re-connect/re-authenticate automatically
-            # during the next event.
+        if self.buffer is not None:
+            self.buffer.put(event)
+        else:
+            self._insert([event])
+
+    def _insert(self, events):
+        """
+        Insert `events` in to the Mongo collection, retrying up to
+        `max_retries` times after connection errors. Returns the number of
+        events inserted.
+        """
+        attempt = 0
+        while True:
+            try:
+                self.collection.insert(events if len(events) > 1 else events[0], manipulate=False)
+                return len(events)
+            except BSONError:
+                if len(events) > 1:
+                    # Don't lose the whole batch because of one invalid event
+                    return sum(self._insert([event]) for event in events)
+            except AutoReconnect:
+                # pymongo will re-connect/re-authenticate automatically
+                # during the next insert.
+                if attempt < self.max_retries:
+                    attempt += 1
+                    time.sleep(RETRY_DELAY)
+                    continue
+            except PyMongoError:
+                pass
+
+            # The events will be lost in case of a connection error or any
+            # error that occurs when trying to insert them into Mongo.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+            return 0
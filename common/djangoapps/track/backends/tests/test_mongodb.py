@@ -1,6 +1,10 @@
 from __future__ import absolute_import
 
+import time
+
+from bson.errors import InvalidDocument
 from mock import patch
+from pymongo.errors import AutoReconnect, OperationFailure
 
 from django.test import TestCase
 
@@ -37,3 +41,112 @@ class TestMongoBackend(TestCase):
 
         self.assertEqual(events[0], first_argument(calls[0]))
         self.assertEqual(events[1], first_argument(calls[1]))
+
+    def test_invalid_event_not_inserted(self):
+        self.backend.collection.insert.side_effect = InvalidDocument
+        self.assertEqual(self.backend._insert([{'test': 1}]), 0)  # pylint: disable=protected-access
+
+    @patch('track.backends.mongodb.RETRY_DELAY', 0)
+    def test_retry_after_connection_error(self):
+        backend = MongoBackend(max_retries=1)
+        backend.collection.insert.side_effect = [AutoReconnect('error'), None]
+        backend.send({'test': 1})
+        self.assertEqual(backend.collection.insert.call_count, 2)
+
+
+class TestBufferedMongoBackend(TestCase):
+    def setUp(self):
+        super(TestBufferedMongoBackend, self).setUp()
+        self.mongo_patcher = patch('track.backends.mongodb.MongoClient')
+        self.mongo_patcher.start()
+        self.addCleanup(self.mongo_patcher.stop)
+
+    def create_backend(self, **buffer_options):
+        """Create a buffered backend, closed at the end of the test."""
+        backend = MongoBackend(buffered=True, buffer=buffer_options)
+        self.addCleanup(backend.buffer.close)
+        return backend
+
+    def inserted_events(self, backend):
+        """The events inserted by `backend`, in order."""
+        events = []
+        for _, args, _ in backend.collection.insert.mock_calls:
+            events.extend(args[0] if isinstance(args[0], list) else [args[0]])
+        return events
+
+    def test_batched_insert(self):
+        backend = self.create_backend(batch_size=2, flush_interval=60)
+        events = [{'test': index} for index in xrange(5)]
+        for event in events:
+            backend.send(event)
+        backend.buffer.close()
+
+        self.assertEqual(self.inserted_events(backend), events)
+        self.assertEqual(backend.collection.insert.call_count, 3)
+        self.assertEqual(backend.buffer.depth, 0)
+
+    def test_flush_interval(self):
+        backend = self.create_backend(batch_size=100, flush_interval=0.05)
+        backend.send({'test': 1})
+        for __ in xrange(100):
+            if backend.collection.insert.called:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.inserted_events(backend), [{'test': 1}])
+
+    def test_drop_newest(self):
+        backend = self.create_backend(max_size=2, batch_size=100, flush_interval=60)
+        for index in xrange(4):
+            backend.send({'test': index})
+        self.assertEqual(backend.buffer.depth, 2)
+        self.assertEqual(backend.buffer.dropped, 2)
+        backend.buffer.close()
+        self.assertEqual(self.inserted_events(backend), [{'test': 0}, {'test': 1}])
+
+    def test_drop_oldest(self):
+        backend = self.create_backend(max_size=2, batch_size=100, flush_interval=60, overflow='drop_oldest')
+        for index in xrange(4):
+            backend.send({'test': index})
+        self.assertEqual(backend.buffer.dropped, 2)
+        backend.buffer.close()
+        self.assertEqual(self.inserted_events(backend), [{'test': 2}, {'test': 3}])
+
+    def test_block(self):
+        backend = self.create_backend(
+            max_size=1, batch_size=100, flush_interval=60, overflow='block', block_timeout=0.01
+        )
+        backend.send({'test': 1})
+        backend.send({'test': 2})
+        self.assertEqual(backend.buffer.dropped, 1)
+
+    def test_invalid_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            MongoBackend(buffered=True, buffer={'overflow': 'explode'})
+
+    def test_insert_errors(self):
+        backend = self.create_backend(batch_size=2, flush_interval=60)
+        backend.collection.insert.side_effect = OperationFailure('error')
+        backend.send({'test': 1})
+        backend.send({'test': 2})
+        backend.buffer.close()
+        self.assertEqual(backend.buffer.dropped, 2)
+
+    def test_invalid_event_in_batch(self):
+        backend = self.create_backend(batch_size=3, flush_interval=60)
+
+        def insert(doc_or_docs, **kwargs):  # pylint: disable=unused-argument
+            """Fail to insert batches, and the invalid event."""
+            if isinstance(doc_or_docs, list) or doc_or_docs.get('invalid'):
+                raise InvalidDocument('invalid')
+
+        backend.collection.insert.side_effect = insert
+        for event in ({'test': 1}, {'invalid': True}, {'test': 2}):
+            backend.send(event)
+        backend.buffer.close()
+        self.assertEqual(backend.buffer.dropped, 1)
+
+    def test_send_after_close(self):
+        backend = self.create_backend()
+        backend.buffer.close()
+        backend.send({'test': 1})
+        self.assertEqual(self.inserted_events(backend), [{'test': 1}])
@@ -0,0 +1,137 @@
+"""
+Replays a recorded tracking log through `track.tracker.send`, and reports how
+many events per second the given tracking backends handle.
+"""
+import json
+from optparse import make_option
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from track import tracker
+
+
+def load_events(log_file, limit=None):
+    """
+    Returns the events of a tracking log, one JSON event per line, optionally
+    preceded by a prefix added by the log handler. Lines that aren't events
+    are skipped.
+    """
+    events = []
+    for line in log_file:
+        start = line.find('{')
+        if start == -1:
+            continue
+        try:
+            event = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(event, dict):
+            events.append(event)
+            if limit and len(events) >= limit:
+                break
+    return events
+
+
+class Command(BaseCommand):
+    """
+    Sends the events of a tracking log to the given tracking backends.
+    """
+    args = '<tracking_log>'
+    help = """
+    Replays the events of a tracking log through the tracking backends
+    given with --backend, and prints the number of events sent per second.
+    The backends configured in TRACKING_BACKENDS are never sent the events,
+    so benchmark backends have to be given explicitly. Backends that buffer
+    events may still be writing them when this finishes.
+
+    Example:
+
+        $ ... benchmark_tracking /edx/var/log/tracking/tracking.log --repeat 5 \\
+            --backend track.backends.logger.LoggerBackend --backend-options '{"name": "benchmark"}'
+
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-n', '--limit',
+                    type='int',
+                    dest='limit',
+                    default=None,
+                    help='replay at most this many events of the log'),
+        make_option('-r', '--repeat',
+                    type='int',
+                    dest='repeat',
+                    default=1,
+                    help='replay the events this many times'),
+        make_option('-b', '--backend',
+                    action='append',
+                    dest='backends',
+                    default=[],
+                    help='dotted path of a tracking backend class to send the events to; '
+                         'required, and may be given more than once'),
+        make_option('--backend-options',
+                    dest='backend_options',
+                    default='{}',
+                    help='JSON object of the keyword arguments of the backends'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Usage: benchmark_tracking {}'.format(self.args))
+
+        try:
+            with open(args[0]) as log_file:
+                events = load_events(log_file, options['limit'])
+        except IOError as exc:
+            raise CommandError('Could not read {}: {}'.format(args[0], exc))
+        if not events:
+            raise CommandError('No events found in {}'.format(args[0]))
+
+        benchmark_backends = self._create_backends(options.get('backends'), options.get('backend_options') or '{}')
+
+        # Only the benchmark backends are sent the events, not the configured ones.
+        configured_backends = dict(tracker.backends)
+        tracker.backends.clear()
+        tracker.backends.update(benchmark_backends)
+        try:
+            start = time.time()
+            for __ in xrange(options['repeat']):
+                for event in events:
+                    tracker.send(event)
+            elapsed = time.time() - start
+        finally:
+            tracker.backends.clear()
+            tracker.backends.update(configured_backends)
+
+        sent = len(events) * options['repeat']
+        self.stdout.write('Sent {} events to {} in {:.3f}s: {:.1f} events/s\n'.format(
+            sent, ', '.join(sorted(benchmark_backends)), elapsed, sent / max(elapsed, 1e-9)
+        ))
+
+    def _create_backends(self, backend_names, backend_options):
+        """
+        Returns the benchmark backends named by `backend_names`, keyed by
+        name, each created with the keyword arguments in the JSON object
+        `backend_options`.
+        """
+        if not backend_names:
+            raise CommandError(
+                'Give the tracking backends to benchmark with --backend; '
+                'the backends configured in TRACKING_BACKENDS are never used'
+            )
+        try:
+            backend_options = json.loads(backend_options)
+        except ValueError as exc:
+            raise CommandError('Invalid --backend-options: {}'.format(exc))
+        if not isinstance(backend_options, dict):
+            raise CommandError('--backend-options must be a JSON object')
+
+        backends = {}
+        for name in backend_names:
+            try:
+                backends[name] = tracker._instantiate_backend_from_name(  # pylint: disable=protected-access
+                    name, backend_options
+                )
+            except ValueError as exc:
+                raise CommandError(unicode(exc))
+        return backends
@@ -0,0 +1,71 @@
+"""Tests for the benchmark_tracking management command."""
+from StringIO import StringIO
+import tempfile
+
+from django.core.management.base import CommandError
+from django.test import TestCase
+from mock import MagicMock, patch
+
+from track import tracker
+from track.management.commands import benchmark_tracking
+
+
+LOG = """\
+{"event_type": "first", "event": {}}
+2015-05-01 10:00:00,000 INFO 1234 [tracking] logger.py:41 - {"event_type": "second", "event": {}}
+not an event
+"""
+
+
+class BenchmarkTrackingTest(TestCase):
+    """Tests for the benchmark_tracking command."""
+
+    def setUp(self):
+        super(BenchmarkTrackingTest, self).setUp()
+        log_file = tempfile.NamedTemporaryFile(suffix='.log')
+        log_file.write(LOG)
+        log_file.flush()
+        self.addCleanup(log_file.close)
+        self.log_path = log_file.name
+
+    def test_load_events(self):
+        events = benchmark_tracking.load_events(StringIO(LOG))
+        self.assertEqual([event['event_type'] for event in events], ['first', 'second'])
+        self.assertEqual(len(benchmark_tracking.load_events(StringIO(LOG), limit=1)), 1)
+
+    def test_replay(self):
+        configured_backend = MagicMock()
+        out = StringIO()
+        with patch.dict(tracker.backends, {'configured': configured_backend}, clear=True):
+            with patch('track.backends.logger.LoggerBackend.send_serialized') as mock_send_serialized:
+                benchmark_tracking.Command().execute(
+                    self.log_path,
+                    repeat=3,
+                    limit=None,
+                    backends=['track.backends.logger.LoggerBackend'],
+                    backend_options='{"name": "benchmark"}',
+                    stdout=out,
+                )
+            self.assertEqual(tracker.backends, {'configured': configured_backend})
+        self.assertEqual(mock_send_serialized.call_count, 6)
+        self.assertFalse(configured_backend.send.called)
+        self.assertIn('Sent 6 events to track.backends.logger.LoggerBackend', out.getvalue())
+
+    @patch('track.management.commands.benchmark_tracking.tracker.send')
+    def test_requires_backends(self, mock_send):
+        with self.assertRaises(CommandError):
+            benchmark_tracking.Command().handle(self.log_path, repeat=1, limit=None)
+        self.assertFalse(mock_send.called)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(CommandError):
+            benchmark_tracking.Command().handle(
+                self.log_path, repeat=1, limit=None, backends=['track.backends.NoSuchBackend']
+            )
+
+    def test_no_events(self):
+        with tempfile.NamedTemporaryFile() as empty_log:
+            with self.assertRaises(CommandError):
+                benchmark_tracking.Command().handle(
+                    empty_log.name, repeat=1, limit=None, backends=['track.backends.logger.LoggerBackend']
+                )
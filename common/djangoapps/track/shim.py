@@ -19,6 +19,11 @@ CONTEXT_FIELDS_TO_INCLUDE = [
     'accept_language'
 ]
 
+# These fields are present elsewhere in the event once it's been processed
+# by LegacyFieldMappingProcessor. The client_id is only used for Segment.io
+# web analytics and does not concern researchers.
+CONTEXT_FIELDS_TO_REMOVE = frozenset(CONTEXT_FIELDS_TO_INCLUDE + ['client_id'])
+
 
 class LegacyFieldMappingProcessor(object):
     """Ensures all required fields are included in emitted events"""
@@ -27,7 +32,7 @@ class LegacyFieldMappingProcessor(object):
         context = event.get('context', {})
         if 'context' in event:
             for field in CONTEXT_FIELDS_TO_INCLUDE:
-                self.move_from_context(field, event)
+                event[field] = context.pop(field, '')
             remove_shim_context(event)
 
         if 'data' in event:
@@ -65,13 +70,8 @@ class LegacyFieldMappingProcessor(object):
 def remove_shim_context(event):
     if 'context' in event:
         context = event['context']
-        # These fields are present elsewhere in the event at this point
-        context_fields_to_remove = set(CONTEXT_FIELDS_TO_INCLUDE)
-        # This field is only used for Segment.io web analytics and does not concern researchers
-        context_fields_to_remove.add('client_id')
-        for field in context_fields_to_remove:
-            if field in context:
-                del context[field]
+        for field in CONTEXT_FIELDS_TO_REMOVE.intersection(context):
+            del context[field]
 
 
 NAME_TO_EVENT_TYPE_MAP = {
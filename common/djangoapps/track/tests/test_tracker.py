@@ -1,3 +1,7 @@
+import json
+
+from mock import patch
+
 from django.conf import settings
 from django.test import TestCase
 from django.test.utils import override_settings
@@ -24,6 +28,15 @@ MULTI_SETTINGS = {
     }
 }
 
+SERIALIZING_SETTINGS = {
+    'first': {
+        'ENGINE': 'track.tests.test_tracker.SerializingDummyBackend',
+    },
+    'second': {
+        'ENGINE': 'track.tests.test_tracker.SerializingDummyBackend',
+    }
+}
+
 
 class TestTrackerInstantiation(TestCase):
     """Test that a helper function can instantiate backends from their name."""
@@ -98,6 +111,19 @@ class TestTrackerDjangoInstantiation(TestCase):
 
         self.assertEqual(len(backends), 1)
 
+    @override_settings(TRACKING_BACKENDS=SERIALIZING_SETTINGS)
+    def test_event_serialized_once(self):
+        """Test that backends share the serialized event."""
+
+        backends = self._reload_backends().values()
+
+        with patch('track.tracker.json.dumps', wraps=json.dumps) as mock_dumps:
+            tracker.send({'test': 1})
+
+        self.assertEqual(mock_dumps.call_count, 1)
+        for backend in backends:
+            self.assertEqual(backend.serialized_events, ['{"test": 1}'])
+
     def _reload_backends(self):
         # pylint: disable=protected-access
 
@@ -116,3 +142,17 @@ class DummyBackend(BaseBackend):
     # pylint: disable=unused-argument
     def send(self, event):
         self.count += 1
+
+
+class SerializingDummyBackend(BaseBackend):
+    serializes_events = True
+
+    def __init__(self, **options):
+        super(SerializingDummyBackend, self).__init__(**options)
+        self.serialized_events = []
+
+    def send(self, event):
+        raise NotImplementedError
+
+    def send_serialized(self, event, serialized_event):
+        self.serialized_events.append(serialized_event)
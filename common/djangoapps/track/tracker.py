@@ -20,12 +20,14 @@ below::
 
 import inspect
 from importlib import import_module
+import json
 
 from dogapi import dog_stats_api
 
 from django.conf import settings
 
 from track.backends import BaseBackend
+from track.utils import DateTimeJSONEncoder
 
 
 __all__ = ['send']
@@ -88,12 +90,21 @@ def send(event):
     """
     Send an event object to all the initialized backends.
 
+    The event is serialized to JSON at most once, for all the backends
+    that serialize events.
+
     """
     dog_stats_api.increment('track.send.count')
 
+    serialized_event = None
     for name, backend in backends.iteritems():
         with dog_stats_api.timer('track.send.backend.{0}'.format(name)):
-            backend.send(event)
+            if backend.serializes_events:
+                if serialized_event is None:
+                    serialized_event = json.dumps(event, cls=DateTimeJSONEncoder)
+                backend.send_serialized(event, serialized_event)
+            else:
+                backend.send(event)
 
 
 _initialize_backends_from_django_settings()
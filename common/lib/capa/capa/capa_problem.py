@@ -13,11 +13,14 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from pytz import UTC
@@ -58,6 +61,59 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# Maximum number of problem templates cached per process (see ProblemTemplateCache)
+PROBLEM_TEMPLATE_CACHE_SIZE = 500
+
+
+class ProblemTemplateCache(object):
+    """
+    A process-local, least-recently-used cache of problem templates: the XML
+    trees of problems after the structural work that's the same for every
+    student (parsing, compatibility translations and assigning IDs), before
+    any student state or script context is applied.
+
+    Templates are keyed by problem id and a hash of the problem text, so they
+    never go stale. They are never handed out, only copies of them, so each
+    problem can modify its own tree.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(problem_id, problem_text):
+        """Return the key of the template of a problem."""
+        if isinstance(problem_text, unicode):
+            problem_text = problem_text.encode('utf-8')
+        return (problem_id, hashlib.sha1(problem_text).hexdigest())
+
+    def get(self, key):
+        """Return a copy of the template cached under `key`, or None."""
+        with self._lock:
+            template = self._templates.pop(key, None)
+            if template is None:
+                return None
+            self._templates[key] = template
+        return deepcopy(template)
+
+    def set(self, key, tree):
+        """Cache a copy of `tree` as the template under `key`."""
+        template = deepcopy(tree)
+        with self._lock:
+            self._templates.pop(key, None)
+            self._templates[key] = template
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+
+    def clear(self):
+        """Empty the cache."""
+        with self._lock:
+            self._templates.clear()
+
+
+PROBLEM_TEMPLATES = ProblemTemplateCache(PROBLEM_TEMPLATE_CACHE_SIZE)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -161,18 +217,28 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
+        # parse problem XML file into an element tree, with the ID's of its responses
+        # and their inputs assigned, or get a copy of it from the template cache
+        template_key = ProblemTemplateCache.key(self.problem_id, problem_text)
+        self.tree = PROBLEM_TEMPLATES.get(template_key)
+        if self.tree is None:
+            self.tree = etree.XML(problem_text)
+
+            self.make_xml_compatible(self.tree)
 
-        self.make_xml_compatible(self.tree)
+            # handle any <include file="foo"> tags. The included files may change
+            # without the problem text changing, so such problems aren't cached.
+            cacheable = self.tree.find('.//include') is None
+            self._process_includes()
 
-        # handle any <include file="foo"> tags
-        self._process_includes()
+            self._assign_ids(self.tree)
+            if cacheable:
+                PROBLEM_TEMPLATES.set(template_key, self.tree)
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
+        # Pre-parse the XML tree: modifies it to perform some in-place
         # transformations.  This also creates the dict (self.responders) of Response
         # instances for each question in the problem. The dict has keys = xml subtree of
         # Response, values = Response instance
@@ -833,39 +899,56 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _get_responses(self, tree):  # private
+        """
+        Return the responses in tree, in document order.
+        """
+        return tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags()))
+
+    def _get_inputfields(self, response):  # private
+        """
+        Return the entries (inputs and solutions) of response, in document order.
+        """
+        input_tags = inputtypes.registry.registered_tags()
+        return response.xpath("|".join(['.//' + x for x in input_tags + solution_tags]))
+
+    def _assign_ids(self, tree):  # private
         """
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
         In-place transformation
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        These only depend on the problem, so they are part of its template.
         """
         response_id = 1
-        self.responders = {}
-        for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
+        for response in self._get_responses(tree):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
             response.set('id', response_id_str)
             response_id += 1
 
-            answer_id = 1
-            input_tags = inputtypes.registry.registered_tags()
-            inputfields = tree.xpath(
-                "|".join(['//' + response.tag + '[@id=$id]//' + x for x in input_tags + solution_tags]),
-                id=response_id_str
-            )
-
             # assign one answer_id for each input type or solution type
-            for entry in inputfields:
+            answer_id = 1
+            for entry in self._get_inputfields(response):
                 entry.attrib['response_id'] = str(response_id)
                 entry.attrib['answer_id'] = str(answer_id)
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
                 answer_id = answer_id + 1
 
+    def _preprocess_problem(self, tree):  # private
+        """
+        Annoted correctness and value
+        In-place transformation
+
+        Also create capa Response instances for each responsetype (whose IDs have been
+        assigned by _assign_ids) and save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        """
+        self.responders = {}
+        for response in self._get_responses(tree):
+            inputfields = self._get_inputfields(response)
+
             # instantiate capa Response
             responsetype_cls = responsetypes.registry.get_class_for_tag(response.tag)
             responder = responsetype_cls(response, inputfields, self.context, self.capa_system, self.capa_module)
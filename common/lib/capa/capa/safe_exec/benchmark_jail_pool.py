@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Compares the per-call latency of executing problem code with codejail, which
+starts a sandboxed Python for each call, and with a pool of pre-warmed
+workers (see capa.safe_exec.jail_pool).
+"""
+
+from functools import partial
+import timeit
+
+from codejail import jail_code
+
+from capa.safe_exec import jail_pool, safe_exec, safe_exec_many
+from capa.safe_exec.safe_exec import ASSUMED_IMPORTS
+
+try:
+    import click
+except ImportError:
+    click = None
+
+
+# Code like that of a typical customresponse check function, using numpy.
+CHECK_CODE = """
+answer = numpy.array([float(value) for value in submission.split(',')])
+expected = numpy.array([1.0, 2.0, 3.0])
+correct = bool(numpy.allclose(answer, expected))
+"""
+
+
+def call_latencies_ms(calls):
+    """
+    Return the latencies of executing `calls` pieces of code one after the
+    other, in milliseconds.
+    """
+    latencies = []
+    for index in xrange(calls):
+        globals_dict = {'submission': '1.0, 2.0, {}'.format(index)}
+        execute = partial(safe_exec, CHECK_CODE, globals_dict, random_seed=index)
+        latencies.append(timeit.timeit(execute, number=1) * 1000)
+    return latencies
+
+
+def batch_time_ms(calls):
+    """
+    Return the time taken to execute `calls` pieces of code with
+    `safe_exec_many`, in milliseconds.
+    """
+    executions = [
+        {'code': CHECK_CODE, 'globals_dict': {'submission': '1.0, 2.0, {}'.format(index)}, 'random_seed': index}
+        for index in xrange(calls)
+    ]
+    return timeit.timeit(partial(safe_exec_many, executions), number=1) * 1000
+
+
+def benchmark(calls, pool_size):
+    """
+    Return a list of (executor, mean ms, max ms, batch ms) results for codejail
+    and for a pool of `pool_size` workers.
+    """
+    results = []
+    for executor, size in (('codejail', 0), ('pool', pool_size)):
+        jail_pool.configure_pool(size, preimports=[module_name for __, module_name in ASSUMED_IMPORTS])
+        try:
+            latencies = call_latencies_ms(calls)
+            results.append((
+                executor,
+                sum(latencies) / len(latencies),
+                max(latencies),
+                batch_time_ms(calls),
+            ))
+        finally:
+            jail_pool.configure_pool(0)
+    return results
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.option('--python-bin',
+                  help="Path to the sandboxed Python executable.",
+                  required=True
+                  )
+    @click.option('--user',
+                  default=None,
+                  help="User to run the sandboxed Python as.",
+                  required=False
+                  )
+    @click.option('--calls',
+                  type=click.INT,
+                  default=50,
+                  help="Number of executions to time.",
+                  required=False
+                  )
+    @click.option('--pool-size',
+                  type=click.INT,
+                  default=4,
+                  help="Number of workers in the pool.",
+                  required=False
+                  )
+    def cli(python_bin, user, calls, pool_size):
+        """
+        Prints the per-call latency of codejail and of the pool of workers.
+        """
+        jail_code.configure('python', python_bin, user=user)
+        print "{:>9} {:>10} {:>10} {:>10}".format('executor', 'mean ms', 'max ms', 'batch ms')
+        for result in benchmark(calls, pool_size):
+            print "{:>9} {:>10.1f} {:>10.1f} {:>10.1f}".format(*result)
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print "Aborted! Module 'click' is not installed."
@@ -0,0 +1,406 @@
+"""
+A pool of pre-warmed codejail sandbox workers for `safe_exec`.
+
+Running code with codejail starts a new sandboxed Python process for each
+execution, which then imports numpy and the other assumed modules again.
+When many executions are done in a row (e.g. rescoring a problem for a whole
+course), most of the time is spent doing that.
+
+Each worker of the pool is a sandboxed Python process, started the same way
+as codejail starts one (as the sandbox user, with the sandboxed Python), that
+imports the assumed modules once. It then forks a child for every execution,
+which runs the code with fresh globals, in a directory of its own, under the
+same resource limits codejail sets, and exits. The worker's tmp directory,
+in which that directory is, is emptied after every execution, so nothing the
+code does can be seen by the next execution. Workers are replaced after a number of
+executions, and whenever anything goes wrong with them.
+
+Code that needs files from outside of the sandbox (python_path directories
+that aren't extra_files) is left to codejail.
+"""
+import base64
+import json
+import logging
+import os
+import Queue
+import resource
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+
+
+log = logging.getLogger(__name__)
+
+# Number of executions after which a worker is replaced.
+DEFAULT_MAX_EXECUTIONS = 100
+
+# Seconds a worker may take to answer, on top of the realtime limit of the code.
+WORKER_TIMEOUT_MARGIN = 5
+
+# Seconds a worker may take to start and import the modules it pre-imports.
+WORKER_START_TIMEOUT = 60
+
+# The worker, run by the sandboxed Python. It is given the modules to pre-import
+# as arguments, then reads requests from stdin and writes responses to stdout,
+# one JSON document per line.
+WORKER_CODE = r'''
+import base64
+import json
+import os
+import resource
+import shutil
+import signal
+import sys
+import tempfile
+import traceback
+
+for module_name in sys.argv[1:]:
+    try:
+        __import__(module_name)
+    except Exception:
+        pass
+
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+
+# Responses go to the original stdout; anything else the worker or the code
+# writes to stdout is discarded.
+responses = os.fdopen(os.dup(1), "w")
+os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+tmp_dir = os.path.abspath("tmp")
+
+
+def jsonable(value):
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def set_limits(limits):
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    if limits.get("CPU"):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits["CPU"], limits["CPU"]))
+    if limits.get("VMEM"):
+        resource.setrlimit(resource.RLIMIT_AS, (limits["VMEM"], limits["VMEM"]))
+    if limits.get("FSIZE"):
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limits["FSIZE"], limits["FSIZE"]))
+
+
+def close_inherited_fds(keep_fd):
+    # The code mustn't see the worker's requests or write its responses: only
+    # keep the result pipe, and point stdin, stdout and stderr to /dev/null.
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    max_fd = os.sysconf("SC_OPEN_MAX")
+    os.closerange(3, keep_fd)
+    os.closerange(keep_fd + 1, max_fd)
+
+
+def run(request, work_dir, result_fd):
+    close_inherited_fds(result_fd)
+    result = os.fdopen(result_fd, "w")
+    try:
+        os.chdir(work_dir)
+        for name, content in request["extra_files"]:
+            with open(name, "wb") as extra_file:
+                extra_file.write(base64.b64decode(content))
+        for name in request["python_path"]:
+            sys.path.append(os.path.join(work_dir, name))
+        set_limits(request["limits"])
+
+        g_dict = request["globals"]
+        exec request["code"] in g_dict
+        g_dict = dict((k, v) for k, v in g_dict.iteritems() if jsonable(v) and k not in BAD_KEYS)
+        json.dump({"globals": g_dict}, result)
+        status = 0
+    except BaseException:
+        result.write(json.dumps({"error": traceback.format_exc()}))
+        status = 1
+    result.close()
+    os._exit(status)
+
+
+def wipe_tmp_dir():
+    # The code can write anywhere in tmp_dir, not only in its work_dir, so
+    # everything in it is removed, even what the code made unreadable.
+    # Returns whether it could all be removed.
+    for name in os.listdir(tmp_dir):
+        path = os.path.join(tmp_dir, name)
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                os.chmod(path, 0700)
+                for root, dir_names, __ in os.walk(path):
+                    for dir_name in dir_names:
+                        dir_path = os.path.join(root, dir_name)
+                        if not os.path.islink(dir_path):
+                            os.chmod(dir_path, 0700)
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+    return not os.listdir(tmp_dir)
+
+
+def kill(pid):
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    request = json.loads(line)
+    work_dir = tempfile.mkdtemp(dir=tmp_dir)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        run(request, work_dir, write_fd)
+    os.close(write_fd)
+
+    if request["limits"].get("REALTIME"):
+        signal.signal(signal.SIGALRM, lambda signum, frame, pid=pid: kill(pid))
+        signal.alarm(request["limits"]["REALTIME"])
+    output = []
+    with os.fdopen(read_fd) as result:
+        while True:
+            try:
+                chunk = result.read()
+            except IOError:
+                # Interrupted by the alarm
+                continue
+            if not chunk:
+                break
+            output.append(chunk)
+    __, status = os.waitpid(pid, 0)
+    signal.alarm(0)
+    status = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    wiped = wipe_tmp_dir()
+
+    responses.write(json.dumps({"status": status, "output": "".join(output)}) + "\n")
+    responses.flush()
+    if not wiped:
+        # Don't let the next execution see what is left: the pool replaces
+        # workers that quit.
+        break
+'''
+
+
+class WorkerError(Exception):
+    """
+    Raised when a worker can't execute code, because it died or timed out.
+    """
+    pass
+
+
+class JailWorker(object):
+    """
+    A sandboxed Python process that executes code in forked children.
+    """
+    def __init__(self, command, preimports, limits):
+        self.executions = 0
+        self.limits = limits
+        self.home_dir = tempfile.mkdtemp(prefix="codejail-worker-")
+        try:
+            # The sandbox user needs to be able to read the worker's code, and
+            # write in its tmp directory.
+            os.chmod(self.home_dir, 0755)
+            tmp_dir = os.path.join(self.home_dir, "tmp")
+            os.mkdir(tmp_dir)
+            os.chmod(tmp_dir, 0777)
+            with open(os.path.join(self.home_dir, "worker.py"), "w") as worker_file:
+                worker_file.write(WORKER_CODE)
+
+            cmd = []
+            if command.get('user'):
+                cmd.extend(['sudo', '-u', command['user']])
+            cmd.extend(command['cmdline_start'])
+            cmd.append("worker.py")
+            cmd.extend(preimports)
+            with open(os.devnull, "w") as devnull:
+                self.process = subprocess.Popen(
+                    cmd, cwd=self.home_dir, env={}, close_fds=True,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+                    preexec_fn=self._set_worker_limits,
+                )
+        except:
+            shutil.rmtree(self.home_dir, ignore_errors=True)
+            raise
+
+    def _set_worker_limits(self):
+        """
+        Limit what the worker itself can write. Limits on CPU and memory are
+        applied to the children executing code, since they would add up in
+        the worker.
+        """
+        if self.limits.get("FSIZE"):
+            resource.setrlimit(resource.RLIMIT_FSIZE, (self.limits["FSIZE"], self.limits["FSIZE"]))
+
+    def is_alive(self):
+        """Whether the worker process is still running."""
+        return self.process.poll() is None
+
+    def execute(self, code, globals_dict, python_path, extra_files):
+        """
+        Execute `code` with the JSON-safe `globals_dict`. Returns the worker's
+        response: the exit status of the child that executed it, and its output.
+
+        Raises WorkerError if the worker doesn't answer in time.
+        """
+        request = {
+            "code": code,
+            "globals": globals_dict,
+            "python_path": python_path or [],
+            "extra_files": [(name, base64.b64encode(content)) for name, content in extra_files or []],
+            "limits": self.limits,
+        }
+        self.executions += 1
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except IOError as exc:
+            raise WorkerError(u"Could not send code to the worker: {}".format(exc))
+
+        timeout = (self.limits.get("REALTIME") or 0) + WORKER_TIMEOUT_MARGIN
+        if self.executions == 1:
+            timeout += WORKER_START_TIMEOUT
+        readable, __, __ = select.select([self.process.stdout], [], [], timeout)
+        if not readable:
+            raise WorkerError("The worker timed out")
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerError("The worker died")
+        return json.loads(line)
+
+    def close(self):
+        """Stop the worker and remove its files."""
+        try:
+            self.process.stdin.close()
+            if self.is_alive():
+                self.process.kill()
+            self.process.wait()
+        except (IOError, OSError):
+            pass
+        shutil.rmtree(self.home_dir, ignore_errors=True)
+
+
+class JailPool(object):
+    """
+    A pool of `size` workers, each replaced after `max_executions` executions.
+
+    Workers are started when they are first needed. `command` is how to run
+    the sandboxed Python, as configured in codejail (`jail_code.COMMANDS`),
+    and `limits` are codejail's resource limits (`jail_code.LIMITS`); they
+    default to codejail's configuration at the time workers are started.
+    """
+    def __init__(self, size, max_executions=DEFAULT_MAX_EXECUTIONS, preimports=(), command=None, limits=None):
+        self.size = size
+        self.max_executions = max_executions
+        self.preimports = list(preimports)
+        self.command = command
+        self.limits = limits
+        # Idle workers, or None for workers that haven't been started.
+        self._idle = Queue.Queue()
+        for __ in xrange(size):
+            self._idle.put(None)
+
+    def can_execute(self, python_path, extra_files):
+        """
+        Whether the pool can execute code needing `python_path` and
+        `extra_files`: workers only have the extra files.
+        """
+        if self.command is None and not jail_code.is_configured("python"):
+            return False
+        extra_file_names = set(name for name, __ in extra_files or [])
+        return all(name in extra_file_names for name in python_path or [])
+
+    def _start_worker(self):
+        """Start a new worker."""
+        return JailWorker(
+            self.command or jail_code.COMMANDS["python"],
+            self.preimports,
+            self.limits if self.limits is not None else dict(jail_code.LIMITS),
+        )
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute `code` in a worker, like `codejail.safe_exec.safe_exec`: the
+        changes it makes to the JSON-safe globals in `globals_dict` are visible
+        in `globals_dict` when this returns, and errors in the code are raised
+        as `SafeExecException`.
+        """
+        if slug:
+            log.debug("Executing jailed code %s in a worker", slug)
+
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.is_alive():
+                if worker is not None:
+                    worker.close()
+                worker = self._start_worker()
+            response = worker.execute(code, json_safe(globals_dict), python_path, extra_files)
+        except WorkerError as exc:
+            log.warning("Replacing codejail worker: %s", exc)
+            worker.close()
+            worker = None
+            raise SafeExecException("Couldn't execute jailed code: {}".format(exc))
+        finally:
+            if worker is not None and worker.executions >= self.max_executions:
+                worker.close()
+                worker = None
+            self._idle.put(worker)
+
+        try:
+            output = json.loads(response["output"])
+        except ValueError:
+            output = {}
+        if response["status"] != 0 or "globals" not in output:
+            raise SafeExecException(
+                "Couldn't execute jailed code: stdout: {!r}, stderr: {!r} with status code: {}".format(
+                    "", output.get("error", ""), response["status"]
+                )
+            )
+        globals_dict.update(output["globals"])
+
+    def close(self):
+        """Stop all the idle workers."""
+        for __ in xrange(self.size):
+            worker = self._idle.get()
+            if worker is not None:
+                worker.close()
+            self._idle.put(None)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def configure_pool(size, max_executions=DEFAULT_MAX_EXECUTIONS, preimports=()):
+    """
+    Make `safe_exec` execute code in a pool of `size` workers, or turn the pool
+    off if `size` is 0.
+    """
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+        _POOL = JailPool(size, max_executions, preimports) if size else None
+
+
+def get_pool():
+    """Return the configured pool, or None."""
+    return _POOL
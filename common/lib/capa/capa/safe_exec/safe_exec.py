@@ -3,10 +3,16 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
-from . import lazymod
+from . import jail_pool, lazymod
 from dogapi import dog_stats_api
 
+from collections import OrderedDict
+from copy import deepcopy
 import hashlib
+import json
+import Queue
+import threading
+import time
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -70,6 +76,105 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def cache_key(code, globals_dict, random_seed):
+    """
+    Return the key of the result of executing `code` with `globals_dict` and
+    `random_seed` in the cache.
+
+    The globals are almost always all JSON-serializable, in which case they are
+    canonicalized by serializing them with sorted keys, in one pass. Otherwise
+    their JSON-safe part is hashed with `update_hash`.
+    """
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    try:
+        md5er.update(json.dumps(globals_dict, sort_keys=True))
+    except (TypeError, ValueError):
+        update_hash(md5er, json_safe(globals_dict))
+    return "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+
+
+class LocalResultCache(object):
+    """
+    A process-local, least-recently-used cache of the results of `safe_exec`,
+    in front of the cache passed to it, bounded by the number of results.
+
+    The result of executing some code only depends on the code, its globals
+    and its random seed, which its key is made of, so results never go stale.
+    Callers get copies of the results, which they may modify.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the result cached under `key`, or None."""
+        with self._lock:
+            result = self._results.pop(key, None)
+            if result is None:
+                return None
+            self._results[key] = result
+        return deepcopy(result)
+
+    def set(self, key, result):
+        """Cache a copy of `result` under `key`."""
+        result = deepcopy(result)
+        with self._lock:
+            self._results.pop(key, None)
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        """Empty the cache."""
+        with self._lock:
+            self._results.clear()
+
+
+_LOCAL_CACHE = None
+
+
+def configure_local_cache(max_entries):
+    """
+    Keep up to `max_entries` results of `safe_exec` in a process-local cache,
+    in front of the cache passed to it, or turn the local cache off if
+    `max_entries` is 0.
+    """
+    global _LOCAL_CACHE  # pylint: disable=global-statement
+    _LOCAL_CACHE = LocalResultCache(max_entries) if max_entries else None
+
+
+def get_local_cache():
+    """Return the process-local cache of results, or None."""
+    return _LOCAL_CACHE
+
+
+def _get_cached_result(cache, key):
+    """
+    Return the result cached under `key` in the local cache or in `cache`,
+    or None, recording hits, misses and the latency of `cache`.
+    """
+    local_cache = _LOCAL_CACHE
+    if local_cache is not None:
+        cached = local_cache.get(key)
+        if cached is not None:
+            dog_stats_api.increment('capa.safe_exec.cache', tags=['result:local_hit'])
+            return cached
+
+    start = time.time()
+    cached = cache.get(key)
+    dog_stats_api.histogram('capa.safe_exec.cache.get_time', time.time() - start)
+    if cached is None:
+        dog_stats_api.increment('capa.safe_exec.cache', tags=['result:miss'])
+        return None
+
+    dog_stats_api.increment('capa.safe_exec.cache', tags=['result:remote_hit'])
+    if local_cache is not None:
+        local_cache.set(key, cached)
+    return cached
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -99,7 +204,8 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    and the random seed.  If a local cache is configured (see `configure_local_cache`),
+    it is checked first.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -109,12 +215,8 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
-        cached = cache.get(key)
+        key = cache_key(code, globals_dict, random_seed)
+        cached = _get_cached_result(cache, key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
@@ -128,8 +230,11 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
+    pool = jail_pool.get_pool()
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif pool is not None and pool.can_execute(python_path, extra_files):
+        exec_fn = pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -149,7 +254,51 @@ def safe_exec(
     if cache:
         cleaned_results = json_safe(globals_dict)
         cache.set(key, (emsg, cleaned_results))
+        if _LOCAL_CACHE is not None:
+            _LOCAL_CACHE.set(key, (emsg, cleaned_results))
 
     # If an exception happened, raise it now.
     if emsg:
         raise e
+
+
+def safe_exec_many(executions):
+    """
+    Execute many pieces of python code safely, e.g. the submissions of many
+    students to a problem.
+
+    `executions` is a list of dicts of the arguments of `safe_exec`. They are
+    executed concurrently in the workers of the codejail pool, if there is one
+    (see `jail_pool`), or one after the other.
+
+    Returns a list with, for each execution, the `SafeExecException` it raised
+    or None. As with `safe_exec`, the changes the code makes to its globals
+    are visible in its `globals_dict`.
+    """
+    results = [None] * len(executions)
+    pending = Queue.Queue()
+    for index in xrange(len(executions)):
+        pending.put(index)
+
+    def run():
+        """Run pending executions until there are none left."""
+        while True:
+            try:
+                index = pending.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                safe_exec(**executions[index])
+            except SafeExecException as exc:
+                results[index] = exc
+
+    pool = jail_pool.get_pool()
+    if pool is None:
+        run()
+    else:
+        threads = [threading.Thread(target=run) for __ in xrange(min(pool.size, len(executions)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results
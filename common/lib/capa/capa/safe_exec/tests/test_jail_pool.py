@@ -0,0 +1,153 @@
+"""Test jail_pool.py"""
+
+import os
+import sys
+import textwrap
+import unittest
+import zipfile
+from StringIO import StringIO
+
+from nose.plugins.skip import SkipTest
+
+from codejail.safe_exec import SafeExecException
+
+from capa.safe_exec import jail_pool, safe_exec, safe_exec_many
+from capa.safe_exec.jail_pool import JailPool
+
+# Run the workers with this Python, unsandboxed.
+COMMAND = {'cmdline_start': [sys.executable, '-E', '-B'], 'user': None}
+LIMITS = {'CPU': 1, 'REALTIME': 3}
+
+
+class TestJailPool(unittest.TestCase):
+    def setUp(self):
+        super(TestJailPool, self).setUp()
+        self.pool = JailPool(1, max_executions=3, preimports=['math'], command=COMMAND, limits=LIMITS)
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'b': 3}
+        self.pool.safe_exec("a = 17 + b", g)
+        self.assertEqual(g, {'a': 20, 'b': 3})
+
+    def test_fresh_globals(self):
+        g = {}
+        self.pool.safe_exec("import math; math.pi = 3; leak = 1", g)
+        g = {}
+        self.pool.safe_exec("import math; a = math.pi; b = globals().get('leak')", g)
+        self.assertNotEqual(g['a'], 3)
+        self.assertIsNone(g['b'])
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+        # The worker is still usable
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_cpu_limit(self):
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec("while True: pass", {})
+
+    def test_realtime_limit(self):
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec("import time; time.sleep(10)", {})
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_no_forking(self):
+        if os.getuid() == 0:
+            raise SkipTest("Process limits don't apply to root")
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("import os; os.fork()", {})
+        self.assertIn("OSError", cm.exception.message)
+
+    def test_output_is_ignored(self):
+        g = {}
+        self.pool.safe_exec("print 'hello'\na = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_no_access_to_worker_pipes(self):
+        g = {}
+        self.pool.safe_exec(textwrap.dedent("""\
+            import os
+            stdin = os.read(0, 100)
+            open_fds = []
+            for fd in range(3, 1024):
+                try:
+                    os.fstat(fd)
+                except OSError:
+                    continue
+                open_fds.append(fd)
+            os.write(1, '{"status": 0, "output": "{\\"globals\\": {\\"a\\": 666}}"}\\n')
+            """), g)
+        self.assertEqual(g['stdin'], '')
+        # Only the pipe the result is written to is open
+        self.assertEqual(len(g['open_fds']), 1)
+        # The forged response didn't reach the worker's responses
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_no_files_left_for_next_execution(self):
+        self.pool.safe_exec(textwrap.dedent("""\
+            import os
+            with open('../x', 'w') as leak:
+                leak.write('secret')
+            os.mkdir('../hidden')
+            with open('../hidden/x', 'w') as leak:
+                leak.write('secret')
+            os.chmod('../hidden', 0)
+            """), {})
+        g = {}
+        self.pool.safe_exec("import os; leaked = os.path.exists('../x'); others = os.listdir('..')", g)
+        self.assertFalse(g['leaked'])
+        # Only the directory of the execution itself is there
+        self.assertEqual(len(g['others']), 1)
+
+    def test_extra_files(self):
+        python_lib = StringIO()
+        with zipfile.ZipFile(python_lib, "w") as python_lib_zip:
+            python_lib_zip.writestr("constant.py", "THE_CONST = 23\n")
+        g = {}
+        self.pool.safe_exec(
+            "import constant; a = constant.THE_CONST", g,
+            python_path=["python_lib.zip"], extra_files=[("python_lib.zip", python_lib.getvalue())],
+        )
+        self.assertEqual(g['a'], 23)
+
+    def test_can_execute(self):
+        self.assertTrue(self.pool.can_execute(None, None))
+        self.assertTrue(self.pool.can_execute(["python_lib.zip"], [("python_lib.zip", "")]))
+        self.assertFalse(self.pool.can_execute(["/course/code"], [("python_lib.zip", "")]))
+
+    def test_workers_replaced(self):
+        pids = []
+        for __ in xrange(4):
+            g = {}
+            self.pool.safe_exec("import os; pid = os.getppid()", g)
+            pids.append(g['pid'])
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[3], pids[0])
+
+
+class TestSafeExecWithPool(unittest.TestCase):
+    def setUp(self):
+        super(TestSafeExecWithPool, self).setUp()
+        jail_pool._POOL = JailPool(2, command=COMMAND, limits=LIMITS)  # pylint: disable=protected-access
+        self.addCleanup(jail_pool.configure_pool, 0)
+
+    def test_safe_exec(self):
+        g = {}
+        safe_exec("a = 1/2", g, random_seed=17)
+        self.assertEqual(g['a'], 0.5)
+
+    def test_safe_exec_many(self):
+        executions = [{'code': "a = 10 / b", 'globals_dict': {'b': b}} for b in (1, 2, 0, 5)]
+        results = safe_exec_many(executions)
+        self.assertEqual([execution['globals_dict'].get('a') for execution in executions], [10, 5, None, 2])
+        self.assertEqual([result is None for result in results], [True, True, False, True])
+        self.assertIn("ZeroDivisionError", results[2].message)
@@ -9,7 +9,12 @@ import unittest
 
 from nose.plugins.skip import SkipTest
 
+from mock import patch
+
 from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec.safe_exec import (
+    cache_key, configure_local_cache, dog_stats_api, get_local_cache, LocalResultCache
+)
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -177,6 +182,89 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestSafeExecLocalCaching(unittest.TestCase):
+    """Test the local cache in front of the cache passed to safe_exec."""
+
+    def setUp(self):
+        super(TestSafeExecLocalCaching, self).setUp()
+        configure_local_cache(10)
+        self.addCleanup(configure_local_cache, 0)
+
+    def test_local_hit(self):
+        cache = {}
+        safe_exec("a = int(math.pi)", {}, cache=DictCache(cache))
+
+        # Fiddle with the cache: the result comes from the local cache.
+        cache[cache.keys()[0]] = (None, {'a': 17})
+        g = {}
+        with patch.object(dog_stats_api, 'increment') as mock_increment:
+            safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 3)
+        mock_increment.assert_called_once_with('capa.safe_exec.cache', tags=['result:local_hit'])
+
+    def test_remote_hit_fills_local_cache(self):
+        code = "a = int(math.pi)"
+        key = cache_key(code, {}, None)
+        cache = {key: (None, {'a': 17})}
+        g = {}
+        with patch.object(dog_stats_api, 'increment') as mock_increment:
+            safe_exec(code, g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 17)
+        mock_increment.assert_called_once_with('capa.safe_exec.cache', tags=['result:remote_hit'])
+        self.assertEqual(get_local_cache().get(key), (None, {'a': 17}))
+
+    def test_local_results_are_copies(self):
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=DictCache({}))
+        g['a'].append(3)
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=DictCache({}))
+        self.assertEqual(g['a'], [1, 2])
+
+    def test_cached_exceptions(self):
+        cache = {}
+        with self.assertRaises(SafeExecException):
+            safe_exec("1/0", {}, cache=DictCache(cache))
+        cache.clear()
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", {}, cache=DictCache(cache))
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_evicts_least_recently_used(self):
+        local_cache = LocalResultCache(2)
+        local_cache.set('first', (None, {}))
+        local_cache.set('second', (None, {}))
+        local_cache.get('first')
+        local_cache.set('third', (None, {}))
+        self.assertIsNone(local_cache.get('second'))
+        self.assertIsNotNone(local_cache.get('first'))
+        self.assertIsNotNone(local_cache.get('third'))
+
+
+class TestCacheKey(unittest.TestCase):
+    """Test the cache keys of safe_exec results."""
+
+    def test_canonical(self):
+        first = {}
+        first['a'] = 1
+        first['b'] = [1, {'x': 'y', 'z': 2}]
+        second = {}
+        second['b'] = [1, {'z': 2, 'x': 'y'}]
+        second['a'] = 1
+        self.assertEqual(cache_key("code", first, 1), cache_key("code", second, 1))
+
+    def test_differences(self):
+        key = cache_key("code", {'a': 1}, 1)
+        self.assertNotEqual(key, cache_key("other code", {'a': 1}, 1))
+        self.assertNotEqual(key, cache_key("code", {'a': 2}, 1))
+        self.assertNotEqual(key, cache_key("code", {'a': 1}, 2))
+
+    def test_not_json_serializable(self):
+        globals_dict = {'a': 1, 'b': object()}
+        self.assertEqual(cache_key("code", globals_dict, 1), cache_key("code", globals_dict, 1))
+        self.assertNotEqual(cache_key("code", globals_dict, 1), cache_key("code", {'a': 2, 'b': object()}, 1))
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
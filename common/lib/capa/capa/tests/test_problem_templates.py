@@ -0,0 +1,101 @@
+"""
+Tests for the cache of problem templates.
+"""
+import textwrap
+import unittest
+
+from lxml import etree
+import mock
+
+from capa.capa_problem import PROBLEM_TEMPLATES, ProblemTemplateCache
+from .response_xml_factory import StringResponseXMLFactory
+from . import new_loncapa_problem
+
+
+class ProblemTemplatesTest(unittest.TestCase):
+    """
+    Tests that problems are built from cached templates.
+    """
+    def setUp(self):
+        super(ProblemTemplatesTest, self).setUp()
+        PROBLEM_TEMPLATES.clear()
+        self.addCleanup(PROBLEM_TEMPLATES.clear)
+        self.xml = StringResponseXMLFactory().build_xml(answer='Michigan', num_inputs=2)
+
+    def test_template_reused(self):
+        first = new_loncapa_problem(self.xml)
+        with mock.patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            second = new_loncapa_problem(self.xml, seed=1)
+        self.assertFalse(mock_xml.called)
+
+        self.assertEqual(etree.tostring(first.tree), etree.tostring(second.tree))
+        self.assertEqual(
+            sorted(responder.id for responder in first.responders.values()),
+            sorted(responder.id for responder in second.responders.values()),
+        )
+        self.assertEqual(first.get_question_answers(), second.get_question_answers())
+        self.assertEqual(first.get_answer_ids(), second.get_answer_ids())
+
+    def test_trees_not_shared(self):
+        first = new_loncapa_problem(self.xml)
+        first.tree.set('modified', 'true')
+        second = new_loncapa_problem(self.xml)
+        self.assertIsNone(second.tree.get('modified'))
+
+    def test_per_student_transforms(self):
+        # Shuffling depends on the seed, and is done to each problem's own tree
+        xml = textwrap.dedent("""
+            <problem>
+            <multiplechoiceresponse>
+              <choicegroup type="MultipleChoice" shuffle="true">
+                <choice correct="false">Apple</choice>
+                <choice correct="false">Banana</choice>
+                <choice correct="false">Chocolate</choice>
+                <choice correct="true">Donut</choice>
+              </choicegroup>
+            </multiplechoiceresponse>
+            </problem>
+        """)
+        orders = set()
+        for seed in xrange(5):
+            problem = new_loncapa_problem(xml, seed=seed)
+            orders.add(tuple(choice.get('name') for choice in problem.tree.iter('choice')))
+            self.assertEqual(problem.get_html(), new_loncapa_problem(xml, seed=seed).get_html())
+        self.assertGreater(len(orders), 1)
+
+    def test_changed_problem(self):
+        problem = new_loncapa_problem(self.xml)
+        changed_xml = StringResponseXMLFactory().build_xml(answer='Ohio', num_inputs=2)
+        changed_problem = new_loncapa_problem(changed_xml)
+        self.assertIn('Ohio', repr(changed_problem.get_question_answers()))
+        self.assertNotIn('Ohio', repr(problem.get_question_answers()))
+
+    def test_includes_not_cached(self):
+        xml = textwrap.dedent("""
+            <problem>
+                <include file="test_include.xml"/>
+            </problem>
+        """)
+        with mock.patch.object(PROBLEM_TEMPLATES, 'set') as mock_set:
+            new_loncapa_problem(xml)
+        self.assertFalse(mock_set.called)
+
+
+class ProblemTemplateCacheTest(unittest.TestCase):
+    """
+    Tests for ProblemTemplateCache.
+    """
+    def test_evicts_least_recently_used(self):
+        cache = ProblemTemplateCache(2)
+        for name in ('first', 'second'):
+            cache.set(name, etree.Element(name))
+        cache.get('first')
+        cache.set('third', etree.Element('third'))
+
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual(cache.get('first').tag, 'first')
+        self.assertEqual(cache.get('third').tag, 'third')
+
+    def test_key(self):
+        self.assertEqual(ProblemTemplateCache.key('1', u'<problem/>'), ProblemTemplateCache.key('1', '<problem/>'))
+        self.assertNotEqual(ProblemTemplateCache.key('1', '<problem/>'), ProblemTemplateCache.key('2', '<problem/>'))
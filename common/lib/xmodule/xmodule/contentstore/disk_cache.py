@@ -0,0 +1,183 @@
+"""
+A node-local cache of course assets on disk, in front of the GridFS-backed
+`MongoContentStore`, so that popular assets are read from a local file rather
+than streamed from Mongo.
+
+Cached copies are keyed by the asset's id and the MD5 digest of its data, so
+a copy is only ever used for the version of the asset it was made from, and
+the cache can be shared by all the processes of a node. The least recently
+used copies are evicted to keep the total size of the cache under a limit.
+"""
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+from collections import defaultdict
+
+
+log = logging.getLogger(__name__)
+
+# Size of the chunks that assets are copied into the cache in.
+COPY_CHUNK_SIZE = 256 * 1024
+
+# Prefix of the files that copies are written to before they are complete.
+TEMP_FILE_PREFIX = '.tmp-'
+
+
+class AssetDiskCache(object):
+    """
+    A directory of copies of assets, bounded by their total size.
+
+    Copies are written to temporary files and renamed into place, so readers
+    never see partial copies. Their modification times are updated when they
+    are used, which is what copies are evicted by.
+
+    The sizes of the copies are kept in an index by asset, so that the
+    directory is only scanned when the total size passes the limit, or when
+    `max_bytes / RESCAN_FRACTION` bytes have been added since the last scan,
+    to account for the copies made by other processes. Deleting an asset
+    only removes the copies in the index; other processes' copies are never
+    used for another version of the asset, and are evicted in time.
+    """
+    # Fraction of max_bytes added by this process after which the directory
+    # is scanned again for the copies made by other processes
+    RESCAN_FRACTION = 10
+
+    def __init__(self, directory, max_bytes, max_item_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        try:
+            os.makedirs(directory)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        # key prefix -> file name -> size of the copies known to this process
+        self._copies = defaultdict(dict)
+        self._total_bytes = 0
+        self._bytes_added_since_scan = 0
+        self.evict()
+
+    def _key_prefix(self, key):
+        """
+        Returns the prefix of the file names of the copies of the asset `key`.
+        """
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + '-'
+
+    def _path(self, key, digest):
+        """
+        Returns the path of the copy of the version of the asset `key` with
+        the MD5 `digest`.
+        """
+        return os.path.join(self.directory, self._key_prefix(key) + digest)
+
+    def open(self, key, digest):
+        """
+        Returns the copy of the version of the asset `key` with the MD5
+        `digest` as a file open for reading, or None if it isn't cached.
+        """
+        path = self._path(key, digest)
+        try:
+            cached_file = open(path, 'rb')
+        except IOError:
+            return None
+
+        try:
+            # Mark the copy as recently used
+            os.utime(path, None)
+        except OSError:
+            # It has just been evicted, but is still readable through cached_file.
+            pass
+        return cached_file
+
+    def add(self, key, digest, stream):
+        """
+        Copies the version of the asset `key` with the MD5 `digest` from the
+        file-like `stream` into the cache, and returns the copy as a file open
+        for reading, or None if it couldn't be cached.
+        """
+        size = 0
+        try:
+            temp_fd, temp_path = tempfile.mkstemp(prefix=TEMP_FILE_PREFIX, dir=self.directory)
+            try:
+                with os.fdopen(temp_fd, 'wb') as temp_file:
+                    for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), ''):
+                        temp_file.write(chunk)
+                        size += len(chunk)
+                os.rename(temp_path, self._path(key, digest))
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        except (IOError, OSError):
+            log.exception(u"Could not cache asset %s on disk", key)
+            return None
+
+        prefix = self._key_prefix(key)
+        self._total_bytes += size - self._copies[prefix].get(prefix + digest, 0)
+        self._copies[prefix][prefix + digest] = size
+        self._bytes_added_since_scan += size
+        if self._total_bytes > self.max_bytes or \
+                self._bytes_added_since_scan * self.RESCAN_FRACTION > self.max_bytes:
+            self.evict()
+        return self.open(key, digest)
+
+    def delete(self, key):
+        """
+        Removes the copies of the asset `key` in the index from the cache.
+        """
+        for name, size in self._copies.pop(self._key_prefix(key), {}).iteritems():
+            self._remove(name)
+            self._total_bytes -= size
+
+    def evict(self):
+        """
+        Scans the directory to rebuild the index, and removes the least
+        recently used copies from the cache until their total size is at most
+        `max_bytes`.
+        """
+        copies = []
+        total_bytes = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(TEMP_FILE_PREFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                # Removed by another process
+                continue
+            copies.append((stat.st_mtime, name, stat.st_size))
+            total_bytes += stat.st_size
+
+        copies.sort()
+        self._copies = defaultdict(dict)
+        for __, name, size in copies:
+            if total_bytes > self.max_bytes:
+                self._remove(name)
+                total_bytes -= size
+            else:
+                self._copies[name.split('-', 1)[0] + '-'][name] = size
+        self._total_bytes = total_bytes
+        self._bytes_added_since_scan = 0
+
+    def clear(self):
+        """
+        Removes all the copies from the cache.
+        """
+        for name in os.listdir(self.directory):
+            if not name.startswith(TEMP_FILE_PREFIX):
+                self._remove(name)
+        self._copies = defaultdict(dict)
+        self._total_bytes = 0
+        self._bytes_added_since_scan = 0
+
+    def _remove(self, name):
+        """
+        Removes the file `name` from the cache directory, if it's still there.
+        Processes reading it can finish doing so.
+        """
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
@@ -6,7 +6,10 @@ from xmodule.contentstore.content import XASSET_LOCATION_TAG
 
 import logging
 
+from django.conf import settings
+
 from .content import StaticContent, ContentStore, StaticContentStream
+from .disk_cache import AssetDiskCache
 from xmodule.exceptions import NotFoundError
 from fs.osfs import OSFS
 import os
@@ -48,6 +51,16 @@ class MongoContentStore(ContentStore):
 
         self.fs_files = _db[bucket + ".files"]  # the underlying collection GridFS uses
 
+        # The optional node-local cache of assets on disk (see disk_cache)
+        self.disk_cache = None
+        disk_cache_dir = getattr(settings, 'STATIC_CONTENT_DISK_CACHE_DIR', None)
+        if disk_cache_dir:
+            self.disk_cache = AssetDiskCache(
+                disk_cache_dir,
+                getattr(settings, 'STATIC_CONTENT_DISK_CACHE_MAX_BYTES', 1024 * 1024 * 1024),
+                getattr(settings, 'STATIC_CONTENT_DISK_CACHE_MAX_ITEM_BYTES', 64 * 1024 * 1024),
+            )
+
     def close_connections(self):
         """
         Closes any open connections to the underlying databases
@@ -90,45 +103,74 @@ class MongoContentStore(ContentStore):
             location_or_id, _ = self.asset_db_key(location_or_id)
         # Deletes of non-existent files are considered successful
         self.fs.delete(location_or_id)
+        if self.disk_cache is not None:
+            self.disk_cache.delete(self._disk_cache_key(location_or_id))
 
     def find(self, location, throw_on_not_found=True, as_stream=False):
         content_id, __ = self.asset_db_key(location)
 
         try:
-            if as_stream:
-                fp = self.fs.get(content_id)
-                thumbnail_location = getattr(fp, 'thumbnail_location', None)
-                if thumbnail_location:
-                    thumbnail_location = location.course_key.make_asset_key(
-                        'thumbnail',
-                        thumbnail_location[4]
-                    )
-                return StaticContentStream(
-                    location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
-                    thumbnail_location=thumbnail_location,
-                    import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
-                )
-            else:
-                with self.fs.get(content_id) as fp:
-                    thumbnail_location = getattr(fp, 'thumbnail_location', None)
-                    if thumbnail_location:
-                        thumbnail_location = location.course_key.make_asset_key(
-                            'thumbnail',
-                            thumbnail_location[4]
-                        )
-                    return StaticContent(
-                        location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
-                        thumbnail_location=thumbnail_location,
-                        import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
-                    )
+            fp = self.fs.get(content_id)
         except NoFile:
             if throw_on_not_found:
                 raise NotFoundError(content_id)
             else:
                 return None
 
+        thumbnail_location = getattr(fp, 'thumbnail_location', None)
+        if thumbnail_location:
+            thumbnail_location = location.course_key.make_asset_key(
+                'thumbnail',
+                thumbnail_location[4]
+            )
+        stream = self._disk_cached_stream(content_id, fp)
+        if as_stream:
+            return StaticContentStream(
+                location, fp.displayname, fp.content_type, stream, last_modified_at=fp.uploadDate,
+                thumbnail_location=thumbnail_location,
+                import_path=getattr(fp, 'import_path', None),
+                length=fp.length, locked=getattr(fp, 'locked', False),
+                content_digest=getattr(fp, 'md5', None)
+            )
+        else:
+            with stream:
+                return StaticContent(
+                    location, fp.displayname, fp.content_type, stream.read(), last_modified_at=fp.uploadDate,
+                    thumbnail_location=thumbnail_location,
+                    import_path=getattr(fp, 'import_path', None),
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=getattr(fp, 'md5', None)
+                )
+
+    def _disk_cached_stream(self, content_id, fp):
+        """
+        Returns the data of the GridFS file `fp` as a file-like object: its copy
+        in the disk cache, which it is copied to if needed, or `fp` itself if
+        it isn't cached on disk.
+        """
+        digest = getattr(fp, 'md5', None)
+        if self.disk_cache is None or digest is None or fp.length > self.disk_cache.max_item_bytes:
+            return fp
+
+        key = self._disk_cache_key(content_id)
+        cached_file = self.disk_cache.open(key, digest)
+        if cached_file is None:
+            cached_file = self.disk_cache.add(key, digest, fp)
+            if cached_file is None:
+                fp.seek(0)
+                return fp
+        fp.close()
+        return cached_file
+
+    @staticmethod
+    def _disk_cache_key(content_id):
+        """
+        Returns the key of the asset with the id `content_id` in the disk cache.
+        """
+        if isinstance(content_id, basestring):
+            return content_id
+        return json.dumps(content_id, sort_keys=True)
+
     def export(self, location, output_directory):
         content = self.find(location)
 
@@ -201,7 +243,7 @@ class MongoContentStore(ContentStore):
             items = self.fs_files.find(query)
             assets_to_delete = assets_to_delete + items.count()
             for asset in items:
-                self.fs.delete(asset[prefix])
+                self.delete(asset[prefix])
 
             self.fs_files.remove(query)
         return assets_to_delete
@@ -353,7 +395,7 @@ class MongoContentStore(ContentStore):
         matching_assets = self.fs_files.find(course_query)
         for asset in matching_assets:
             asset_key = self.make_id_son(asset)
-            self.fs.delete(asset_key)
+            self.delete(asset_key)
 
     # codifying the original order which pymongo used for the dicts coming out of location_to_dict
     # stability of order is more important than sanity of order as any changes to order make things
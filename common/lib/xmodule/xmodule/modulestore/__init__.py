@@ -463,6 +463,40 @@ class BlockData(object):
 new_contract('BlockData', BlockData)
 
 
+class CourseSummary(object):
+    """
+    The fields of a course needed to list it, which modulestores can read
+    without loading the course.
+    """
+    def __init__(self, location, display_name=None, display_coursenumber=None, display_organization=None):
+        self.location = location
+        self.display_name = display_name
+        self.display_coursenumber = display_coursenumber
+        self.display_organization = display_organization
+
+    @property
+    def id(self):  # pylint: disable=invalid-name
+        """The key of the course."""
+        return self.location.course_key
+
+    @property
+    def display_number_with_default(self):
+        """
+        Return a display course number if it has been specified, otherwise return the 'course' that is in the location
+        """
+        return self.display_coursenumber or self.location.course
+
+    @property
+    def display_org_with_default(self):
+        """
+        Return a display organization if it has been specified, otherwise return the 'org' that is in the location
+        """
+        return self.display_organization or self.location.org
+
+    def __repr__(self):
+        return "{}({!r}, display_name={!r})".format(self.__class__.__name__, self.location, self.display_name)
+
+
 class IncorrectlySortedList(Exception):
     """
     Thrown when calling find() on a SortedAssetList not sorted by filename.
@@ -1174,6 +1208,32 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
                 return course
         return None
 
+    def get_courses_keys(self, **kwargs):
+        """
+        Returns the keys of the courses in this modulestore, accepting the same
+        arguments as `get_courses`. Modulestores which can list their courses
+        without loading them override this; the keys of courses that fail to
+        load may then be included.
+        """
+        return [course.id for course in self.get_courses(**kwargs)]
+
+    def get_course_summaries(self, **kwargs):
+        """
+        Returns a :class:`CourseSummary` of each of the courses in this
+        modulestore, accepting the same arguments as `get_courses`. Like
+        `get_courses_keys`, modulestores which can read the summaries without
+        loading the courses override this.
+        """
+        return [
+            CourseSummary(
+                course.location,
+                display_name=course.display_name,
+                display_coursenumber=getattr(course, 'display_coursenumber', None),
+                display_organization=getattr(course, 'display_organization', None),
+            )
+            for course in self.get_courses(**kwargs)
+        ]
+
     def has_course(self, course_id, ignore_case=False, **kwargs):
         """
         Returns the course_id of the course if it was found, else None
@@ -1187,16 +1247,16 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
         if ignore_case:
             return next(
                 (
-                    c.id for c in self.get_courses()
-                    if c.id.org.lower() == course_id.org.lower() and
-                    c.id.course.lower() == course_id.course.lower() and
-                    c.id.run.lower() == course_id.run.lower()
+                    key for key in self.get_courses_keys()
+                    if key.org.lower() == course_id.org.lower() and
+                    key.course.lower() == course_id.course.lower() and
+                    key.run.lower() == course_id.run.lower()
                 ),
                 None
             )
         else:
             return next(
-                (c.id for c in self.get_courses() if c.id == course_id),
+                (key for key in self.get_courses_keys() if key == course_id),
                 None
             )
 
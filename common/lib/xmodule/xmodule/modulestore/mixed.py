@@ -284,16 +284,30 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
     def get_courses_keys(self, **kwargs):
         '''
         Returns a list containing the top level XModuleDescriptors keys of the courses in this modulestore.
+        The stores list the keys without loading the courses.
         '''
-        courses = {}
+        course_keys = set()
         for store in self.modulestores:
             # filter out ones which were fetched from earlier stores but locations may not be ==
-            for course in store.get_courses(**kwargs):
-                course_id = self._clean_locator_for_mapping(course.id)
-                if course_id not in courses:
+            for course_key in store.get_courses_keys(**kwargs):
+                course_keys.add(self._clean_locator_for_mapping(course_key))
+        return list(course_keys)
+
+    @strip_key
+    def get_course_summaries(self, **kwargs):
+        '''
+        Returns a list of the :class:`~xmodule.modulestore.CourseSummary` of the courses in this modulestore,
+        which the stores read without loading the courses.
+        '''
+        summaries = {}
+        for store in self.modulestores:
+            # filter out ones which were fetched from earlier stores but locations may not be ==
+            for summary in store.get_course_summaries(**kwargs):
+                course_id = self._clean_locator_for_mapping(summary.id)
+                if course_id not in summaries:
                     # course is indeed unique. save it in result
-                    courses[course_id] = course
-        return courses.keys()
+                    summaries[course_id] = summary
+        return summaries.values()
 
     @strip_key
     def get_libraries(self, **kwargs):
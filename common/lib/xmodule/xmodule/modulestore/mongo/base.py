@@ -15,8 +15,8 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
 import re
+from functools import partial
 from uuid import uuid4
 
 from bson.son import SON
@@ -43,7 +43,9 @@ from xmodule.error_module import ErrorDescriptor
 from xmodule.errortracker import null_error_tracker, exc_info_to_str
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.mako_module import MakoDescriptorSystem
-from xmodule.modulestore import ModuleStoreWriteBase, ModuleStoreEnum, BulkOperationsMixin, BulkOpsRecord
+from xmodule.modulestore import (
+    ModuleStoreWriteBase, ModuleStoreEnum, BulkOperationsMixin, BulkOpsRecord, CourseSummary
+)
 from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished, DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
@@ -77,6 +79,10 @@ _OSFS_INSTANCE = {}
 
 _DETACHED_CATEGORIES = [name for name, __ in XBlock.load_tagged_classes("detached")]
 
+# Number of changes made during a bulk operation beyond which the metadata inheritance tree is
+# recomputed at the end of the operation rather than patched with each change.
+MAX_INHERITANCE_TREE_CHANGES = 20
+
 
 class MongoRevisionKey(object):
     """
@@ -95,6 +101,158 @@ class InvalidWriteError(Exception):
     pass
 
 
+class MetadataInheritanceTree(object):
+    """
+    The metadata each block of a course inherits, for the blocks whose parent is known.
+
+    Each block only stores the inheritable metadata set on it (its overrides) and the url of its parent; the
+    metadata a block inherits is resolved when it is looked up by merging the overrides of its ancestors and its own,
+    and is memoized unless `memoize` is False. The memoized metadata isn't pickled, so the tree is cached (e.g. in the
+    metadata_inheritance_cache_subsystem) as the overrides and parent pointers only.
+
+    Looking up a block returns its metadata like a dict of the inherited metadata of each block would, with the url
+    of its parent under 'parent', keyed by the branch setting the tree was computed with.
+
+    `version` is the version of the course's inheritance the tree reflects, when the caching subsystem keeps one.
+    """
+    def __init__(self, branch, memoize=True, version=None):
+        self.branch = branch
+        self.memoize = memoize
+        self.version = version
+        self._parents = {}
+        self._overrides = {}
+        self._resolved = {}
+        # the urls of the children of each block, built when first needed
+        self._children = None
+
+    def add(self, url, parent_url=None, metadata=None):
+        """
+        Record the block at `url`, with its parent (None for the root of the course) and the inheritable metadata
+        set on it.
+        """
+        if parent_url is not None:
+            self.set_parent(url, parent_url)
+        self.set_metadata(url, metadata)
+
+    def set_parent(self, url, parent_url):
+        """
+        Set the parent of the block at `url`, or detach it from its parent if `parent_url` is None.
+        """
+        old_parent_url = self._parents.get(url)
+        if old_parent_url == parent_url:
+            return
+        if self._children is not None:
+            if old_parent_url is not None:
+                self._children[old_parent_url].discard(url)
+            if parent_url is not None:
+                self._children.setdefault(parent_url, set()).add(url)
+        if parent_url is None:
+            del self._parents[url]
+        else:
+            self._parents[url] = parent_url
+        self._resolved.clear()
+
+    def set_metadata(self, url, metadata):
+        """
+        Set the inheritable metadata set on the block at `url`.
+        """
+        if metadata:
+            self._overrides[url] = metadata
+        else:
+            self._overrides.pop(url, None)
+        self._resolved.clear()
+
+    def set_children(self, url, children):
+        """
+        Make the blocks at the urls in `children` the children of the block at `url`, detaching its other children.
+        Detached blocks keep their own children, in case they are being moved to another parent.
+        """
+        for child in self.get_children(url) - set(children):
+            self.set_parent(child, None)
+        for child in children:
+            self.set_parent(child, url)
+
+    def get_children(self, url):
+        """
+        Return the urls of the children of the block at `url`.
+        """
+        if self._children is None:
+            self._children = {}
+            for child, parent_url in self._parents.iteritems():
+                self._children.setdefault(parent_url, set()).add(child)
+        return set(self._children.get(url, ()))
+
+    def remove(self, url):
+        """
+        Forget the block at `url`, e.g. once it is deleted. Its children are detached from it.
+        """
+        for child in self.get_children(url):
+            self.set_parent(child, None)
+        if url in self._parents:
+            self.set_parent(url, None)
+        self.set_metadata(url, None)
+
+    def _resolve(self, url):
+        """
+        Return the metadata the block at `url` inherits.
+        """
+        if url in self._resolved:
+            return self._resolved[url]
+
+        parent_url = self._parents.get(url)
+        if parent_url is None:
+            metadata = {}
+        else:
+            metadata = dict(self._resolve(parent_url))
+            metadata.pop('parent', None)
+            metadata['parent'] = {self.branch: parent_url}
+        metadata.update(self._overrides.get(url, {}))
+        if self.memoize:
+            self._resolved[url] = metadata
+        return metadata
+
+    def get(self, url, default=None):
+        """
+        Return the metadata the block at `url` inherits, or `default` if its parent isn't known.
+        """
+        if url not in self._parents:
+            return default
+        return self._resolve(url)
+
+    def keys(self):
+        """
+        Return the urls of the blocks whose parent is known.
+        """
+        return self._parents.keys()
+
+    def update(self, other):
+        """
+        Add the blocks of the tree `other`, replacing those already in this tree.
+        """
+        if other is self:
+            return
+        for url in set(other._parents) | set(other._overrides):  # pylint: disable=protected-access
+            self.add(
+                url,
+                other._parents.get(url),  # pylint: disable=protected-access
+                other._overrides.get(url),  # pylint: disable=protected-access
+            )
+
+    def __contains__(self, url):
+        return url in self._parents
+
+    def __len__(self):
+        return len(self._parents)
+
+    def __getstate__(self):
+        return (self.branch, self.memoize, self.version, self._parents, self._overrides)
+
+    def __setstate__(self, state):
+        self.branch, self.memoize, self.version, self._parents, self._overrides = state
+        self._resolved = {}
+        self._children = None
+
+
 class MongoKeyValueStore(InheritanceKeyValueStore):
     """
     A KeyValueStore that maps keyed data access to one of the 3 data areas
@@ -469,6 +627,8 @@ class MongoBulkOpsRecord(BulkOpsRecord):
     def __init__(self):
         super(MongoBulkOpsRecord, self).__init__()
         self.dirty = False
+        # the changes to patch the inheritance tree with, or None if it needs recomputing
+        self.inheritance_changes = []
 
 
 class MongoBulkOpsMixin(BulkOperationsMixin):
@@ -483,6 +643,7 @@ class MongoBulkOpsMixin(BulkOperationsMixin):
         """
         # ensure it starts clean
         bulk_ops_record.dirty = False
+        bulk_ops_record.inheritance_changes = []
 
     def _end_outermost_bulk_operation(self, bulk_ops_record, structure_key):
         """
@@ -491,9 +652,21 @@ class MongoBulkOpsMixin(BulkOperationsMixin):
         """
         dirty = False
         if bulk_ops_record.dirty:
-            self.refresh_cached_metadata_inheritance_tree(structure_key)
+            inheritance_changes = bulk_ops_record.inheritance_changes
+
+            def apply_inheritance_changes(tree):
+                """
+                Patch the inheritance tree with the changes made during the operation.
+                """
+                for changes in inheritance_changes:
+                    changes(tree)
+
+            self.refresh_cached_metadata_inheritance_tree(
+                structure_key, changes=apply_inheritance_changes if inheritance_changes else None
+            )
             dirty = True
             bulk_ops_record.dirty = False  # brand spanking clean now
+            bulk_ops_record.inheritance_changes = []
         return dirty
 
     def _is_in_bulk_operation(self, course_id, ignore_case=False):
@@ -727,38 +900,28 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if location.category == 'course':
                 root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+        # now traverse the tree and record each block's own inheritable metadata and parent
+        tree = MetadataInheritanceTree(self.get_branch_setting())
 
         def _compute_inherited_metadata(url):
             """
-            Helper method for computing inherited metadata for a specific location url
+            Helper method for recording the children of a specific location url
             """
-            my_metadata = results_by_url[url].get('metadata', {})
-
             # go through all the children and recurse, but only if we have
             # in the result set. Remember results will not contain leaf nodes
             for child in results_by_url[url].get('definition', {}).get('children', []):
                 if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
+                    tree.add(child, url, results_by_url[child].get('metadata'))
                     _compute_inherited_metadata(child)
                 else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+                    # this is likely a leaf node, which inherits all of its metadata
+                    tree.add(child, url)
 
         if root is not None:
+            tree.add(root, metadata=results_by_url[root].get('metadata'))
             _compute_inherited_metadata(root)
 
-        return metadata_to_inherit
+        return tree
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
@@ -772,9 +935,20 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if self.request_cache is not None and unicode(course_id) in self.request_cache.data.get('metadata_inheritance', {}):
                 return self.request_cache.data['metadata_inheritance'][unicode(course_id)]
 
+        # the version is only needed by the caching subsystem, and is looked up before computing the
+        # tree so that a change made meanwhile leaves it out of date. A refresh follows a change to the
+        # course, which makes the cached tree out of date.
+        version = self._get_metadata_inheritance_version(course_id, increment=force_refresh)
+        if not force_refresh:
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
                 tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                if not isinstance(tree, MetadataInheritanceTree):
+                    # cached by an earlier release, as a dict of the inherited metadata of each block
+                    tree = {}
+                elif tree.version != version:
+                    # the course was changed since, or a concurrent refresh cached an older tree
+                    tree = {}
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
@@ -784,6 +958,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         if not tree:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
+            tree.version = version
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
             if self.metadata_inheritance_cache_subsystem is not None:
@@ -801,21 +976,150 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, changes=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
+        If given `changes`, a function applying the changes made to the course to a
+        :class:`MetadataInheritanceTree`, the cached tree is patched with it rather than recomputed,
+        unless there is no tree computed with the current branch setting to patch.
+
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
         """
         course_id = course_id.for_branch(None)
-        if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+        if self._is_in_bulk_operation(course_id):
+            # the tree is refreshed at the end of the operation, with the changes made during it
+            bulk_record = self._get_bulk_ops_record(course_id)
+            if changes is None or bulk_record.inheritance_changes is None or \
+                    len(bulk_record.inheritance_changes) >= MAX_INHERITANCE_TREE_CHANGES:
+                bulk_record.inheritance_changes = None
+            else:
+                bulk_record.inheritance_changes.append(changes)
+        else:
+            cached_metadata = None
+            if changes is not None:
+                cached_metadata = self._patch_cached_metadata_inheritance_tree(course_id, changes)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def _patch_cached_metadata_inheritance_tree(self, course_id, changes):
+        """
+        Apply `changes` to the cached metadata inheritance tree of the course, and cache the patched
+        tree. Returns it, or None if no tree computed with the current branch setting is cached.
+        """
+        course_id = self.fill_in_run(course_id)
+        # the caching subsystem is shared by all processes, so patch its tree rather than the request's
+        if self.metadata_inheritance_cache_subsystem is not None:
+            version = self._get_metadata_inheritance_version(course_id, increment=True)
+            if version is None:
+                # without versions, patches made concurrently by other processes could be lost
+                return None
+            tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id))
+            # only patch the tree if it reflects every change but this one: otherwise another process
+            # changed the course too, and its patch may not be cached yet
+            if not isinstance(tree, MetadataInheritanceTree) or tree.version != version - 1:
+                return None
+            tree.version = version
+        elif self.request_cache is not None:
+            tree = self.request_cache.data.get('metadata_inheritance', {}).get(unicode(course_id))
+        else:
+            tree = None
+        if not isinstance(tree, MetadataInheritanceTree) or tree.branch != self.get_branch_setting():
+            return None
+
+        changes(tree)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('metadata_inheritance', {})[unicode(course_id)] = tree
+        return tree
+
+    def _get_metadata_inheritance_version(self, course_id, increment=False):
+        """
+        Return the version of the course's metadata inheritance kept in the caching subsystem, after
+        incrementing it if `increment`, or None if there is no caching subsystem able to keep it.
+
+        The version is incremented atomically each time the course is changed, and cached trees are
+        tagged with the version they reflect, so that processes don't use or patch out of date trees.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is None or not hasattr(cache, 'incr'):
+            return None
+        key = u'{}.inheritance_version'.format(course_id)
+        cache.add(key, 0)
+        if not increment:
+            return cache.get(key)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # evicted since it was added
+            return None
+
+    def _update_inheritance_tree_item(self, location, metadata, children, tree):
+        """
+        Record in the metadata inheritance `tree` that the block at `location` now has the settings
+        `metadata` and, if it is a container, the (serialized) `children`.
+        """
+        if tree.branch == ModuleStoreEnum.Branch.published_only and location.revision == MongoRevisionKey.draft:
+            # the tree is only computed from published blocks
+            return
+        if location.category not in BLOCK_TYPES_WITH_CHILDREN:
+            # leaves only inherit metadata, which doesn't depend on their own
+            return
+
+        url = unicode(as_published(location))
+        self._set_inheritance_tree_metadata(tree, url, metadata)
+        if children is not None:
+            children = list(children)
+            draft_preferred = tree.branch == ModuleStoreEnum.Branch.draft_preferred
+            if draft_preferred and location.category not in DIRECT_ONLY_CATEGORIES:
+                # the tree has the children of both the draft and published versions of the block
+                if location.revision == MongoRevisionKey.draft:
+                    other_location = as_published(location)
+                else:
+                    other_location = as_draft(location)
+                other_item = self.collection.find_one(
+                    {'_id': other_location.to_deprecated_son()}, {'definition.children': 1}
+                )
+                if other_item is not None:
+                    children.extend(other_item.get('definition', {}).get('children', []))
+            tree.set_children(url, children)
+
+    def _remove_from_inheritance_tree(self, location, tree):
+        """
+        Record in the metadata inheritance `tree` that versions of the block at `location` were
+        deleted: the block is removed from it, unless another version of it is left, whose settings
+        and children it then gets.
+        """
+        query = location.to_deprecated_son(prefix='_id.')
+        del query['_id.revision']
+        if tree.branch == ModuleStoreEnum.Branch.published_only:
+            query['_id.revision'] = None
+        remaining_items = list(self.collection.find(query, {'_id': 1, 'metadata': 1, 'definition.children': 1}))
+
+        url = unicode(as_published(location))
+        if not remaining_items:
+            tree.remove(url)
+        elif location.category in BLOCK_TYPES_WITH_CHILDREN:
+            self._set_inheritance_tree_metadata(tree, url, remaining_items[0].get('metadata', {}))
+            tree.set_children(url, [
+                child for item in remaining_items for child in item.get('definition', {}).get('children', [])
+            ])
+
+    def _set_inheritance_tree_metadata(self, tree, url, metadata):
+        """
+        Set the inheritable fields of the settings `metadata` as the metadata of the block at `url`
+        in the metadata inheritance `tree`.
+        """
+        tree.set_metadata(url, dict(
+            (field_name, metadata[field_name]) for field_name in InheritanceMixin.fields if field_name in metadata
+        ))
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -943,7 +1247,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             system = using_descriptor_system
             system.module_data.update(data_cache)
-            system.cached_metadata.update(cached_metadata)
+            if not system.cached_metadata:
+                system.cached_metadata = cached_metadata
+            elif cached_metadata:
+                system.cached_metadata.update(cached_metadata)
 
         return system.load_item(location, for_parent=for_parent)
 
@@ -980,38 +1287,70 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         return apply_cached_metadata
 
     @autoretry_read()
+    def _find_course_records(self, fields=None, **kwargs):
+        """
+        Returns the records of the courses, optionally limited to the `fields` projection. This accepts an optional
+        parameter of 'org' which will apply an efficient filter to only get courses with the specified ORG
+
+        The records are returned as a list, so that they are all read within the retries of `autoretry_read`.
+        """
+        query = {'_id.category': 'course'}
+        course_org_filter = kwargs.get('org')
+        if course_org_filter:
+            query['_id.org'] = course_org_filter
+
+        return [
+            course
+            for course
+            # I tried to add '$and': [{'_id.org': {'$ne': 'edx'}}, {'_id.course': {'$ne': 'templates'}}]
+            # but it didn't do the right thing (it filtered all edx and all templates out)
+            in self.collection.find(query, fields)
+            if not (  # TODO kill this
+                course['_id']['org'] == 'edx' and
+                course['_id']['course'] == 'templates'
+            )
+        ]
+
     def get_courses(self, **kwargs):
         '''
         Returns a list of course descriptors. This accepts an optional parameter of 'org' which
         will apply an efficient filter to only get courses with the specified ORG
         '''
-
-        course_org_filter = kwargs.get('org')
-
-        if course_org_filter:
-            course_records = self.collection.find({'_id.category': 'course', '_id.org': course_org_filter})
-        else:
-            course_records = self.collection.find({'_id.category': 'course'})
-
         base_list = sum(
             [
                 self._load_items(
                     SlashSeparatedCourseKey(course['_id']['org'], course['_id']['course'], course['_id']['name']),
                     [course]
                 )
-                for course
-                # I tried to add '$and': [{'_id.org': {'$ne': 'edx'}}, {'_id.course': {'$ne': 'templates'}}]
-                # but it didn't do the right thing (it filtered all edx and all templates out)
-                in course_records
-                if not (  # TODO kill this
-                    course['_id']['org'] == 'edx' and
-                    course['_id']['course'] == 'templates'
-                )
+                for course in self._find_course_records(**kwargs)
             ],
             []
         )
         return [course for course in base_list if not isinstance(course, ErrorDescriptor)]
 
+    def get_courses_keys(self, **kwargs):
+        """
+        Returns the keys of the courses, fetching only the ids of their records. This accepts the same
+        parameters as `get_courses`.
+        """
+        return [
+            SlashSeparatedCourseKey(course['_id']['org'], course['_id']['course'], course['_id']['name'])
+            for course in self._find_course_records(fields=['_id'], **kwargs)
+        ]
+
+    def get_course_summaries(self, **kwargs):
+        """
+        Returns a :class:`~xmodule.modulestore.CourseSummary` of each course, fetching only the fields needed from
+        their records. This accepts the same parameters as `get_courses`.
+        """
+        fields = ['display_name', 'display_coursenumber', 'display_organization']
+        summaries = []
+        for course in self._find_course_records(fields=['_id'] + ['metadata.' + field for field in fields], **kwargs):
+            location = Location._from_deprecated_son(course['_id'], course['_id']['name'])
+            metadata = course.get('metadata', {})
+            summaries.append(CourseSummary(location, **{field: metadata.get(field) for field in fields}))
+        return summaries
+
     def _find_one(self, location):
         '''Look for a given location in the collection. If the item is not present, raise
         ItemNotFoundError.
@@ -1473,8 +1812,14 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # update the edit info of the instantiated xblock
             xblock._edit_info = payload['edit_info']
 
-            # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            # update the metadata inheritance tree which is cached
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime,
+                changes=partial(
+                    self._update_inheritance_tree_item,
+                    xblock.scope_ids.usage_id, payload['metadata'], payload.get('definition.children'),
+                ),
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -1528,6 +1873,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 ancestor_loc = self._get_raw_parent_location(as_published(current_loc), revision)
                 if ancestor_loc is None:
                     bulk_record.dirty = True
+                    # the inheritance tree isn't patched with this change, so recompute it
+                    bulk_record.inheritance_changes = None
                     # The parent is an orphan, so remove all the children including
                     # the location whose parent we are looking for from orphan parent
                     self.collection.update(
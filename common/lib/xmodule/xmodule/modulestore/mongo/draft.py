@@ -8,6 +8,7 @@ and otherwise returns i4x://org/course/cat/name).
 
 import pymongo
 import logging
+from functools import partial
 
 from opaque_keys.edx.locations import Location
 from openedx.core.lib.cache_utils import memoize_in_request_cache
@@ -433,6 +434,8 @@ class DraftModuleStore(MongoModuleStore):
             item['_id'] = self._id_dict_to_son(item['_id'])
             bulk_record = self._get_bulk_ops_record(location.course_key)
             bulk_record.dirty = True
+            # the inheritance tree isn't patched with this change, so recompute it
+            bulk_record.inheritance_changes = None
             try:
                 self.collection.insert(item)
             except pymongo.errors.DuplicateKeyError:
@@ -605,8 +608,15 @@ class DraftModuleStore(MongoModuleStore):
 
         first_tier = [as_func(location) for as_func in as_functions]
         self._breadth_first(_delete_item, first_tier)
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(location.course_key)
+        # update the metadata inheritance tree which is cached
+        if draft_only:
+            # the published versions of the deleted drafts are left, with their own settings and children,
+            # so recompute it
+            self.refresh_cached_metadata_inheritance_tree(location.course_key)
+        else:
+            self.refresh_cached_metadata_inheritance_tree(
+                location.course_key, changes=partial(self._remove_from_inheritance_tree, location)
+            )
 
     def _breadth_first(self, function, root_usages):
         """
@@ -636,6 +646,8 @@ class DraftModuleStore(MongoModuleStore):
         _internal([root_usage.to_deprecated_son() for root_usage in root_usages])
         if len(to_be_deleted) > 0:
             bulk_record = self._get_bulk_ops_record(root_usages[0].course_key)
+            # the callers account for these removals in the inheritance tree: _delete_subtree patches it,
+            # and _convert_to_draft has it recomputed
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}}, safe=self.collection.safe)
 
@@ -741,6 +753,8 @@ class DraftModuleStore(MongoModuleStore):
         bulk_record = self._get_bulk_ops_record(course_key)
         if len(to_be_deleted) > 0:
             bulk_record.dirty = True
+            # the inheritance tree isn't patched with this change, so recompute it
+            bulk_record.inheritance_changes = None
             self.collection.remove({'_id': {'$in': to_be_deleted}})
 
         self._flag_publish_event(course_key)
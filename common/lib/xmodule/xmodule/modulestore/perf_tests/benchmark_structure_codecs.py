@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Compares the latency and size of the course structure cache codecs (see
+xmodule.modulestore.split_mongo.structure_codecs) on generated courses.
+"""
+
+import datetime
+import gc
+from functools import partial
+import random
+import timeit
+import uuid
+
+from bson.objectid import ObjectId
+from bson.tz_util import utc
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.structure_codecs import (
+    CODECS_BY_NAME, COMPRESSORS_BY_NAME, decode_structure, encode_structure
+)
+
+try:
+    import click
+except ImportError:
+    click = None
+
+
+# Number of children of each block, by block type.
+COURSE_SHAPE = (
+    ('course', 'chapter', 20),
+    ('chapter', 'sequential', 6),
+    ('sequential', 'vertical', 8),
+    ('vertical', None, 4),
+)
+LEAF_TYPES = ('problem', 'html', 'video', 'discussion')
+
+
+def generate_structure(scale=1.0, num_versions=50):
+    """
+    Generate a course structure, with the number of children of each block
+    multiplied by `scale`, edited in `num_versions` different versions.
+    """
+    versions = [
+        (ObjectId(), datetime.datetime.now(utc) - datetime.timedelta(hours=hours))
+        for hours in xrange(num_versions)
+    ]
+    children_by_type = {
+        block_type: (child_type, max(1, int(count * scale)))
+        for block_type, child_type, count in COURSE_SHAPE
+    }
+    blocks = {}
+
+    def add_block(block_type):
+        """Add a block of `block_type` and its descendants, returning its key."""
+        block_key = BlockKey(block_type, uuid.uuid4().hex)
+        fields = {
+            'display_name': u'{} {}'.format(block_type, len(blocks)),
+            'graded': random.choice((True, False)),
+        }
+        if block_type in children_by_type:
+            child_type, count = children_by_type[block_type]
+            fields['children'] = [
+                add_block(child_type or random.choice(LEAF_TYPES))
+                for __ in xrange(count)
+            ]
+        else:
+            fields['weight'] = random.choice((None, 1.0, 2.0))
+            fields['max_attempts'] = random.choice((None, 1, 3))
+
+        update_version, edited_on = random.choice(versions)
+        blocks[block_key] = BlockData(
+            fields=fields,
+            block_type=block_type,
+            definition=ObjectId(),
+            defaults={},
+            edit_info={
+                'previous_version': random.choice(versions)[0],
+                'update_version': update_version,
+                'source_version': None,
+                'edited_on': edited_on,
+                'edited_by': random.randint(1, 10),
+            },
+        )
+        return block_key
+
+    root = add_block('course')
+    return {
+        '_id': versions[0][0],
+        'original_version': versions[-1][0],
+        'previous_version': versions[1][0],
+        'edited_by': 1,
+        'edited_on': versions[0][1],
+        'schema_version': 1,
+        'root': root,
+        'blocks': blocks,
+    }
+
+
+def best_time_ms(func, repeat):
+    """The fastest of `repeat` runs of `func`, in milliseconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def benchmark(structure, repeat=5):
+    """
+    Return a list of (codec, compressor, encode ms, decode ms, size, serialized
+    size) results for every codec and compressor.
+    """
+    results = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for codec_name in sorted(CODECS_BY_NAME):
+            for compressor_name in sorted(COMPRESSORS_BY_NAME):
+                data, serialized_size = encode_structure(structure, codec_name, compressor_name)
+                if decode_structure(data)[0] != structure:
+                    raise AssertionError("{}/{} doesn't round trip".format(codec_name, compressor_name))
+                results.append((
+                    codec_name,
+                    compressor_name,
+                    best_time_ms(partial(encode_structure, structure, codec_name, compressor_name), repeat),
+                    best_time_ms(partial(decode_structure, data), repeat),
+                    len(data),
+                    serialized_size,
+                ))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return results
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.option('--scale',
+                  type=click.FLOAT,
+                  multiple=True,
+                  default=[0.5, 1.0, 2.0],
+                  help="Course size multipliers (1.0 is about 5000 blocks).",
+                  required=False
+                  )
+    @click.option('--repeat',
+                  type=click.INT,
+                  default=5,
+                  help="Number of timed runs per measurement; the fastest is reported.",
+                  required=False
+                  )
+    def cli(scale, repeat):
+        """
+        Prints the encode/decode latency and size of every structure cache codec.
+        """
+        print "{:>7} {:>9} {:>10} {:>10} {:>10} {:>11} {:>11}".format(
+            'blocks', 'codec', 'compressor', 'encode ms', 'decode ms', 'size', 'serialized'
+        )
+        for course_scale in scale:
+            structure = generate_structure(course_scale)
+            for result in benchmark(structure, repeat):
+                print "{:>7} {:>9} {:>10} {:>10.1f} {:>10.1f} {:>11} {:>11}".format(
+                    len(structure['blocks']), *result
+                )
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print "Aborted! Module 'click' is not installed."
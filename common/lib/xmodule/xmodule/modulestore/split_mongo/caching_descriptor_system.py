@@ -79,6 +79,9 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.module_data = module_data
         self.default_class = default_class
         self.local_modules = {}
+        # BlockKey -> (subtree edited on, subtree edited by), computed by _compute_subtree_edited_internal.
+        # They aren't stored in the blocks' edit info, since structures are shared between runtimes.
+        self._subtree_edit_info = {}
         self._services['library_tools'] = LibraryToolsService(modulestore)
 
     @lazy
@@ -274,14 +277,11 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         """
         See :class: cms.lib.xblock.runtime.EditInfoRuntimeMixin
         """
-        # pylint: disable=protected-access
         if not hasattr(xblock, '_subtree_edited_by'):
-            block_data = self.module_data[BlockKey.from_usage_key(xblock.location)]
-            if block_data.edit_info._subtree_edited_by is None:
-                self._compute_subtree_edited_internal(
-                    block_data, xblock.location.course_key
-                )
-            setattr(xblock, '_subtree_edited_by', block_data.edit_info._subtree_edited_by)
+            __, subtree_edited_by = self._compute_subtree_edited_internal(
+                BlockKey.from_usage_key(xblock.location), xblock.location.course_key
+            )
+            setattr(xblock, '_subtree_edited_by', subtree_edited_by)
 
         return getattr(xblock, '_subtree_edited_by')
 
@@ -290,14 +290,11 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         """
         See :class: cms.lib.xblock.runtime.EditInfoRuntimeMixin
         """
-        # pylint: disable=protected-access
         if not hasattr(xblock, '_subtree_edited_on'):
-            block_data = self.module_data[BlockKey.from_usage_key(xblock.location)]
-            if block_data.edit_info._subtree_edited_on is None:
-                self._compute_subtree_edited_internal(
-                    block_data, xblock.location.course_key
-                )
-            setattr(xblock, '_subtree_edited_on', block_data.edit_info._subtree_edited_on)
+            subtree_edited_on, __ = self._compute_subtree_edited_internal(
+                BlockKey.from_usage_key(xblock.location), xblock.location.course_key
+            )
+            setattr(xblock, '_subtree_edited_on', subtree_edited_on)
 
         return getattr(xblock, '_subtree_edited_on')
 
@@ -319,22 +316,26 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
         return getattr(xblock, '_published_on', None)
 
-    @contract(block_data='BlockData')
-    def _compute_subtree_edited_internal(self, block_data, course_key):
+    @contract(block_key='BlockKey')
+    def _compute_subtree_edited_internal(self, block_key, course_key):
         """
         Recurse the subtree finding the max edited_on date and its corresponding edited_by. Cache it.
+
+        Returns an (edited_on, edited_by) tuple.
         """
-        # pylint: disable=protected-access
+        subtree_edit_info = self._subtree_edit_info.get(block_key)
+        if subtree_edit_info is not None:
+            return subtree_edit_info
+
+        block_data = self.get_module_data(block_key, course_key)
         max_date = block_data.edit_info.edited_on
         max_date_by = block_data.edit_info.edited_by
 
         for child in block_data.fields.get('children', []):
-            child_data = self.get_module_data(BlockKey(*child), course_key)
-            if block_data.edit_info._subtree_edited_on is None:
-                self._compute_subtree_edited_internal(child_data, course_key)
-            if child_data.edit_info._subtree_edited_on > max_date:
-                max_date = child_data.edit_info._subtree_edited_on
-                max_date_by = child_data.edit_info._subtree_edited_by
-
-        block_data.edit_info._subtree_edited_on = max_date
-        block_data.edit_info._subtree_edited_by = max_date_by
+            child_edited_on, child_edited_by = self._compute_subtree_edited_internal(BlockKey(*child), course_key)
+            if child_edited_on > max_date:
+                max_date = child_edited_on
+                max_date_by = child_edited_by
+
+        self._subtree_edit_info[block_key] = (max_date, max_date_by)
+        return max_date, max_date_by
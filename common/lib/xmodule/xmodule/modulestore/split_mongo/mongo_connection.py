@@ -1,18 +1,20 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import copy
 import datetime
-import cPickle as pickle
 import math
-import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
+from django.conf import settings
 from django.core.cache import get_cache, InvalidCacheBackendError
 import dogstats_wrapper as dog_stats_api
 
@@ -21,6 +23,7 @@ from mongodb_proxy import autoretry_read, MongoProxy
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.structure_codecs import decode_structure, encode_structure
 
 
 new_contract('BlockData', BlockData)
@@ -207,13 +210,106 @@ def structure_to_mongo(structure, course_context=None):
         return new_structure
 
 
+def copy_structure(structure):
+    """
+    Return a copy of `structure` whose blocks, and their fields and edit info,
+    can be changed without changing `structure`. Field values are shared.
+    """
+    new_structure = dict(structure)
+    new_structure['blocks'] = {}
+    for block_key, block in structure['blocks'].iteritems():
+        new_block = copy.copy(block)
+        new_block.fields = dict(block.fields)
+        new_block.edit_info = copy.copy(block.edit_info)
+        new_structure['blocks'][block_key] = new_block
+    return new_structure
+
+
+class LocalStructureCache(object):
+    """
+    A process-local, least-recently-used cache of deserialized course
+    structures, bounded by the total (serialized) size of the structures in it.
+
+    Structures are immutable by id, so cached structures never go stale; the
+    structures are shared between callers, which must not modify them (split
+    copies blocks before loading their definitions into them). Callers caching
+    a structure they may still change have to cache a copy of it (see
+    `copy_structure`).
+    """
+    def __init__(self, max_bytes, max_item_bytes):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.total_bytes = 0
+        self._structures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the structure cached under `key`, or None."""
+        with self._lock:
+            entry = self._structures.pop(key, None)
+            if entry is None:
+                return None
+            self._structures[key] = entry
+            return entry[0]
+
+    def set(self, key, structure, size):
+        """
+        Cache `structure`, whose serialized size is `size` bytes, under `key`,
+        evicting the least recently used structures to stay under `max_bytes`.
+        """
+        if size > self.max_item_bytes:
+            return
+
+        with self._lock:
+            replaced = self._structures.pop(key, None)
+            if replaced is not None:
+                self.total_bytes -= replaced[1]
+            self._structures[key] = (structure, size)
+            self.total_bytes += size
+
+            while self.total_bytes > self.max_bytes:
+                __, (__, evicted_size) = self._structures.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def clear(self):
+        """Empty the cache."""
+        with self._lock:
+            self._structures.clear()
+            self.total_bytes = 0
+
+
+_LOCAL_STRUCTURE_CACHE = None
+
+
+def local_structure_cache():
+    """
+    Return this process' `LocalStructureCache`, or None if it is turned off
+    by the COURSE_STRUCTURE_LOCAL_CACHE_ENABLED setting.
+    """
+    global _LOCAL_STRUCTURE_CACHE  # pylint: disable=global-statement
+    if not getattr(settings, 'COURSE_STRUCTURE_LOCAL_CACHE_ENABLED', False):
+        return None
+
+    if _LOCAL_STRUCTURE_CACHE is None:
+        _LOCAL_STRUCTURE_CACHE = LocalStructureCache(
+            getattr(settings, 'COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+            getattr(settings, 'COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES', 64 * 1024 * 1024),
+        )
+    return _LOCAL_STRUCTURE_CACHE
+
+
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
-    The course structures are pickled and compressed when cached.
+    The course structures are serialized and compressed when cached, with the
+    codec and compressor named by the COURSE_STRUCTURE_CACHE_CODEC and
+    COURSE_STRUCTURE_CACHE_COMPRESSOR settings (see `structure_codecs`).
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
+
+    If the process-local structure cache is turned on, it is checked before
+    the django cache, and filled from it.
     """
     def __init__(self):
         self.no_cache_found = False
@@ -221,43 +317,124 @@ class CourseStructureCache(object):
             self.cache = get_cache('course_structure_cache')
         except InvalidCacheBackendError:
             self.no_cache_found = True
+        self.local_cache = local_structure_cache()
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """Pull the compressed, serialized struct data from cache and deserialize."""
+        if self.local_cache is not None:
+            with TIMER.timer("CourseStructureCache.get_local", course_context) as tagger:
+                structure = self.local_cache.get(key)
+                tagger.tag(from_cache=str(structure is not None).lower())
+                tagger.measure('local_cache_size', self.local_cache.total_bytes)
+                if structure is not None:
+                    return structure
+
         if self.no_cache_found:
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
-            compressed_pickled_data = self.cache.get(key)
-            tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
+            compressed_data = self.cache.get(key)
+            tagger.tag(from_cache=str(compressed_data is not None).lower())
 
-            if compressed_pickled_data is None:
+            if compressed_data is None:
                 # Always log cache misses, because they are unexpected
                 tagger.sample_rate = 1
                 return None
 
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            tagger.measure('compressed_size', len(compressed_data))
+
+            structure, uncompressed_size = decode_structure(compressed_data)
+            tagger.measure('uncompressed_size', uncompressed_size)
+
+            if self.local_cache is not None:
+                self.local_cache.set(key, copy_structure(structure), uncompressed_size)
+            return structure
 
-            pickled_data = zlib.decompress(compressed_pickled_data)
-            tagger.measure('uncompressed_size', len(pickled_data))
+    def get_many(self, keys, course_context=None):
+        """
+        Pull the structures cached under any of `keys` from cache, with a single
+        request to the django cache, and deserialize them.
+
+        Returns a dict of the cached structures, keyed by their keys.
+        """
+        structures = {}
+        if self.local_cache is not None:
+            with TIMER.timer("CourseStructureCache.get_many_local", course_context) as tagger:
+                for key in keys:
+                    structure = self.local_cache.get(key)
+                    if structure is not None:
+                        structures[key] = structure
+                tagger.measure('requested', len(keys))
+                tagger.measure('found', len(structures))
 
-            return pickle.loads(pickled_data)
+        missing_keys = [key for key in keys if key not in structures]
+        if self.no_cache_found or not missing_keys:
+            return structures
+
+        with TIMER.timer("CourseStructureCache.get_many", course_context) as tagger:
+            cached_data = self.cache.get_many(missing_keys)
+            tagger.measure('requested', len(missing_keys))
+            tagger.measure('found', len(cached_data))
+            if len(cached_data) < len(missing_keys):
+                # Always log cache misses, because they are unexpected
+                tagger.sample_rate = 1
+
+            for key, compressed_data in cached_data.iteritems():
+                structure, uncompressed_size = decode_structure(compressed_data)
+                if self.local_cache is not None:
+                    self.local_cache.set(key, copy_structure(structure), uncompressed_size)
+                structures[key] = structure
+
+        return structures
 
     def set(self, key, structure, course_context=None):
-        """Given a structure, will pickle, compress, and write to cache."""
-        if self.no_cache_found:
+        """Given a structure, will serialize, compress, and write to cache."""
+        if self.no_cache_found and self.local_cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
-            pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            compressed_data, uncompressed_size = encode_structure(
+                structure,
+                getattr(settings, 'COURSE_STRUCTURE_CACHE_CODEC', 'pickle'),
+                getattr(settings, 'COURSE_STRUCTURE_CACHE_COMPRESSOR', 'zlib'),
+            )
+            tagger.measure('uncompressed_size', uncompressed_size)
+            tagger.measure('compressed_size', len(compressed_data))
 
-            # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            if self.local_cache is not None:
+                self.local_cache.set(key, copy_structure(structure), uncompressed_size)
+
+            if self.no_cache_found:
+                return None
 
             # Stuctures are immutable, so we set a timeout of "never"
-            self.cache.set(key, compressed_pickled_data, None)
+            self.cache.set(key, compressed_data, None)
+
+    def set_many(self, structures, course_context=None):
+        """
+        Given a dict of structures keyed by cache key, will serialize, compress,
+        and write them all to cache with a single request.
+        """
+        if self.no_cache_found and self.local_cache is None:
+            return None
+
+        with TIMER.timer("CourseStructureCache.set_many", course_context) as tagger:
+            codec_name = getattr(settings, 'COURSE_STRUCTURE_CACHE_CODEC', 'pickle')
+            compressor_name = getattr(settings, 'COURSE_STRUCTURE_CACHE_COMPRESSOR', 'zlib')
+            compressed_data_by_key = {}
+            for key, structure in structures.iteritems():
+                compressed_data, uncompressed_size = encode_structure(structure, codec_name, compressor_name)
+                if self.local_cache is not None:
+                    self.local_cache.set(key, copy_structure(structure), uncompressed_size)
+                compressed_data_by_key[key] = compressed_data
+            tagger.measure('structures', len(structures))
+            tagger.measure('compressed_size', sum(len(data) for data in compressed_data_by_key.itervalues()))
+
+            if self.no_cache_found:
+                return None
+
+            # Stuctures are immutable, so we set a timeout of "never"
+            self.cache.set_many(compressed_data_by_key, None)
 
 
 class MongoConnection(object):
@@ -336,6 +513,43 @@ class MongoConnection(object):
 
             return structure
 
+    @autoretry_read()
+    def get_structures(self, keys, course_context=None):
+        """
+        Get the structures from the persistence mechanism whose ids are the given keys.
+
+        Cached versions of the structures are used where available, fetched with
+        a single cache request; all the others are fetched with a single query,
+        and then cached.
+
+        Returns a dict of the structures, keyed by id. Ids without a structure
+        are left out.
+        """
+        with TIMER.timer("get_structures", course_context) as tagger_get_structures:
+            keys = list(set(keys))
+            tagger_get_structures.measure("requested_ids", len(keys))
+            cache = CourseStructureCache()
+
+            structures = cache.get_many(keys, course_context)
+            missing_keys = [key for key in keys if key not in structures]
+            tagger_get_structures.measure("cache_misses", len(missing_keys))
+            if missing_keys:
+                # Always log cache misses, because they are unexpected
+                tagger_get_structures.sample_rate = 1
+
+                with TIMER.timer("get_structures.find", course_context) as tagger_find:
+                    found_structures = {}
+                    for doc in self.structures.find({'_id': {'$in': missing_keys}}):
+                        tagger_find.measure("blocks", len(doc['blocks']))
+                        found_structures[doc['_id']] = structure_from_mongo(doc, course_context)
+                    tagger_find.measure("structures", len(found_structures))
+                    tagger_find.sample_rate = 1
+
+                cache.set_many(found_structures, course_context)
+                structures.update(found_structures)
+
+            return structures
+
     @autoretry_read()
     def find_structures_by_id(self, ids, course_context=None):
         """
@@ -57,6 +57,8 @@ import copy
 import datetime
 import hashlib
 import logging
+from itertools import chain
+import threading
 from contracts import contract, new_contract
 from importlib import import_module
 from mongodb_proxy import autoretry_read
@@ -74,7 +76,7 @@ from xmodule.modulestore.exceptions import InsufficientSpecificationError, Versi
     DuplicateCourseError
 from xmodule.modulestore import (
     inheritance, ModuleStoreWriteBase, ModuleStoreEnum,
-    BulkOpsRecord, BulkOperationsMixin, SortedAssetList, BlockData
+    BulkOpsRecord, BulkOperationsMixin, SortedAssetList, BlockData, CourseSummary
 )
 
 from ..exceptions import ItemNotFoundError
@@ -82,7 +84,7 @@ from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.error_module import ErrorDescriptor
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from types import NoneType
 from xmodule.assetstore import AssetMetadata
 
@@ -110,6 +112,9 @@ log = logging.getLogger(__name__)
 # When blacklists are this, all children should be excluded
 EXCLUDE_ALL = '*'
 
+# Number of structures whose indexes (of each kind) are cached by each process
+STRUCTURE_INDEX_CACHE_SIZE = 50
+
 
 new_contract('BlockUsageLocator', BlockUsageLocator)
 new_contract('BlockKey', BlockKey)
@@ -172,6 +177,103 @@ class SplitBulkWriteRecord(BulkOpsRecord):
         )
 
 
+def build_parent_index(blocks):
+    """
+    Return a dict mapping the key of each child in `blocks` to the keys of
+    its parents, in the order of `blocks`.
+    """
+    parent_index = {}
+    for parent_key, block_data in blocks.iteritems():
+        for child in block_data.fields.get('children', []):
+            parents = parent_index.setdefault(BlockKey(*child), [])
+            # A block may list the same child more than once
+            if not parents or parents[-1] != parent_key:
+                parents.append(parent_key)
+    return parent_index
+
+
+class BlockQueryIndex(object):
+    """
+    Secondary indexes of the blocks of a structure, which `get_items` uses to
+    find the blocks that may match a query without checking every block. Each
+    maps a value to the keys of the blocks having it, in the order of `blocks`.
+    """
+    def __init__(self, blocks):
+        by_type = defaultdict(list)
+        by_id = defaultdict(list)
+        by_field = defaultdict(list)
+        for block_key, block_data in blocks.iteritems():
+            by_type[block_data.block_type].append(block_key)
+            by_id[block_key.id].append(block_key)
+            for field_name in block_data.fields:
+                by_field[field_name].append(block_key)
+
+        # block_type -> blocks of that type
+        self.by_type = dict(by_type)
+        # block_id -> blocks with that id
+        self.by_id = dict(by_id)
+        # settings field name (or 'children') -> blocks on which it is set
+        self.by_field = dict(by_field)
+
+
+class StructureIndexCache(object):
+    """
+    A process-local, least-recently-used cache of indexes of structures,
+    built by `build_index` from their blocks and keyed by structure id.
+
+    Saved structures are immutable, so their indexes never go stale. Structures
+    are only changed after being versioned and before being saved, so the
+    indexes of structures are dropped whenever they are versioned or saved
+    (see `invalidate_structure_indexes`). Code that uses an index while
+    changing a structure must update it.
+    """
+    def __init__(self, build_index, max_size):
+        self.build_index = build_index
+        self.max_size = max_size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, structure):
+        """
+        Return the index of `structure`, building it if it isn't cached.
+        """
+        structure_id = structure['_id']
+        with self._lock:
+            index = self._indexes.pop(structure_id, None)
+            if index is not None:
+                self._indexes[structure_id] = index
+                return index
+
+        index = self.build_index(structure['blocks'])
+        with self._lock:
+            self._indexes[structure_id] = index
+            while len(self._indexes) > self.max_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, structure_id):
+        """Drop the index of the structure `structure_id`."""
+        with self._lock:
+            self._indexes.pop(structure_id, None)
+
+    def clear(self):
+        """Empty the cache."""
+        with self._lock:
+            self._indexes.clear()
+
+
+PARENT_INDEXES = StructureIndexCache(build_parent_index, STRUCTURE_INDEX_CACHE_SIZE)
+QUERY_INDEXES = StructureIndexCache(BlockQueryIndex, STRUCTURE_INDEX_CACHE_SIZE)
+
+
+def invalidate_structure_indexes(structure_id):
+    """
+    Drop the cached indexes of the structure `structure_id`, which is being changed.
+    """
+    PARENT_INDEXES.invalidate(structure_id)
+    QUERY_INDEXES.invalidate(structure_id)
+
+
 class SplitBulkWriteMixin(BulkOperationsMixin):
     """
     This implements the :meth:`bulk_operations` modulestore semantics for the :class:`SplitMongoModuleStore`.
@@ -338,6 +440,7 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         (no data will be written to the database if a bulk operation is active.)
         """
         self._clear_cache(structure['_id'])
+        invalidate_structure_indexes(structure['_id'])
         bulk_write_record = self._get_bulk_ops_record(course_key)
         if bulk_write_record.active:
             bulk_write_record.structures[structure['_id']] = structure
@@ -421,6 +524,9 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         if bulk_write_record.active:
             # Only query for the definitions that aren't already cached.
             for definition in bulk_write_record.definitions.values():
+                # Definitions that weren't found are cached as None
+                if definition is None:
+                    continue
                 definition_id = definition.get('_id')
                 if definition_id in ids:
                     ids.remove(definition_id)
@@ -456,7 +562,10 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
 
         # If we have an active bulk write, and it's already been edited, then just use that structure
         if bulk_write_record.active and course_key.branch in bulk_write_record.dirty_branches:
-            return bulk_write_record.structure_for_branch(course_key.branch)
+            structure = bulk_write_record.structure_for_branch(course_key.branch)
+            # The caller is about to change it
+            invalidate_structure_indexes(structure['_id'])
+            return structure
 
         # Otherwise, make a new structure
         new_structure = copy.deepcopy(structure)
@@ -558,7 +667,7 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
                     ids.remove(structure_id)
                     structures.append(structure)
 
-        structures.extend(self.db_connection.find_structures_by_id(list(ids)))
+        structures.extend(self.db_connection.get_structures(list(ids)).itervalues())
         return structures
 
     def find_structures_derived_from(self, ids):
@@ -735,12 +844,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 definitions = {definition['_id']: definition
                                for definition in descendent_definitions}
 
-                for block in new_module_data.itervalues():
+                for block_key, block in new_module_data.items():
                     if block.definition in definitions:
                         definition = definitions[block.definition]
+                        # The blocks of the structure are shared (e.g. by the structure caches),
+                        # so the definition's fields are loaded into a copy of the block.
+                        loaded_block = copy.copy(block)
                         # convert_fields gets done later in the runtime's xblock_from_json
-                        block.fields.update(definition.get('fields'))
-                        block.definition_loaded = True
+                        loaded_block.fields = dict(block.fields)
+                        loaded_block.fields.update(definition.get('fields'))
+                        loaded_block.definition_loaded = True
+                        new_module_data[block_key] = loaded_block
 
             system.module_data.update(new_module_data)
             return system.module_data
@@ -931,6 +1045,40 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # get the blocks for each course index (s/b the root)
         return self._get_structures_for_branch_and_locator(branch, self._create_course_locator, **kwargs)
 
+    @autoretry_read()
+    def get_courses_keys(self, branch, **kwargs):
+        """
+        Returns the keys of the courses on `branch`, read from the course
+        indexes alone: no structure or definition is loaded.
+
+        :param branch: the branch for which to return course keys.
+        """
+        return [
+            self._create_course_locator(course_index, branch)
+            for course_index in self.find_matching_course_indexes(branch, org_target=kwargs.get('org'))
+        ]
+
+    @autoretry_read()
+    def get_course_summaries(self, branch, **kwargs):
+        """
+        Returns a :class:`~xmodule.modulestore.CourseSummary` of each course on
+        `branch`, read from the settings of the root block of its structure
+        without loading any xblock or definition.
+
+        :param branch: the branch for which to return course summaries.
+        """
+        summaries = []
+        for structure, course_index in self._get_structures_for_branch(branch, **kwargs):
+            root = BlockKey(*structure['root'])
+            fields = structure['blocks'][root].fields if root in structure['blocks'] else {}
+            summaries.append(CourseSummary(
+                self._create_course_locator(course_index, branch).make_usage_key(root.type, root.id),
+                display_name=fields.get('display_name'),
+                display_coursenumber=fields.get('display_coursenumber'),
+                display_organization=fields.get('display_organization'),
+            ))
+        return summaries
+
     def get_libraries(self, branch="library", **kwargs):
         """
         Returns a list of "library" root blocks matching any given qualifiers.
@@ -1075,34 +1223,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return []
 
         course = self._lookup_course(course_locator)
-        items = []
         qualifiers = qualifiers.copy() if qualifiers else {}  # copy the qualifiers (destructively manipulated here)
-
-        def _block_matches_all(block_data):
-            """
-            Check that the block matches all the criteria
-            """
-            # do the checks which don't require loading any additional data
-            if (  # pylint: disable=bad-continuation
-                self._block_matches(block_data, qualifiers) and
-                self._block_matches(block_data.fields, settings)
-            ):
-                if content:
-                    definition_block = self.get_definition(course_locator, block_data.definition)
-                    return self._block_matches(definition_block['fields'], content)
-                else:
-                    return True
+        query_index = QUERY_INDEXES.get(course.structure)
 
         if settings is None:
             settings = {}
         if 'name' in qualifiers:
             # odd case where we don't search just confirm
             block_name = qualifiers.pop('name')
-            block_ids = []
-            for block_id, block in course.structure['blocks'].iteritems():
-                if block_name == block_id.id and _block_matches_all(block):
-                    block_ids.append(block_id)
-
+            block_ids = self._find_matching_blocks(
+                course_locator, course.structure, query_index.by_id.get(block_name, []), qualifiers, settings, content
+            )
             return self._load_items(course, block_ids, **kwargs)
 
         if 'category' in qualifiers:
@@ -1111,15 +1242,72 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
-                items.append(block_id)
+
+        candidates = self._get_candidate_blocks(course.structure, query_index, qualifiers, settings)
+        items = self._find_matching_blocks(course_locator, course.structure, candidates, qualifiers, settings, content)
 
         if len(items) > 0:
             return self._load_items(course, items, depth=0, **kwargs)
         else:
             return []
 
+    def _get_candidate_blocks(self, structure, query_index, qualifiers, settings):
+        """
+        Return the keys of the blocks of `structure` that may match the `qualifiers` and `settings`
+        of a `get_items` query: the fewest the `query_index` can narrow them to. They still have to
+        be checked.
+        """
+        candidate_lists = []
+
+        block_type = qualifiers.get('block_type')
+        if isinstance(block_type, basestring):
+            candidate_lists.append(query_index.by_type.get(block_type, []))
+        elif isinstance(block_type, dict) and '$in' in block_type and all(
+            isinstance(value, basestring) for value in block_type['$in']
+        ):
+            candidate_lists.append(list(chain.from_iterable(
+                query_index.by_type.get(value, []) for value in OrderedDict.fromkeys(block_type['$in'])
+            )))
+
+        for field_name, criteria in settings.iteritems():
+            # Blocks only match criteria other than {'$exists': False} if the field is set on them
+            if not (isinstance(criteria, dict) and criteria.get('$exists') is False):
+                candidate_lists.append(query_index.by_field.get(field_name, []))
+
+        if not candidate_lists:
+            return structure['blocks'].keys()
+        return min(candidate_lists, key=len)
+
+    def _find_matching_blocks(self, course_key, structure, candidates, qualifiers, settings, content):
+        """
+        Return the keys of the `candidates` blocks of `structure` that match the `qualifiers`,
+        `settings` and `content` of a `get_items` query. The definitions needed to check `content`
+        are loaded together.
+
+        Raises ItemNotFoundError if the definition of a block is missing.
+        """
+        blocks = structure['blocks']
+        # do the checks which don't require loading any additional data
+        matches = [
+            block_key for block_key in candidates
+            if self._block_matches(blocks[block_key], qualifiers) and
+            self._block_matches(blocks[block_key].fields, settings)
+        ]
+        if not content or not matches:
+            return matches
+
+        definitions = {
+            definition['_id']: definition
+            for definition in self.get_definitions(course_key, [blocks[block_key].definition for block_key in matches])
+        }
+        for block_key in matches:
+            if blocks[block_key].definition not in definitions:
+                raise ItemNotFoundError(blocks[block_key].definition)
+        return [
+            block_key for block_key in matches
+            if self._block_matches(definitions[blocks[block_key].definition]['fields'], content)
+        ]
+
     def get_parent_location(self, locator, **kwargs):
         """
         Return the location (Locators w/ block_ids) for the parent of this location in this
@@ -1152,18 +1340,14 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # The supplied CourseKey is of the wrong type, so it can't possibly be stored in this modulestore.
             raise ItemNotFoundError(course_key)
 
-        detached_categories = [name for name, __ in XBlock.load_tagged_classes("detached")]
+        detached_categories = set(name for name, __ in XBlock.load_tagged_classes("detached"))
         course = self._lookup_course(course_key)
-        items = set(course.structure['blocks'].keys())
-        items.remove(course.structure['root'])
-        blocks = course.structure['blocks']
-        for block_id, block_data in blocks.iteritems():
-            items.difference_update(BlockKey(*child) for child in block_data.fields.get('children', []))
-            if block_data.block_type in detached_categories:
-                items.discard(block_id)
+        root = course.structure['root']
+        parent_index = PARENT_INDEXES.get(course.structure)
         return [
             course_key.make_usage_key(block_type=block_id.type, block_id=block_id.id)
-            for block_id in items
+            for block_id, block_data in course.structure['blocks'].iteritems()
+            if block_id != root and block_data.block_type not in detached_categories and not parent_index.get(block_id)
         ]
 
     def get_course_index_info(self, course_key):
@@ -2899,11 +3083,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         Given a structure, find block_key's parent in that structure. Note returns
         the encoded format for parent
         """
-        return [
-            parent_block_key
-            for parent_block_key, value in structure['blocks'].iteritems()
-            if block_key in value.fields.get('children', [])
-        ]
+        return list(PARENT_INDEXES.get(structure).get(block_key, []))
 
     def _sync_children(self, source_parent, destination_parent, new_child):
         """
@@ -3010,10 +3190,16 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         """
         Delete the orphan and any of its descendants which no longer have parents.
         """
-        if len(self._get_parents_from_structure(orphan, structure)) == 0:
-            for child in structure['blocks'][orphan].fields.get('children', []):
-                self._delete_if_true_orphan(BlockKey(*child), structure)
+        parent_index = PARENT_INDEXES.get(structure)
+        if not parent_index.get(orphan):
+            children = [BlockKey(*child) for child in structure['blocks'][orphan].fields.get('children', [])]
+            for child in children:
+                self._delete_if_true_orphan(child, structure)
             del structure['blocks'][orphan]
+            # Keep the index of the structure being changed up to date
+            for child in children:
+                if orphan in parent_index.get(child, []):
+                    parent_index[child].remove(orphan)
 
     @contract(returns=BlockData)
     def _new_block(self, user_id, category, block_fields, definition_id, new_id, raw=False, block_defaults=None):
@@ -0,0 +1,280 @@
+"""
+Codecs used to serialize course structures for the `CourseStructureCache`.
+
+Structures are cached as zlib-compressed pickles, as they were before
+codecs were introduced, so that servers which predate the codecs can still
+read them. Structures written with any other codec or compressor start with
+a two byte header instead: the id of the codec that serialized it and the
+id of the compressor that compressed it. Those are told apart from the
+untagged zlib streams by their first byte.
+"""
+import cPickle as pickle
+import datetime
+import marshal
+import zlib
+
+import pytz
+from bson.objectid import ObjectId
+
+from xmodule.modulestore import BlockData, EditInfo
+from xmodule.modulestore.split_mongo import BlockKey
+
+
+# The first byte of every zlib stream compressed with the default window size,
+# and so of every structure cached before codecs were introduced.
+LEGACY_ZLIB_HEADER = '\x78'
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+class UnsupportedStructure(ValueError):
+    """
+    Raised by a codec that can't serialize a particular structure.
+    """
+    pass
+
+
+class PickleCodec(object):
+    """
+    Serializes structures with pickle, as they were before codecs were
+    introduced. This can serialize any structure.
+    """
+    codec_id = 1
+    name = 'pickle'
+
+    def dumps(self, structure):
+        """Serialize `structure` to a string."""
+        return pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        """Deserialize a structure serialized by `dumps`."""
+        return pickle.loads(data)
+
+
+class ColumnarCodec(object):
+    """
+    Serializes structures as plain python values with marshal, which loads
+    a lot faster than pickle, converting the BlockData and EditInfo objects
+    of the blocks into rows of values, and block types into indexes into a
+    table of types.
+
+    The structure's own (top level) fields are few and small, so they are
+    pickled. Structures with block values marshal can't handle are rejected
+    with `UnsupportedStructure`.
+    """
+    codec_id = 2
+    name = 'columnar'
+
+    def dumps(self, structure):
+        """Serialize `structure` to a string."""
+        block_types = _ValueTable()
+        object_ids = _ValueTable(_dump_object_id)
+        datetimes = _ValueTable(_dump_datetime)
+
+        def block_key_row(block_key):
+            """Return `block_key` as a (type index, block id) tuple."""
+            return (block_types.index(block_key.type), block_key.id)
+
+        rows = []
+        for block_key, block in structure['blocks'].iteritems():
+            fields = block.fields
+            if 'children' in fields:
+                fields = dict(fields)
+                fields['children'] = [block_key_row(child) for child in fields['children']]
+
+            edit_info = block.edit_info
+            rows.append((
+                block_key_row(block_key),
+                block_types.index(block.block_type),
+                fields,
+                object_ids.index(block.definition),
+                block.defaults,
+                block.definition_loaded,
+                object_ids.index(edit_info.previous_version),
+                object_ids.index(edit_info.update_version),
+                object_ids.index(edit_info.source_version),
+                datetimes.index(edit_info.edited_on),
+                edit_info.edited_by,
+                edit_info.original_usage,
+                object_ids.index(edit_info.original_usage_version),
+                datetimes.index(edit_info._subtree_edited_on),  # pylint: disable=protected-access
+                edit_info._subtree_edited_by,  # pylint: disable=protected-access
+            ))
+
+        header = {key: value for key, value in structure.iteritems() if key not in ('root', 'blocks')}
+        try:
+            return marshal.dumps((
+                pickle.dumps(header, pickle.HIGHEST_PROTOCOL),
+                block_key_row(structure['root']),
+                block_types.values,
+                object_ids.values,
+                datetimes.values,
+                rows,
+            ))
+        except ValueError as exc:
+            raise UnsupportedStructure(exc.message)
+
+    def loads(self, data):
+        """Deserialize a structure serialized by `dumps`."""
+        pickled_header, root, block_types, object_ids, datetimes, rows = marshal.loads(data)
+        # Index -1 (the last item) stands for None
+        block_types.append(None)
+        object_ids = [ObjectId(object_id) for object_id in object_ids] + [None]
+        datetimes = [EPOCH + datetime.timedelta(microseconds=value) for value in datetimes] + [None]
+        block_keys = {}
+
+        def block_key(row):
+            """Inverse of `block_key_row`, sharing equal keys."""
+            key = block_keys.get(row)
+            if key is None:
+                key = block_keys[row] = BlockKey(block_types[row[0]], row[1])
+            return key
+
+        structure = pickle.loads(pickled_header)
+        structure['root'] = block_key(root)
+        blocks = structure['blocks'] = {}
+        for (
+            key_row, block_type, fields, definition, defaults, definition_loaded,
+            previous_version, update_version, source_version, edited_on, edited_by,
+            original_usage, original_usage_version, subtree_edited_on, subtree_edited_by,
+        ) in rows:
+            if 'children' in fields:
+                fields['children'] = [block_key(tuple(child)) for child in fields['children']]
+            # Build the objects the way unpickling them would, without
+            # running their constructors.
+            edit_info = EditInfo.__new__(EditInfo)
+            edit_info.__dict__ = {
+                'previous_version': object_ids[previous_version],
+                'update_version': object_ids[update_version],
+                'source_version': object_ids[source_version],
+                'edited_on': datetimes[edited_on],
+                'edited_by': edited_by,
+                'original_usage': original_usage,
+                'original_usage_version': object_ids[original_usage_version],
+                '_subtree_edited_on': datetimes[subtree_edited_on],
+                '_subtree_edited_by': subtree_edited_by,
+            }
+            block = BlockData.__new__(BlockData)
+            block.__dict__ = {
+                'fields': fields,
+                'block_type': block_types[block_type],
+                'definition': object_ids[definition],
+                'defaults': defaults,
+                'edit_info': edit_info,
+                'definition_loaded': definition_loaded,
+            }
+            blocks[block_key(key_row)] = block
+
+        return structure
+
+
+class _ValueTable(object):
+    """
+    A table of the distinct values of some kind in a structure, so that each
+    is only serialized (and deserialized) once. Values are referred to by
+    their index in the table; None is referred to as -1.
+    """
+    def __init__(self, dump=lambda value: value):
+        self.values = []
+        self._indexes = {}
+        self._dump = dump
+
+    def index(self, value):
+        """Return the index of `value`, adding it to the table if needed."""
+        if value is None:
+            return -1
+        index = self._indexes.get(value)
+        if index is None:
+            index = self._indexes[value] = len(self.values)
+            self.values.append(self._dump(value))
+        return index
+
+
+def _dump_object_id(value):
+    """Return an ObjectId as a marshallable value."""
+    if not isinstance(value, ObjectId):
+        raise UnsupportedStructure(u"Can't serialize {!r} as an ObjectId".format(value))
+    return value.binary
+
+
+def _dump_datetime(value):
+    """Return a timezone aware datetime as microseconds since the epoch."""
+    if not isinstance(value, datetime.datetime) or value.tzinfo is None:
+        raise UnsupportedStructure(u"Can't serialize {!r} as a datetime".format(value))
+    delta = value - EPOCH
+    return (delta.days * 24 * 60 * 60 + delta.seconds) * 1000000 + delta.microseconds
+
+
+class NoCompressor(object):
+    """Leaves serialized structures uncompressed."""
+    compressor_id = 0
+    name = 'none'
+
+    def compress(self, data):  # pylint: disable=missing-docstring
+        return data
+
+    def decompress(self, data):  # pylint: disable=missing-docstring
+        return data
+
+
+class ZlibCompressor(object):
+    """Compresses serialized structures with zlib, at its fastest level."""
+    compressor_id = 1
+    name = 'zlib'
+
+    def compress(self, data):  # pylint: disable=missing-docstring
+        # 1 = Fastest (slightly larger results)
+        return zlib.compress(data, 1)
+
+    def decompress(self, data):  # pylint: disable=missing-docstring
+        return zlib.decompress(data)
+
+
+CODECS = {codec.codec_id: codec for codec in (PickleCodec(), ColumnarCodec())}
+COMPRESSORS = {compressor.compressor_id: compressor for compressor in (NoCompressor(), ZlibCompressor())}
+
+CODECS_BY_NAME = {codec.name: codec for codec in CODECS.itervalues()}
+COMPRESSORS_BY_NAME = {compressor.name: compressor for compressor in COMPRESSORS.itervalues()}
+
+
+def encode_structure(structure, codec_name='pickle', compressor_name='zlib'):
+    """
+    Serialize and compress `structure` with the named codec and compressor.
+
+    Structures the codec can't serialize are pickled instead. Pickled,
+    zlib-compressed structures are written without a header, in the format
+    used before codecs were introduced.
+
+    Returns a `(data, serialized_size)` tuple, where `serialized_size` is the
+    size of the structure before compression.
+    """
+    codec = CODECS_BY_NAME[codec_name]
+    compressor = COMPRESSORS_BY_NAME[compressor_name]
+    try:
+        serialized = codec.dumps(structure)
+    except UnsupportedStructure:
+        codec = CODECS_BY_NAME[PickleCodec.name]
+        serialized = codec.dumps(structure)
+
+    if codec.name == PickleCodec.name and compressor.name == ZlibCompressor.name:
+        return compressor.compress(serialized), len(serialized)
+
+    data = chr(codec.codec_id) + chr(compressor.compressor_id) + compressor.compress(serialized)
+    return data, len(serialized)
+
+
+def decode_structure(data):
+    """
+    Decompress and deserialize a structure encoded by `encode_structure`, or
+    cached before codecs were introduced.
+
+    Returns a `(structure, serialized_size)` tuple, where `serialized_size` is
+    the size of the structure before compression.
+    """
+    if data[0] == LEGACY_ZLIB_HEADER:
+        codec, serialized = CODECS_BY_NAME[PickleCodec.name], zlib.decompress(data)
+    else:
+        codec = CODECS[ord(data[0])]
+        serialized = COMPRESSORS[ord(data[1])].decompress(data[2:])
+
+    return codec.loads(serialized), len(serialized)
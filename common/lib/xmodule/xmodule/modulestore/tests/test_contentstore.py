@@ -2,6 +2,7 @@
  Test contentstore.mongo functionality
 """
 import logging
+import os
 from uuid import uuid4
 import unittest
 import mimetypes
@@ -14,8 +15,10 @@ from opaque_keys.edx.keys import AssetKey
 from xmodule.tests import DATA_DIR
 from xmodule.contentstore.mongo import MongoContentStore
 from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.disk_cache import AssetDiskCache
 from xmodule.exceptions import NotFoundError
 import ddt
+from mock import patch
 from __builtin__ import delattr
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 
@@ -124,6 +127,55 @@ class TestContentstore(unittest.TestCase):
             "Found unknown asset {}".format(unknown_asset)
         )
 
+    def set_up_disk_cache(self):
+        """
+        Put a disk cache in front of the contentstore.
+        """
+        directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.contentstore.disk_cache = AssetDiskCache(directory, 1024 * 1024, 1024 * 1024)
+
+    @ddt.data(True, False)
+    def test_find_disk_cached(self, deprecated):
+        """
+        Test that found assets are cached on disk, and read from there.
+        """
+        self.set_up_assets(deprecated)
+        self.set_up_disk_cache()
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[1])
+        data = self.contentstore.find(asset_key).data
+        with open("{}/static/{}".format(DATA_DIR, self.course1_files[1]), "rb") as asset_file:
+            self.assertEqual(data, asset_file.read())
+
+        with patch('gridfs.grid_file.GridOut.read') as mock_read:
+            self.assertEqual(self.contentstore.find(asset_key).data, data)
+            content = self.contentstore.find(asset_key, as_stream=True)
+            self.assertEqual(''.join(content.stream_data()), data)
+            self.assertEqual(''.join(content.stream_data_in_range(10, 99)), data[10:100])
+            content.close()
+        self.assertFalse(mock_read.called)
+
+    @ddt.data(True, False)
+    def test_save_and_delete_disk_cached(self, deprecated):
+        """
+        Test that saving and deleting assets removes them from the disk cache.
+        """
+        self.set_up_assets(deprecated)
+        self.set_up_disk_cache()
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[1])
+        self.contentstore.find(asset_key)
+        self.assertEqual(len(os.listdir(self.contentstore.disk_cache.directory)), 1)
+
+        self.save_asset(self.course1_files[2], asset_key, self.course1_files[1], False)
+        self.assertEqual(os.listdir(self.contentstore.disk_cache.directory), [])
+        with open("{}/static/{}".format(DATA_DIR, self.course1_files[2]), "rb") as asset_file:
+            self.assertEqual(self.contentstore.find(asset_key).data, asset_file.read())
+
+        self.contentstore.delete(asset_key)
+        self.assertEqual(os.listdir(self.contentstore.disk_cache.directory), [])
+        with self.assertRaises(NotFoundError):
+            self.contentstore.find(asset_key)
+
     @ddt.data(True, False)
     def test_export_for_course(self, deprecated):
         """
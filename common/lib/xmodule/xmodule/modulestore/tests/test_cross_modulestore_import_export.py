@@ -78,6 +78,31 @@ class MemoryCache(object):
         """
         self._data[key] = value
 
+    def add(self, key, value):
+        """
+        Set a key in the cache, unless it is already set.
+
+        Args:
+            key: The key to add.
+            value: The value to set it to.
+        """
+        if key in self._data:
+            return False
+        self._data[key] = value
+        return True
+
+    def incr(self, key):
+        """
+        Increment the integer value of a key, and return it.
+
+        Args:
+            key: The key to increment. Raises ValueError if it isn't set.
+        """
+        if key not in self._data:
+            raise ValueError("Key '{}' not found".format(key))
+        self._data[key] += 1
+        return self._data[key]
+
 
 class MongoContentstoreBuilder(object):
     """
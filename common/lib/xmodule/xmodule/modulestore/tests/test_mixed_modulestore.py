@@ -9,7 +9,7 @@ import itertools
 import mimetypes
 from uuid import uuid4
 from contextlib import contextmanager
-from mock import patch
+from mock import Mock, patch
 
 # Mixed modulestore depends on django, so we'll manually configure some django settings
 # before importing the module
@@ -26,7 +26,7 @@ from tempfile import mkdtemp
 from xmodule.x_module import XModuleMixin
 from xmodule.modulestore.edit_info import EditInfoMixin
 from xmodule.modulestore.inheritance import InheritanceMixin
-from xmodule.modulestore.tests.test_cross_modulestore_import_export import MongoContentstoreBuilder
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import MongoContentstoreBuilder, MemoryCache
 from xmodule.contentstore.content import StaticContent
 from opaque_keys.edx.keys import CourseKey
 from xmodule.modulestore.xml_importer import import_course_from_xml
@@ -44,8 +44,8 @@ from xmodule.modulestore.draft_and_published import UnsupportedRevisionError, DI
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError, NoPathToItem
 from xmodule.modulestore.mixed import MixedModuleStore
 from xmodule.modulestore.search import path_to_location, navigation_index
-from xmodule.modulestore.tests.factories import check_mongo_calls, check_exact_number_of_calls, \
-    mongo_uses_error_check
+from xmodule.modulestore.tests.factories import check_mongo_calls, check_mongo_calls_range, \
+    check_exact_number_of_calls, mongo_uses_error_check
 from xmodule.modulestore.tests.utils import create_modulestore_instance, LocationMixin, mock_tab_from_json
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.tests import DATA_DIR, CourseComparisonTest
@@ -989,6 +989,65 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
             published_courses = self.store.get_courses(remove_branch=True)
         self.assertEquals([c.id for c in draft_courses], [c.id for c in published_courses])
 
+    # Each store is queried once for its course ids: draft mongo with a projection
+    # of the course records, split with its active_versions
+    @ddt.data('draft', 'split')
+    def test_get_courses_keys(self, default_ms):
+        self.initdb(default_ms)
+        expected_keys = [course.id for course in self.store.get_courses()]
+        with check_mongo_calls(2):
+            course_keys = self.store.get_courses_keys()
+        self.assertItemsEqual(course_keys, expected_keys)
+        self.assertIn(self.course_locations[self.MONGO_COURSEID].course_key, course_keys)
+
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only):
+            self.assertItemsEqual(self.store.get_courses_keys(), course_keys)
+
+    def test_get_courses_keys_retries_reads(self):
+        """
+        Test that reading the course records is retried when the connection is lost while reading them.
+        """
+        # pylint: disable=protected-access
+        self.initdb('draft')
+        mongo_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        expected_keys = mongo_store.get_courses_keys()
+        collection = mongo_store.collection
+
+        def records_of_lost_connection():
+            """Lose the connection once the first records are being read."""
+            raise pymongo.errors.AutoReconnect()
+            yield  # pylint: disable=unreachable
+
+        def find(*args, **kwargs):
+            """Lose the connection on the first read only."""
+            if mock_collection.find.call_count == 1:
+                return records_of_lost_connection()
+            return collection.find(*args, **kwargs)
+
+        with patch.object(mongo_store, 'collection', Mock(wraps=collection)) as mock_collection:
+            mock_collection.find.side_effect = find
+            self.assertItemsEqual(mongo_store.get_courses_keys(), expected_keys)
+        self.assertEqual(mock_collection.find.call_count, 2)
+
+    # Draft mongo reads the summaries from a projection of the course records, split
+    # from its active_versions and the structures: no definitions are loaded
+    @ddt.data('draft', 'split')
+    def test_get_course_summaries(self, default_ms):
+        self.initdb(default_ms)
+        courses = {course.id: course for course in self.store.get_courses()}
+        with check_mongo_calls_range(max_finds=3):
+            summaries = self.store.get_course_summaries()
+        self.assertItemsEqual([summary.id for summary in summaries], courses.keys())
+        for summary in summaries:
+            course = courses[summary.id]
+            self.assertEqual(summary.location, course.location)
+            if course.fields['display_name'].is_set_on(course):
+                self.assertEqual(summary.display_name, course.display_name)
+            else:
+                self.assertIsNone(summary.display_name)
+            self.assertEqual(summary.display_org_with_default, course.display_org_with_default)
+            self.assertEqual(summary.display_number_with_default, course.display_number_with_default)
+
     @ddt.data('draft', 'split')
     def test_create_child_detached_tabs(self, default_ms):
         """
@@ -1010,6 +1069,107 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         mongo_course = self.store.get_course(self.course_locations[self.MONGO_COURSEID].course_key)
         self.assertEqual(len(mongo_course.children), 1)
 
+    def test_inheritance_tree_patched(self):
+        """
+        Test that edits patch the cached metadata inheritance tree of old mongo courses instead of recomputing it.
+        """
+        # pylint: disable=protected-access
+        self.initdb('draft')
+        mongo_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        mongo_store.metadata_inheritance_cache_subsystem = MemoryCache()
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, course_key):
+            mongo_store.refresh_cached_metadata_inheritance_tree(course_key)
+            with patch.object(mongo_store, '_compute_metadata_inheritance_tree') as mock_compute:
+                chapter = self.store.get_item(self.writable_chapter_location)
+                chapter.visible_to_staff_only = True
+                self.store.update_item(chapter, self.user_id)
+                sequential = self.store.create_child(self.user_id, chapter.location, 'sequential')
+                vertical = self.store.create_child(self.user_id, sequential.location, 'vertical')
+                problem = self.store.create_child(self.user_id, vertical.location, 'problem')
+                # in a bulk operation, the tree is patched once the operation ends
+                with self.store.bulk_operations(course_key):
+                    self.store.delete_item(vertical.location, self.user_id)
+            self.assertFalse(mock_compute.called)
+
+            tree = mongo_store._get_cached_metadata_inheritance_tree(course_key)
+            self.assertTrue(tree.get(unicode(sequential.location))['visible_to_staff_only'])
+            self.assertNotIn(unicode(vertical.location), tree)
+            self.assertNotIn(unicode(problem.location), tree)
+            self._assert_inheritance_tree_computed(mongo_store, course_key)
+
+    def _assert_inheritance_tree_computed(self, mongo_store, course_key):
+        """
+        Assert that the cached metadata inheritance tree of the course is the one computed from scratch.
+        """
+        # pylint: disable=protected-access
+        tree = mongo_store._get_cached_metadata_inheritance_tree(course_key)
+        computed_tree = mongo_store._compute_metadata_inheritance_tree(course_key)
+        self.assertItemsEqual(tree.keys(), computed_tree.keys())
+        for url in computed_tree.keys():
+            self.assertEqual(tree.get(url), computed_tree.get(url))
+
+    def test_inheritance_tree_concurrent_change(self):
+        """
+        Test that the cached metadata inheritance tree isn't patched when another process changed the course.
+        """
+        # pylint: disable=protected-access
+        self.initdb('draft')
+        mongo_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        mongo_store.metadata_inheritance_cache_subsystem = MemoryCache()
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, course_key):
+            mongo_store.refresh_cached_metadata_inheritance_tree(course_key)
+            # another process changed the course, and hasn't cached its tree yet
+            mongo_store._get_metadata_inheritance_version(course_key, increment=True)
+            with patch.object(
+                mongo_store, '_compute_metadata_inheritance_tree', wraps=mongo_store._compute_metadata_inheritance_tree
+            ) as mock_compute:
+                chapter = self.store.get_item(self.writable_chapter_location)
+                chapter.visible_to_staff_only = True
+                self.store.update_item(chapter, self.user_id)
+            self.assertTrue(mock_compute.called)
+            self._assert_inheritance_tree_computed(mongo_store, course_key)
+
+    def test_inheritance_tree_request_cache(self):
+        """
+        Test that a metadata inheritance tree found in the request cache is used without looking up its version.
+        """
+        # pylint: disable=protected-access
+        self.initdb('draft')
+        mongo_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        mongo_store.metadata_inheritance_cache_subsystem = MemoryCache()
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with patch.object(mongo_store, 'request_cache', Mock(data={})):
+            tree = mongo_store._get_cached_metadata_inheritance_tree(course_key)
+            with patch.object(mongo_store, '_get_metadata_inheritance_version') as mock_version:
+                self.assertIs(mongo_store._get_cached_metadata_inheritance_tree(course_key), tree)
+            self.assertFalse(mock_version.called)
+
+    def test_inheritance_tree_revert(self):
+        """
+        Test that the cached metadata inheritance tree is recomputed when drafts are reverted.
+        """
+        # pylint: disable=protected-access
+        self.initdb('draft')
+        mongo_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        mongo_store.metadata_inheritance_cache_subsystem = MemoryCache()
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, course_key):
+            sequential = self.store.create_child(self.user_id, self.writable_chapter_location, 'sequential')
+            vertical = self.store.create_child(self.user_id, sequential.location, 'vertical')
+            self.store.publish(vertical.location, self.user_id)
+            vertical = self.store.get_item(vertical.location)
+            vertical.visible_to_staff_only = True
+            self.store.update_item(vertical, self.user_id)
+            self.store.create_child(self.user_id, vertical.location, 'problem')
+            mongo_store.refresh_cached_metadata_inheritance_tree(course_key)
+
+            self.store.revert_to_published(vertical.location, self.user_id)
+            self._assert_inheritance_tree_computed(mongo_store, course_key)
+            tree = mongo_store._get_cached_metadata_inheritance_tree(course_key)
+            self.assertNotIn('visible_to_staff_only', tree.get(unicode(vertical.location)))
+
     def test_xml_get_courses(self):
         """
         Test that the xml modulestore only loaded the courses from the maps.
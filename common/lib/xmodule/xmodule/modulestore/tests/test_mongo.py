@@ -9,6 +9,7 @@ from nose.tools import assert_equals, assert_raises, \
 # pylint: enable=E0611
 from path import path
 import pymongo
+import pickle
 import logging
 import shutil
 from tempfile import mkdtemp
@@ -39,7 +40,7 @@ from nose.tools import assert_in
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
-from xmodule.modulestore.mongo.base import as_draft
+from xmodule.modulestore.mongo.base import as_draft, MetadataInheritanceTree
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import LocationMixin, mock_tab_from_json
 from xmodule.modulestore.edit_info import EditInfoMixin
@@ -863,6 +864,76 @@ class TestMongoKeyValueStore(unittest.TestCase):
                 self.kvs.delete(KeyValueStore.Key(scope, None, None, 'foo'))
 
 
+class TestMetadataInheritanceTree(unittest.TestCase):
+    """
+    Tests for MetadataInheritanceTree.
+    """
+
+    def setUp(self):
+        super(TestMetadataInheritanceTree, self).setUp()
+        self.branch = ModuleStoreEnum.Branch.published_only
+        self.tree = MetadataInheritanceTree(self.branch)
+        self.tree.add('course', metadata={'graded': False, 'due': 'course_due'})
+        self.tree.add('chapter', 'course', {'graded': True})
+        self.tree.add('sequential', 'chapter')
+        self.tree.add('problem', 'sequential')
+
+    def test_resolve(self):
+        self.assertEqual(
+            self.tree.get('problem'),
+            {'graded': True, 'due': 'course_due', 'parent': {self.branch: 'sequential'}}
+        )
+        self.assertEqual(
+            self.tree.get('chapter'),
+            {'graded': True, 'due': 'course_due', 'parent': {self.branch: 'course'}}
+        )
+        # the root has no parent, so isn't looked up
+        self.assertIsNone(self.tree.get('course'))
+        self.assertEqual(self.tree.get('unknown', {}), {})
+        self.assertItemsEqual(self.tree.keys(), ['chapter', 'sequential', 'problem'])
+
+    def test_add_invalidates_memoized(self):
+        self.assertIs(self.tree.get('problem')['graded'], True)
+        self.tree.add('sequential', 'chapter', {'graded': False})
+        self.assertIs(self.tree.get('problem')['graded'], False)
+
+    def test_update(self):
+        other = MetadataInheritanceTree(self.branch)
+        other.add('html', 'sequential')
+        other.add('sequential', 'chapter', {'due': 'sequential_due'})
+        self.tree.update(other)
+        self.assertEqual(self.tree.get('html')['due'], 'sequential_due')
+        self.assertEqual(self.tree.get('problem')['due'], 'sequential_due')
+        self.assertEqual(self.tree.get('chapter')['due'], 'course_due')
+
+    def test_set_children(self):
+        self.tree.add('vertical', 'chapter')
+        self.tree.set_children('sequential', ['html'])
+        self.assertEqual(self.tree.get('html')['parent'], {self.branch: 'sequential'})
+        self.assertNotIn('problem', self.tree)
+        self.assertEqual(self.tree.get_children('chapter'), set(['sequential', 'vertical']))
+
+        # moving a block keeps its children
+        self.tree.set_children('chapter', ['vertical'])
+        self.tree.set_children('vertical', ['sequential'])
+        self.assertEqual(self.tree.get('html')['graded'], True)
+        self.assertEqual(self.tree.get('sequential')['parent'], {self.branch: 'vertical'})
+
+    def test_remove(self):
+        self.tree.remove('chapter')
+        self.assertNotIn('chapter', self.tree)
+        self.assertNotIn('sequential', self.tree)
+        self.assertEqual(self.tree.get('problem'), {'parent': {self.branch: 'sequential'}})
+
+    def test_pickle(self):
+        self.tree.get('problem')
+        pickled = pickle.dumps(self.tree, pickle.HIGHEST_PROTOCOL)
+        self.assertNotIn('parent', pickled)
+        unpickled = pickle.loads(pickled)
+        for url in ('chapter', 'sequential', 'problem'):
+            self.assertEqual(unpickled.get(url), self.tree.get(url))
+
+
 def _build_requested_filter(requested_filter):
     """
     Returns requested filter_params string.
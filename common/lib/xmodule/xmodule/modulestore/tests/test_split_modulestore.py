@@ -10,6 +10,7 @@ import re
 import unittest
 import uuid
 
+from bson.objectid import ObjectId
 from contracts import contract
 from nose.plugins.attrib import attr
 from django.core.cache import get_cache, InvalidCacheBackendError
@@ -30,6 +31,7 @@ from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import LocalStructureCache
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -810,6 +812,31 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_get_structures(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+        other_course = modulestore().create_course(
+            'org', 'other_course', 'test_run', self.user, BRANCH_NAME_DRAFT,
+        )
+        version_guids = [
+            course.location.as_object_id(course.location.version_guid)
+            for course in (self.new_course, other_course)
+        ]
+        missing_version_guid = ObjectId()
+
+        # a single query for all the structures that aren't cached
+        with check_mongo_calls(1):
+            not_cached_structures = modulestore().db_connection.get_structures(
+                version_guids + [missing_version_guid]
+            )
+
+        with check_mongo_calls(0):
+            cached_structures = modulestore().db_connection.get_structures(version_guids)
+
+        self.assertEqual(set(not_cached_structures), set(version_guids))
+        self.assertEqual(cached_structures, not_cached_structures)
+        self.assertEqual(cached_structures[version_guids[0]], self._get_structure(self.new_course))
+
     @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
     def test_course_structure_cache_no_cache_configured(self, mock_get_cache):
         mock_get_cache.side_effect = InvalidCacheBackendError
@@ -837,6 +864,47 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @patch('xmodule.modulestore.split_mongo.mongo_connection._LOCAL_STRUCTURE_CACHE', None)
+    @patch(
+        'xmodule.modulestore.split_mongo.mongo_connection.settings',
+        COURSE_STRUCTURE_LOCAL_CACHE_ENABLED=True,
+        COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES=1024 * 1024,
+        COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES=1024 * 1024,
+    )
+    def test_local_cache(self, _settings):
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # The remote cache is a dummy cache, but the structure is cached
+        # in the process, and shared by everyone getting it from there
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+            self.assertIs(self._get_structure(self.new_course), cached_structure)
+
+        self.assertEqual(cached_structure, not_cached_structure)
+        # The structure that was cached can still be changed by whoever loaded it
+        self.assertIsNot(cached_structure, not_cached_structure)
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection._LOCAL_STRUCTURE_CACHE', None)
+    @patch(
+        'xmodule.modulestore.split_mongo.mongo_connection.settings',
+        COURSE_STRUCTURE_LOCAL_CACHE_ENABLED=True,
+        COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES=1024 * 1024,
+        COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES=1024 * 1024,
+    )
+    def test_local_cache_not_changed_by_loading_definitions(self, _settings):
+        html = modulestore().create_child(
+            self.user, self.new_course.location.version_agnostic(), 'html', fields={'data': '<p>Hello</p>'}
+        )
+        course_key = self.new_course.id.version_agnostic()
+
+        # Loading the course with its definitions doesn't put them in the cached structure
+        course = modulestore().get_course(course_key, depth=None, lazy=False)
+        self.assertEqual(course.get_children()[0].data, '<p>Hello</p>')
+        block = self._get_structure(course)['blocks'][BlockKey.from_usage_key(html.location)]
+        self.assertNotIn('data', block.fields)
+        self.assertFalse(block.definition_loaded)
+
     def _get_structure(self, course):
         """
         Helper function to get a structure from a course.
@@ -846,6 +914,46 @@ class TestCourseStructureCache(SplitModuleTest):
         )
 
 
+class TestLocalStructureCache(unittest.TestCase):
+    """Tests for the LocalStructureCache"""
+
+    def setUp(self):
+        super(TestLocalStructureCache, self).setUp()
+        self.cache = LocalStructureCache(max_bytes=10, max_item_bytes=6)
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', {'_id': 'a'}, 4)
+        self.assertEqual(self.cache.get('a'), {'_id': 'a'})
+        self.assertEqual(self.cache.total_bytes, 4)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', {'_id': 'a'}, 4)
+        self.cache.set('b', {'_id': 'b'}, 4)
+        self.cache.get('a')
+        self.cache.set('c', {'_id': 'c'}, 4)
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertEqual(self.cache.total_bytes, 8)
+
+    def test_replace(self):
+        self.cache.set('a', {'_id': 'a'}, 4)
+        self.cache.set('a', {'_id': 'a'}, 5)
+        self.assertEqual(self.cache.total_bytes, 5)
+
+    def test_item_too_large(self):
+        self.cache.set('a', {'_id': 'a'}, 7)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.total_bytes, 0)
+
+    def test_clear(self):
+        self.cache.set('a', {'_id': 'a'}, 4)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.total_bytes, 0)
+
 class SplitModuleItemTests(SplitModuleTest):
     '''
     Item read tests including inheritance
@@ -1053,6 +1161,37 @@ class SplitModuleItemTests(SplitModuleTest):
         self.assertEqual(len(matches), 1)
         matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
         self.assertEqual(len(matches), 6)
+        matches = modulestore().get_items(locator, qualifiers={'category': {'$in': ['chapter', 'course']}})
+        self.assertEqual(len(matches), 4)
+        matches = modulestore().get_items(
+            locator, qualifiers={'category': {'$in': ['chapter', 'garbage', 'chapter', 'course']}}
+        )
+        self.assertEqual(len(matches), 4)
+        matches = modulestore().get_items(
+            locator,
+            qualifiers={'category': 'chapter'},
+            content={'garbage': {'$exists': False}},
+        )
+        self.assertEqual(len(matches), 3)
+        matches = modulestore().get_items(
+            locator,
+            qualifiers={'category': 'chapter'},
+            content={'garbage': {'$exists': True}},
+        )
+        self.assertEqual(len(matches), 0)
+
+    def test_get_items_missing_definition(self):
+        """
+        get_items with content qualifiers raises ItemNotFoundError if a block's definition is missing
+        """
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        with patch.object(modulestore(), 'get_definitions', return_value=[]):
+            with self.assertRaises(ItemNotFoundError):
+                modulestore().get_items(
+                    locator,
+                    qualifiers={'category': 'chapter'},
+                    content={'garbage': {'$exists': False}},
+                )
 
     def test_get_parents(self):
         '''
@@ -1536,6 +1675,26 @@ class TestItemCrud(SplitModuleTest):
                         check_subtree(sub)
         check_subtree(nodes[0])
 
+    def test_parents_in_bulk_operation(self):
+        """
+        Test that parents and orphans reflect the changes made earlier in a bulk operation
+        """
+        course = modulestore().create_course('parentx', 'parents', 'run', self.user_id, BRANCH_NAME_DRAFT)
+        root = course.location.version_agnostic().for_branch(BRANCH_NAME_DRAFT)
+        with modulestore().bulk_operations(root.course_key):
+            chapter = modulestore().create_child(self.user_id, root, 'chapter').location.version_agnostic()
+            vertical = modulestore().create_child(self.user_id, chapter, 'vertical').location.version_agnostic()
+            self.assertEqual(modulestore().get_parent_location(vertical).block_id, chapter.block_id)
+            self.assertEqual(modulestore().get_orphans(root.course_key), [])
+
+            chapter_block = modulestore().get_item(chapter)
+            chapter_block.children = []
+            modulestore().update_item(chapter_block, self.user_id)
+            self.assertIsNone(modulestore().get_parent_location(vertical))
+            self.assertEqual(
+                [orphan.block_id for orphan in modulestore().get_orphans(root.course_key)], [vertical.block_id]
+            )
+
     def create_course_for_deletion(self):
         """
         Create a course we can delete
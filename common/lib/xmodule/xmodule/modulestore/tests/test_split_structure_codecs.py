@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+""" Test the course structure cache codecs of split_mongo """
+import cPickle as pickle
+import datetime
+import unittest
+import zlib
+
+import ddt
+from bson.objectid import ObjectId
+from bson.tz_util import utc
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.structure_codecs import ColumnarCodec, PickleCodec, decode_structure, encode_structure
+
+
+def make_structure(edited_on=None):
+    """
+    Return a small structure of a course with a chapter.
+    """
+    version = ObjectId()
+    edited_on = edited_on or datetime.datetime(2015, 6, 1, 12, 30, 15, 1234, tzinfo=utc)
+    course_key = BlockKey(u'course', u'course')
+    chapter_key = BlockKey(u'chapter', u'chapter')
+    return {
+        '_id': version,
+        'previous_version': None,
+        'edited_on': edited_on,
+        'schema_version': 1,
+        'root': course_key,
+        'blocks': {
+            course_key: BlockData(
+                fields={u'display_name': u'Course', u'children': [chapter_key]},
+                block_type=u'course',
+                definition=ObjectId(),
+                edit_info={'update_version': version, 'edited_on': edited_on, 'edited_by': 1},
+            ),
+            chapter_key: BlockData(
+                fields={u'display_name': u'Chapter ☃'},
+                block_type=u'chapter',
+                definition=ObjectId(),
+                defaults={u'graded': True},
+                edit_info={
+                    'update_version': version,
+                    'previous_version': ObjectId(),
+                    'edited_on': edited_on,
+                    'edited_by': 2,
+                    'original_usage': u'block-v1:org+lib+run+type@chapter+block@chapter',
+                },
+            ),
+        },
+    }
+
+
+@ddt.ddt
+class TestStructureCodecs(unittest.TestCase):
+    """ Test encoding and decoding structures """
+
+    @ddt.data(
+        ('pickle', 'zlib'),
+        ('pickle', 'none'),
+        ('columnar', 'zlib'),
+        ('columnar', 'none'),
+    )
+    @ddt.unpack
+    def test_round_trip(self, codec_name, compressor_name):
+        structure = make_structure()
+        data, serialized_size = encode_structure(structure, codec_name, compressor_name)
+        decoded, decoded_serialized_size = decode_structure(data)
+
+        self.assertEqual(decoded, structure)
+        self.assertEqual(decoded_serialized_size, serialized_size)
+        for block_key, block in structure['blocks'].iteritems():
+            self.assertEqual(decoded['blocks'][block_key].edit_info, block.edit_info)
+        self.assertIsInstance(decoded['root'], BlockKey)
+        self.assertIsInstance(decoded['blocks'][decoded['root']].fields['children'][0], BlockKey)
+
+    def test_columnar_codec_is_tagged(self):
+        data, __ = encode_structure(make_structure(), 'columnar')
+        self.assertEqual(ord(data[0]), ColumnarCodec.codec_id)
+
+    def test_pickle_zlib_is_untagged(self):
+        # Servers which predate the codecs can only read zlib-compressed pickles
+        structure = make_structure()
+        data, __ = encode_structure(structure)
+        self.assertEqual(pickle.loads(zlib.decompress(data)), structure)
+
+    def test_reads_untagged_structures(self):
+        structure = make_structure()
+        data = zlib.compress(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL), 1)
+        self.assertEqual(decode_structure(data)[0], structure)
+
+    def test_falls_back_to_pickle(self):
+        # The columnar codec only handles timezone aware datetimes
+        structure = make_structure(edited_on=datetime.datetime(2015, 6, 1))
+        data, __ = encode_structure(structure, 'columnar', 'none')
+        self.assertEqual(ord(data[0]), PickleCodec.codec_id)
+        self.assertEqual(decode_structure(data)[0], structure)
+
+        data, __ = encode_structure(structure, 'columnar')
+        self.assertEqual(pickle.loads(zlib.decompress(data)), structure)
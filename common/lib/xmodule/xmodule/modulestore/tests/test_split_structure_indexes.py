@@ -0,0 +1,93 @@
+""" Test the indexes of split_mongo structures """
+import unittest
+
+from bson.objectid import ObjectId
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.split import BlockQueryIndex, StructureIndexCache, build_parent_index
+
+
+COURSE = BlockKey(u'course', u'course')
+CHAPTER = BlockKey(u'chapter', u'chapter')
+SEQUENTIAL = BlockKey(u'sequential', u'sequential')
+SHARED = BlockKey(u'html', u'shared')
+
+
+def make_structure():
+    """
+    Return a structure of a course with a chapter, whose sequential and html
+    blocks both contain the same html block.
+    """
+    return {
+        '_id': ObjectId(),
+        'root': COURSE,
+        'blocks': {
+            COURSE: BlockData(block_type=u'course', fields={'children': [CHAPTER]}),
+            CHAPTER: BlockData(block_type=u'chapter', fields={'children': [SEQUENTIAL, SHARED]}),
+            SEQUENTIAL: BlockData(block_type=u'sequential', fields={'children': [SHARED, SHARED]}),
+            SHARED: BlockData(block_type=u'html', fields={}),
+        },
+    }
+
+
+class TestBuildParentIndex(unittest.TestCase):
+    """
+    Tests for build_parent_index.
+    """
+    def test_parents(self):
+        parent_index = build_parent_index(make_structure()['blocks'])
+        self.assertNotIn(COURSE, parent_index)
+        self.assertEqual(parent_index[CHAPTER], [COURSE])
+        self.assertEqual(parent_index[SEQUENTIAL], [CHAPTER])
+        self.assertItemsEqual(parent_index[SHARED], [CHAPTER, SEQUENTIAL])
+
+    def test_serialized_children(self):
+        blocks = {COURSE: BlockData(block_type=u'course', fields={'children': [[u'chapter', u'chapter']]})}
+        self.assertEqual(build_parent_index(blocks), {CHAPTER: [COURSE]})
+
+
+class TestBlockQueryIndex(unittest.TestCase):
+    """
+    Tests for BlockQueryIndex.
+    """
+    def test_indexes(self):
+        structure = make_structure()
+        structure['blocks'][SEQUENTIAL].fields['is_time_limited'] = True
+        query_index = BlockQueryIndex(structure['blocks'])
+        self.assertEqual(query_index.by_type[u'html'], [SHARED])
+        self.assertEqual(query_index.by_id[u'chapter'], [CHAPTER])
+        self.assertEqual(query_index.by_field['is_time_limited'], [SEQUENTIAL])
+        self.assertItemsEqual(query_index.by_field['children'], [COURSE, CHAPTER, SEQUENTIAL])
+
+
+class TestStructureIndexCache(unittest.TestCase):
+    """
+    Tests for StructureIndexCache.
+    """
+    def setUp(self):
+        super(TestStructureIndexCache, self).setUp()
+        self.cache = StructureIndexCache(build_parent_index, 2)
+
+    def test_index_reused(self):
+        structure = make_structure()
+        self.assertIs(self.cache.get(structure), self.cache.get(structure))
+
+    def test_invalidate(self):
+        structure = make_structure()
+        self.cache.get(structure)
+        del structure['blocks'][SEQUENTIAL]
+        structure['blocks'][CHAPTER].fields['children'] = [SHARED]
+        self.cache.invalidate(structure['_id'])
+        self.assertEqual(self.cache.get(structure)[SHARED], [CHAPTER])
+
+    def test_evicts_least_recently_used(self):
+        structures = [make_structure() for __ in xrange(3)]
+        first_index = self.cache.get(structures[0])
+        self.cache.get(structures[1])
+        self.cache.get(structures[0])
+        self.cache.get(structures[2])
+
+        self.assertIs(self.cache.get(structures[0]), first_index)
+        self.assertEqual(len(self.cache._indexes), 2)  # pylint: disable=protected-access
+        self.assertNotIn(structures[1]['_id'], self.cache._indexes)  # pylint: disable=protected-access
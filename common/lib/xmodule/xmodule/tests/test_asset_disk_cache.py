@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Tests for the disk cache of assets"""
+
+import os
+import shutil
+import unittest
+from StringIO import StringIO
+from tempfile import mkdtemp
+
+from mock import patch
+
+from xmodule.contentstore.disk_cache import AssetDiskCache
+
+
+class TestAssetDiskCache(unittest.TestCase):
+    """
+    Tests for AssetDiskCache
+    """
+    def setUp(self):
+        super(TestAssetDiskCache, self).setUp()
+        self.directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = AssetDiskCache(os.path.join(self.directory, 'assets'), 30, 20)
+
+    def add(self, key, digest, data):
+        """
+        Cache `data` and return what is read back from the cached copy.
+        """
+        with self.cache.add(key, digest, StringIO(data)) as cached_file:
+            return cached_file.read()
+
+    def test_add_and_open(self):
+        self.assertIsNone(self.cache.open(u'asset', 'digest'))
+        self.assertEqual(self.add(u'asset', 'digest', 'data'), 'data')
+        with self.cache.open(u'asset', 'digest') as cached_file:
+            self.assertEqual(cached_file.read(), 'data')
+
+    def test_keyed_by_digest(self):
+        self.add(u'asset', 'digest', 'data')
+        self.assertIsNone(self.cache.open(u'asset', 'other digest'))
+        self.assertIsNone(self.cache.open(u'other asset', 'digest'))
+
+    def test_delete(self):
+        self.add(u'asset ☃', 'digest', 'data')
+        self.add(u'asset ☃', 'new digest', 'new data')
+        self.add(u'other asset', 'digest', 'data')
+        self.cache.delete(u'asset ☃')
+        self.assertIsNone(self.cache.open(u'asset ☃', 'digest'))
+        self.assertIsNone(self.cache.open(u'asset ☃', 'new digest'))
+        self.assertIsNotNone(self.cache.open(u'other asset', 'digest'))
+
+    def test_evicts_least_recently_used(self):
+        for index, key in enumerate((u'first', u'second', u'third')):
+            self.add(key, 'digest', 'x' * 10)
+            os.utime(self.cache._path(key, 'digest'), (index, index))  # pylint: disable=protected-access
+
+        # Using the first makes the second the least recently used
+        self.cache.open(u'first', 'digest').close()
+        self.add(u'fourth', 'digest', 'x' * 10)
+
+        self.assertIsNone(self.cache.open(u'second', 'digest'))
+        for key in (u'first', u'third', u'fourth'):
+            self.assertIsNotNone(self.cache.open(key, 'digest'))
+
+    def test_scans_only_past_limit(self):
+        cache = AssetDiskCache(os.path.join(self.directory, 'large'), 1000, 100)
+        with patch('xmodule.contentstore.disk_cache.os.listdir', wraps=os.listdir) as mock_listdir:
+            cache.add(u'asset', 'digest', StringIO('data')).close()
+            cache.delete(u'asset')
+        self.assertFalse(mock_listdir.called)
+
+        # Adding a tenth of the limit since the last scan rescans the
+        # directory, for the copies added by other processes
+        with patch('xmodule.contentstore.disk_cache.os.listdir', wraps=os.listdir) as mock_listdir:
+            cache.add(u'asset', 'digest', StringIO('x' * 101)).close()
+        self.assertTrue(mock_listdir.called)
+
+    def test_counts_existing_copies(self):
+        self.add(u'first', 'digest', 'x' * 20)
+        self.add(u'second', 'digest', 'x' * 10)
+        os.utime(self.cache._path(u'first', 'digest'), (0, 0))  # pylint: disable=protected-access
+
+        # Another process (or a restarted one) finds the copies already cached
+        cache = AssetDiskCache(self.cache.directory, 30, 20)
+        cache.add(u'third', 'digest', StringIO('x' * 10)).close()
+        self.assertIsNone(cache.open(u'first', 'digest'))
+        self.assertIsNotNone(cache.open(u'second', 'digest'))
+
+    def test_replaced_copy_counted_once(self):
+        for __ in xrange(3):
+            self.add(u'asset', 'digest', 'x' * 20)
+        self.add(u'other asset', 'digest', 'x' * 10)
+        self.assertIsNotNone(self.cache.open(u'asset', 'digest'))
+        self.assertIsNotNone(self.cache.open(u'other asset', 'digest'))
+
+    def test_write_failure(self):
+        with patch('xmodule.contentstore.disk_cache.os.rename', side_effect=OSError):
+            self.assertIsNone(self.cache.add(u'asset', 'digest', StringIO('data')))
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_clear(self):
+        self.add(u'asset', 'digest', 'data')
+        self.cache.clear()
+        self.assertIsNone(self.cache.open(u'asset', 'digest'))
@@ -164,6 +164,28 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_stream_data_chunk_size(self):
+        """
+        Test that StaticContentStream streams its data in chunks of the given size.
+        """
+        item = FakeGridFsItem(SAMPLE_STRING)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+
+        chunks = list(static_content_stream.stream_data(chunk_size=100))
+        self.assertEqual(''.join(chunks), SAMPLE_STRING)
+        self.assertEqual(set(len(chunk) for chunk in chunks[:-1]), set([100]))
+
+        chunks = list(static_content_stream.stream_data_in_range(50, 449, chunk_size=100))
+        self.assertEqual(''.join(chunks), SAMPLE_STRING[50:450])
+        self.assertEqual(len(chunks), 4)
+
+    def test_static_content_stream_data_in_range(self):
+        """
+        Test that in memory StaticContent streams the requested bytes.
+        """
+        static_content = StaticContent('loc', 'name', 'type', SAMPLE_STRING, length=len(SAMPLE_STRING))
+        self.assertEqual(''.join(static_content.stream_data_in_range(100, 1500)), SAMPLE_STRING[100:1501])
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
@@ -35,6 +35,7 @@ from xmodule.util.django import get_current_request_hostname
 
 from external_auth.models import ExternalAuthMap
 from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
+from courseware.toc import TocBlock
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from student import auth
 from student.models import CourseEnrollmentAllowed
@@ -128,6 +129,9 @@ def has_access(user, action, obj, course_key=None):
     if isinstance(obj, XModule):
         return _has_access_xmodule(user, action, obj, course_key)
 
+    if isinstance(obj, TocBlock):
+        return _has_access_toc_block(user, action, obj, course_key)
+
     # NOTE: any descriptor access checkers need to go above this
     if isinstance(obj, XBlock):
         return _has_access_descriptor(user, action, obj, course_key)
@@ -657,6 +661,18 @@ def _has_access_xmodule(user, action, xmodule, course_key):
     return has_access(user, action, xmodule.descriptor, course_key)
 
 
+def _has_access_toc_block(user, action, toc_block, course_key):
+    """
+    Check if user has access to the block that this table of contents entry
+    was built from.
+
+    Valid actions:
+      - same as the valid actions for descriptors
+    """
+    # A TocBlock has the settings that access to descriptors depends on
+    return _has_access_descriptor(user, action, toc_block, course_key)
+
+
 def _has_access_location(user, action, location, course_key):
     """
     Check if user has access to this location.
@@ -71,11 +71,6 @@ class OverrideFieldData(FieldData):
         any performance impact of this feature if no override providers are
         configured.
         """
-        if cls.provider_classes is None:
-            cls.provider_classes = tuple(
-                (resolve_dotted(name) for name in
-                 settings.FIELD_OVERRIDE_PROVIDERS))
-
         enabled_providers = cls._providers_for_course(course)
 
         if enabled_providers:
@@ -87,6 +82,14 @@ class OverrideFieldData(FieldData):
 
         return wrapped
 
+    @classmethod
+    def has_providers_for_course(cls, course):
+        """
+        Return whether any override providers are enabled for `course`, i.e.
+        whether the fields of its blocks may be overridden for some users.
+        """
+        return bool(cls._providers_for_course(course))
+
     @classmethod
     def _providers_for_course(cls, course):
         """
@@ -97,6 +100,11 @@ class OverrideFieldData(FieldData):
         Arguments:
             course: The course XBlock
         """
+        if cls.provider_classes is None:
+            cls.provider_classes = tuple(
+                (resolve_dotted(name) for name in
+                 settings.FIELD_OVERRIDE_PROVIDERS))
+
         request_cache = RequestCache.get_request_cache()
         enabled_providers = request_cache.data.get(
             ENABLED_OVERRIDE_PROVIDERS_KEY, NOTSET
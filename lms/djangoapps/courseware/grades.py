@@ -1,37 +1,59 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from functools import partial
 import json
 import random
 import logging
+import Queue
+import sys
+import threading
 
 from contextlib import contextmanager
+from itertools import islice
 from django.conf import settings
-from django.db import transaction
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, connection, transaction
 from django.test.client import RequestFactory
 from django.core.cache import cache
+from django.utils import timezone
 
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
-from courseware.model_data import FieldDataCache, ScoresClient
+from courseware.model_data import FieldDataCache, MultiUserFieldDataCache, ScoresClient
+from courseware.user_state_client import DjangoXBlockUserStateClient
 from student.models import anonymous_id_for_user
 from util.module_utils import yield_dynamic_descriptor_descendants
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from .models import StudentModule
+from .models import CourseMaxScores, StudentGradeSummary
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
-from opaque_keys import InvalidKeyError
+from ccx_keys.locator import CCXLocator
 from opaque_keys.edx.keys import CourseKey
 from openedx.core.djangoapps.signals.signals import GRADES_UPDATED
 
 
 log = logging.getLogger("edx.courseware")
 
+# Number of students whose StudentModules are loaded together by grade_many.
+GRADE_MANY_BATCH_SIZE = 100
+
+# How often the background loader of grade_many checks whether it should stop
+# while waiting for room in its queue.
+_LOAD_IN_BACKGROUND_POLL_SECONDS = 0.1
+_LOAD_IN_BACKGROUND_DONE = object()
+
+# The precomputed max scores of the course versions most recently graded by
+# this process, keyed by (course_id, course_version). A course version's max
+# scores never change, so they are loaded from the database once.
+_PRECOMPUTED_MAX_SCORES = OrderedDict()
+_PRECOMPUTED_MAX_SCORES_LIMIT = 20
+_PRECOMPUTED_MAX_SCORES_LOCK = threading.Lock()
+
 
 class MaxScoresCache(object):
     """
@@ -43,9 +65,16 @@ class MaxScoresCache(object):
     issued a score -- say a problem two students have only seen mentioned in
     their progress pages and never interacted with -- should be worth the same
     number of points for everyone.
+
+    If `FEATURES['ENABLE_PRECOMPUTED_MAX_SCORES']` is set, max scores missing
+    from the remote cache are taken from the max scores computed for the
+    whole course when it was published (see `CourseMaxScores`), which are
+    stored with the course version.
     """
-    def __init__(self, cache_prefix):
+    def __init__(self, cache_prefix, course_id=None, course_version=None):
         self.cache_prefix = cache_prefix
+        self.course_id = course_id
+        self.course_version = course_version
         self._max_scores_cache = {}
         self._max_scores_updates = {}
 
@@ -62,21 +91,80 @@ class MaxScoresCache(object):
         """
         if course.subtree_edited_on is None:
             # check for subtree_edited_on because old XML courses doesn't have this attribute
-            cache_key = u"{}".format(course.id)
-        else:
-            cache_key = u"{}.{}".format(course.id, course.subtree_edited_on.isoformat())
-        return cls(cache_key)
+            return cls(u"{}".format(course.id))
+        course_version = course_version_for_grading(course)
+        return cls(u"{}.{}".format(course.id, course_version), course.id, course_version)
 
     def fetch_from_remote(self, locations):
         """
         Populate the local cache with values from django's cache
         """
+        locations = set(locations)
         remote_dict = cache.get_many([self._remote_cache_key(loc) for loc in locations])
         self._max_scores_cache = {
             self._local_cache_key(remote_key): value
             for remote_key, value in remote_dict.items()
             if value is not None
         }
+        if len(self._max_scores_cache) < len(locations):
+            self._fetch_precomputed(locations)
+
+    def _fetch_precomputed(self, locations):
+        """
+        Populate the local cache with the precomputed max scores of the
+        `locations` that are missing from it, and add them to the remote
+        cache so that the next fetch finds them there.
+        """
+        if self.course_version is None or not settings.FEATURES.get('ENABLE_PRECOMPUTED_MAX_SCORES'):
+            return
+
+        max_scores = self._precomputed_max_scores()
+        if max_scores is None:
+            return
+
+        precomputed = {}
+        for location in locations:
+            loc_str = unicode(location)
+            if loc_str not in self._max_scores_cache and max_scores.get(loc_str) is not None:
+                precomputed[loc_str] = max_scores[loc_str]
+        if precomputed:
+            self._max_scores_cache.update(precomputed)
+            cache.set_many(
+                {self._remote_cache_key(key): value for key, value in precomputed.items()},
+                60 * 60 * 24  # 1 day
+            )
+
+    def _precomputed_max_scores(self):
+        """
+        Return the precomputed max scores of this course version, keyed by
+        location string, loading them from the database the first time this
+        process needs them. Locations missing from them stay missing, so they
+        don't load them again.
+
+        Returns None, and queues their computation, if they aren't computed.
+        """
+        key = (self.course_id, self.course_version)
+        with _PRECOMPUTED_MAX_SCORES_LOCK:
+            max_scores = _PRECOMPUTED_MAX_SCORES.pop(key, None)
+            if max_scores is not None:
+                # Keep the most recently used course versions last
+                _PRECOMPUTED_MAX_SCORES[key] = max_scores
+                return max_scores
+
+        max_scores = CourseMaxScores.get_max_scores(self.course_id, self.course_version)
+        if max_scores is None:
+            # The course was published by another process (i.e. Studio), or
+            # its max scores are still being computed.
+            # Import here to avoid a circular import.
+            from courseware.tasks import queue_course_max_scores
+            queue_course_max_scores(self.course_id, self.course_version)
+            return None
+
+        with _PRECOMPUTED_MAX_SCORES_LOCK:
+            while len(_PRECOMPUTED_MAX_SCORES) >= _PRECOMPUTED_MAX_SCORES_LIMIT:
+                _PRECOMPUTED_MAX_SCORES.popitem(last=False)
+            _PRECOMPUTED_MAX_SCORES[key] = max_scores
+        return max_scores
 
     def push_to_remote(self):
         """
@@ -171,7 +259,8 @@ def answer_distributions(course_key):
     Loncapa problem state that gets created from runnig the progress page is
     also not counted.
 
-    This method accesses the StudentModule table directly instead of using the
+    This method reads the stored user state directly (with
+    `DjangoXBlockUserStateClient.iter_all_for_course`) instead of using the
     CapaModule abstraction. The main reason for this is so that we can generate
     the report without any side-effects -- we don't have to worry about answer
     distribution potentially causing re-evaluation of the student answer. This
@@ -186,7 +275,7 @@ def answer_distributions(course_key):
 
     This method will try to use a read-replica database if one is available.
     """
-    # dict: { module.module_state_key : (url_name, display_name) }
+    # dict: { usage_key : (url_name, display_name) }
     state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
 
     def url_and_display_name(usage_key):
@@ -195,7 +284,6 @@ def answer_distributions(course_key):
         Handle modulestore access and caching. This method ignores permissions.
 
         Raises:
-            InvalidKeyError: if the usage_key does not parse
             ItemNotFoundError: if there is no content that corresponds
                 to this usage_key.
         """
@@ -210,22 +298,13 @@ def answer_distributions(course_key):
     # Iterate through all problems submitted for this course in no particular
     # order, and build up our answer_counts dict that we will eventually return
     answer_counts = defaultdict(lambda: defaultdict(int))
-    for module in StudentModule.all_submitted_problems_read_only(course_key):
-        try:
-            state_dict = json.loads(module.state) if module.state else {}
-            raw_answers = state_dict.get("student_answers", {})
-        except ValueError:
-            log.error(
-                u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
-                module.id,
-                course_key,
-            )
-            continue
-
+    user_state_client = DjangoXBlockUserStateClient()
+    for user_state in user_state_client.iter_all_for_course(course_key, block_type='problem', graded_only=True):
+        raw_answers = user_state.state.get("student_answers", {})
         try:
-            url, display_name = url_and_display_name(module.module_state_key.map_into_course(course_key))
+            url, display_name = url_and_display_name(user_state.block_key)
             # Each problem part has an ID that is derived from the
-            # module.module_state_key (with some suffix appended)
+            # block key (with some suffix appended)
             for problem_part_id, raw_answer in raw_answers.items():
                 # Convert whatever raw answers we have (numbers, unicode, None, etc.)
                 # to be unicode values. Note that if we get a string, it's always
@@ -234,15 +313,15 @@ def answer_distributions(course_key):
                 answer = unicode(raw_answer)
                 answer_counts[(url, display_name, problem_part_id)][answer] += 1
 
-        except (ItemNotFoundError, InvalidKeyError):
+        except ItemNotFoundError:
             msg = (
-                "Answer Distribution: Item {} referenced in StudentModule {} " +
-                "for user {} in course {} not found; " +
+                "Answer Distribution: Item {} referenced in the state " +
+                "of user {} in course {} not found; " +
                 "This can happen if a student answered a question that " +
                 "was later deleted from the course. This answer will be " +
                 "omitted from the answer distribution CSV."
             ).format(
-                module.module_state_key, module.id, module.student_id, course_key
+                user_state.block_key, user_state.username, course_key
             )
             log.warning(msg)
             continue
@@ -251,14 +330,33 @@ def answer_distributions(course_key):
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None):
+def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None,
+          max_scores_cache=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     Send a signal to update the minimum grade requirement status.
+
+    If persistent grade summaries are enabled for the course, the student's
+    persisted grade summary is returned when there is one, and a newly
+    computed one is persisted.
     """
     with manual_transaction():
-        grade_summary = _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client)
+        persist_summary = not keep_raw_scores and can_persist_grade_summaries(course)
+        grade_summary = None
+        if persist_summary:
+            grade_summary = get_persisted_grade_summaries(course, [student.id]).get(student.id)
+            graded_at = timezone.now()
+
+        if grade_summary is None:
+            grade_summary = _grade(
+                student, request, course, keep_raw_scores, field_data_cache, scores_client, max_scores_cache
+            )
+            if persist_summary:
+                persist_grade_summary(student, course, grade_summary, graded_at)
+
+        # Receivers (e.g. the minimum grade credit requirement) are notified
+        # of persisted grade summaries too.
         responses = GRADES_UPDATED.send_robust(
             sender=None,
             username=request.user.username,
@@ -273,7 +371,99 @@ def grade(student, request, course, keep_raw_scores=False, field_data_cache=None
         return grade_summary
 
 
-def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client):
+def can_persist_grade_summaries(course):
+    """
+    Return whether grade summaries of students in `course` (a CourseDescriptor)
+    can be persisted between gradings.
+
+    Persisted summaries are only thrown away when a student's score changes or
+    the course is published, so they can't be used for courses whose grades
+    can change otherwise: CCXs (whose grading policy can be overridden without
+    publishing), courses without publish dates (XML courses) and courses with
+    problems that always have to be regraded.
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_GRADE_SUMMARIES') or settings.GENERATE_PROFILE_SCORES:
+        return False
+    if course.subtree_edited_on is None or isinstance(course.id, CCXLocator):
+        return False
+    return not any(
+        descriptor.always_recalculate_grades for descriptor in course.grading_context['all_descriptors']
+    )
+
+
+def get_persisted_grade_summaries(course, student_ids):
+    """
+    Return a dict of the persisted grade summaries of the students with
+    `student_ids` in `course`, keyed by student id. Students without a grade
+    summary for the current version of the course are left out.
+    """
+    persisted_summaries = StudentGradeSummary.objects.filter(
+        course_id=course.id,
+        course_version=course_version_for_grading(course),
+        user_id__in=student_ids,
+    ).values_list('user_id', 'grade_summary')
+    return {
+        student_id: _deserialize_grade_summary(grade_summary)
+        for student_id, grade_summary in persisted_summaries
+    }
+
+
+def persist_grade_summary(student, course, grade_summary, graded_at):
+    """
+    Persist `grade_summary`, which grading `student` in `course` started
+    computing at `graded_at`, unless it was invalidated in the meantime.
+    """
+    if StudentGradeSummary.invalidated_since(student.id, course.id, graded_at):
+        return
+
+    StudentGradeSummary.objects.filter(user=student, course_id=course.id).delete()
+    try:
+        StudentGradeSummary.objects.create(
+            user=student,
+            course_id=course.id,
+            course_version=course_version_for_grading(course),
+            grade_summary=_serialize_grade_summary(grade_summary),
+        )
+    except IntegrityError:
+        # Another grading of the same student persisted its summary first.
+        log.info('Grade summary of student %s in course %s was persisted concurrently', student.id, course.id)
+
+
+def course_version_for_grading(course):
+    """
+    The version of `course` that persisted grade summaries and precomputed
+    max scores are valid for: the last time something was published to it,
+    as for `MaxScoresCache`.
+    """
+    return course.subtree_edited_on.isoformat()
+
+
+def _serialize_grade_summary(grade_summary):
+    """
+    Serialize a grade summary as returned by `_grade` to JSON.
+    """
+    return json.dumps(dict(
+        grade_summary,
+        totaled_scores={
+            section_format: [list(score) for score in scores]
+            for section_format, scores in grade_summary['totaled_scores'].iteritems()
+        }
+    ))
+
+
+def _deserialize_grade_summary(serialized_summary):
+    """
+    Rebuild a grade summary serialized by `_serialize_grade_summary`.
+    """
+    grade_summary = json.loads(serialized_summary)
+    grade_summary['totaled_scores'] = {
+        section_format: [Score(*score) for score in scores]
+        for section_format, scores in grade_summary['totaled_scores'].iteritems()
+    }
+    return grade_summary
+
+
+def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client, max_scores_cache=None):
     """
     Unwrapped version of "grade"
 
@@ -292,6 +482,9 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    If a `max_scores_cache` is passed in, the caller is responsible for
+    fetching it from and pushing it to the remote cache.
+
     More information on the format is in the docstring for CourseGrader.
     """
     if field_data_cache is None:
@@ -304,12 +497,14 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
     # scores that were registered with the submissions API, which for the moment
     # means only openassessment (edx-ora2)
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
-    max_scores_cache = MaxScoresCache.create_for_course(course)
-    # For the moment, we have to get scorable_locations from field_data_cache
-    # and not from scores_client, because scores_client is ignorant of things
-    # in the submissions API. As a further refactoring step, submissions should
-    # be hidden behind the ScoresClient.
-    max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+    push_max_scores = max_scores_cache is None
+    if push_max_scores:
+        max_scores_cache = MaxScoresCache.create_for_course(course)
+        # For the moment, we have to get scorable_locations from field_data_cache
+        # and not from scores_client, because scores_client is ignorant of things
+        # in the submissions API. As a further refactoring step, submissions should
+        # be hidden behind the ScoresClient.
+        max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
 
     grading_context = course.grading_context
     raw_scores = []
@@ -425,11 +620,55 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
         # so grader can be double-checked
         grade_summary['raw_scores'] = raw_scores
 
-    max_scores_cache.push_to_remote()
+    if push_max_scores:
+        max_scores_cache.push_to_remote()
 
     return grade_summary
 
 
+def compute_max_scores(course):
+    """
+    Return a dict mapping the location strings of the problems in `course` (a
+    CourseDescriptor) that affect grading to their unweighted max scores.
+
+    Each problem is instantiated once, for an anonymous user, relying on the
+    same assumption as `MaxScoresCache`: a problem is worth the same number of
+    points to every student who hasn't been scored on it. Problems that must
+    always be regraded, that an anonymous user can't load or that fail to
+    load are left out.
+    """
+    anonymous_user = AnonymousUser()
+    anonymous_user.known = False
+    request = RequestFactory().get('/')
+    request.user = anonymous_user
+    request.session = {}
+
+    descriptors = [
+        descriptor
+        for descriptor in FieldDataCache.descendant_descriptors(
+            course,
+            depth=None,
+            descriptor_filter=partial(descriptor_affects_grading, course.block_types_affecting_grading),
+        )
+        if descriptor.has_score and not descriptor.always_recalculate_grades
+    ]
+    field_data_cache = FieldDataCache(descriptors, course.id, anonymous_user)
+
+    max_scores = {}
+    for descriptor in descriptors:
+        try:
+            problem = get_module_for_descriptor(
+                anonymous_user, request, descriptor, field_data_cache, course.id, course=course
+            )
+            max_score = problem.max_score() if problem is not None else None
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Cannot compute the max score of %s', descriptor.location)
+            continue
+        if max_score is not None:
+            max_scores[unicode(descriptor.location)] = max_score
+    return max_scores
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -705,30 +944,187 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     else:
         course = course_or_id
 
+    for student, gradeset, err_msg in grade_many(course, students, keep_raw_scores):
+        yield student, gradeset, err_msg
+
+
+def grade_many(course, students, keep_raw_scores=False, batch_size=GRADE_MANY_BATCH_SIZE, prefetch_batches=None):
+    """
+    Grade each of `students` (User) in `course` (a CourseDescriptor), yielding
+    the same `(student, gradeset, err_msg)` tuples, in the same order, as
+    `iterate_grades_for`.
+
+    The results are the same as calling `grade` for each student, but the
+    course tree is only walked once to find the blocks that affect grading,
+    and the StudentModules (scores and user state) of each batch of
+    `batch_size` students are loaded together instead of per student. Max
+    scores are fetched from and pushed to the remote cache once per batch.
+    Persisted grade summaries of a batch are also loaded together, and those
+    students aren't regraded.
+
+    If `prefetch_batches` (`settings.GRADES_PREFETCH_BATCHES` by default) is
+    set, a background thread loads the StudentModules and persisted summaries
+    of up to that many of the following batches while the current batch is
+    being graded.
+
+    As with `iterate_grades_for`, a student who can't be graded doesn't stop
+    the others: the student is yielded with an empty gradeset and the error
+    message. If a batch can't be loaded, its students are loaded one at a
+    time so that only those whose data can't be loaded fail.
+    """
     # We make a fake request because grading code expects to be able to look at
     # the request. We have to attach the correct user to the request before
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+    grading_descriptors = FieldDataCache.descendant_descriptors(
+        course,
+        depth=None,
+        descriptor_filter=partial(descriptor_affects_grading, course.block_types_affecting_grading),
+    )
+    scorable_locations = set(descriptor.location for descriptor in grading_descriptors if descriptor.has_score)
+
+    persist_summaries = not keep_raw_scores and can_persist_grade_summaries(course)
+    if prefetch_batches is None:
+        prefetch_batches = settings.GRADES_PREFETCH_BATCHES
+
+    def load_students(student_batch):
+        """
+        Return the persisted grade summaries and the StudentModules of the
+        students of `student_batch`.
+        """
+        persisted_summaries = {}
+        if persist_summaries:
+            persisted_summaries = get_persisted_grade_summaries(course, [student.id for student in student_batch])
+        student_modules = MultiUserFieldDataCache(
+            grading_descriptors,
+            course.id,
+            [student for student in student_batch if student.id not in persisted_summaries],
+        )
+        return persisted_summaries, student_modules
+
+    def load_batch(student_batch):
+        """
+        Return `student_batch` with what `load_students` returns for it, or
+        with None if it couldn't be loaded.
+        """
+        try:
+            return student_batch, load_students(student_batch)
+        except Exception:  # pylint: disable=broad-except
+            log.exception(
+                'Cannot load the grading data of %d students in course %s; loading them one at a time',
+                len(student_batch),
+                course.id,
+            )
+            return student_batch, None
+
+    students = iter(students)
+    student_batches = iter(lambda: list(islice(students, batch_size)), [])
+    if prefetch_batches:
+        loaded_batches = _load_in_background(
+            load_batch, student_batches, prefetch_batches, tags=[u'course_id:{}'.format(course.id)]
+        )
+    else:
+        loaded_batches = (load_batch(student_batch) for student_batch in student_batches)
+
+    for student_batch, loaded in loaded_batches:
+        max_scores_cache = MaxScoresCache.create_for_course(course)
+        max_scores_cache.fetch_from_remote(scorable_locations)
+
+        for student in student_batch:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+                try:
+                    # If the batch couldn't be loaded, an error loading this
+                    # student's data only fails this student.
+                    persisted_summaries, student_modules = loaded or load_students([student])
+                    if student.id in persisted_summaries:
+                        yield student, persisted_summaries[student.id], ""
+                        continue
+
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    field_data_cache = student_modules.field_data_cache_for(student)
+                    scores_client = student_modules.scores_client_for(student)
+                    gradeset = grade(
+                        student,
+                        request,
+                        course,
+                        keep_raw_scores,
+                        field_data_cache=field_data_cache,
+                        scores_client=scores_client,
+                        max_scores_cache=max_scores_cache,
+                    )
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course.id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
+
+        max_scores_cache.push_to_remote()
+
+
+def _load_in_background(load, items, depth, tags=None):
+    """
+    Yield `load(item)` for each of `items`, in order, while a background
+    thread loads the results of up to `depth` of the following items.
+
+    The thread uses its own database connection, so it only sees committed
+    data. An exception raised by `load` (or by `items`) is re-raised where its
+    result would have been yielded. The thread stops once the returned
+    generator is closed.
+
+    The depth of the queue of loaded results and the time spent waiting on
+    it (stalled) are reported to datadog.
+    """
+    results = Queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(result):
+        """Queue `result`, returning False if the consumer has stopped instead."""
+        while not stopped.is_set():
             try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course, keep_raw_scores)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course.id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+                results.put(result, timeout=_LOAD_IN_BACKGROUND_POLL_SECONDS)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def produce():
+        """Load each of `items` until they're exhausted or the consumer stops."""
+        try:
+            for item in items:
+                if not put((load(item), None)):
+                    return
+            put(_LOAD_IN_BACKGROUND_DONE)
+        except Exception:  # pylint: disable=broad-except
+            put((None, sys.exc_info()))
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=produce, name='load_in_background')
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            dog_stats_api.histogram('lms.grades.prefetch.queue_depth', results.qsize(), tags=tags)
+            with dog_stats_api.timer('lms.grades.prefetch.stall_time', tags=tags):
+                loaded = results.get()
+            if loaded is _LOAD_IN_BACKGROUND_DONE:
+                return
+            result, exc_info = loaded
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            yield result
+    finally:
+        stopped.set()
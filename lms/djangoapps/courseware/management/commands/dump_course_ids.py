@@ -36,6 +36,6 @@ class Command(BaseCommand):
         if store is None:
             raise CommandError("Unknown modulestore {}".format(name))
 
-        output = u'\n'.join(course.id.to_deprecated_string() for course in store.get_courses()) + '\n'
+        output = u'\n'.join(course_key.to_deprecated_string() for course_key in store.get_courses_keys()) + '\n'
 
         return output.encode('utf-8')
@@ -9,6 +9,10 @@ Classes to provide the LMS runtime data storage to XBlocks.
 :class:`FieldDataCache`: A object which provides a read-through prefetch cache
     of data to support XBlock fields within a limited set of scopes.
 
+:class:`MultiUserFieldDataCache`: A snapshot of the Scope.user_state data of
+    many users, loaded in bulk, which provides a :class:`FieldDataCache` for
+    each of those users.
+
 The remaining classes in this module provide read-through prefetch cache implementations
 for specific scopes. The individual classes provide the knowledge of what are the essential
 pieces of information for each scope, and thus how to cache, prefetch, and create new field data
@@ -28,9 +32,11 @@ from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
-    XModuleStudentInfoField
+    XModuleStudentInfoField,
+    chunks,
 )
 import logging
+from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1
@@ -371,6 +377,16 @@ class UserStateCache(object):
         for user_state in block_field_state:
             self._cache[user_state.block_key] = user_state.state
 
+    def cache_states(self, block_states):
+        """
+        Add already loaded field state to this cache.
+
+        Arguments:
+            block_states (dict): A dict mapping usage keys to the field state
+                dicts stored for them.
+        """
+        self._cache.update(block_states)
+
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def set(self, kvs_key, value):
         """
@@ -726,14 +742,17 @@ class FieldDataCache(object):
         self.scorable_locations = set()
         self.add_descriptors_to_cache(descriptors)
 
-    def add_descriptors_to_cache(self, descriptors):
+    def add_descriptors_to_cache(self, descriptors, prefetched_scopes=()):
         """
         Add all `descriptors` to this FieldDataCache.
+
+        Fields in `prefetched_scopes` are not loaded, because the caller has
+        already populated the caches for those scopes.
         """
         if self.user.is_authenticated():
             self.scorable_locations.update(desc.location for desc in descriptors if desc.has_score)
             for scope, fields in self._fields_to_cache(descriptors).items():
-                if scope not in self.cache:
+                if scope not in self.cache or scope in prefetched_scopes:
                     continue
 
                 self.cache[scope].cache_fields(fields, descriptors, self.asides)
@@ -749,6 +768,22 @@ class FieldDataCache(object):
             descriptor_filter is a function that accepts a descriptor and return whether the field data
                 should be cached
         """
+        self.add_descriptors_to_cache(self.descendant_descriptors(descriptor, depth, descriptor_filter))
+
+    @staticmethod
+    def descendant_descriptors(descriptor, depth=None, descriptor_filter=lambda descriptor: True):
+        """
+        Return a list of `descriptor` and its descendants down to the specified
+        depth that match the descriptor filter, i.e. the descriptors that
+        `add_descriptor_descendents` would cache field data for.
+
+        Arguments:
+            descriptor: An XModuleDescriptor
+            depth is the number of levels of descendants to include, in addition to
+                the supplied descriptor. If depth is None, include all descendants
+            descriptor_filter is a function that accepts a descriptor and return whether it
+                should be included
+        """
 
         def get_child_descriptors(descriptor, depth, descriptor_filter):
             """
@@ -774,9 +809,7 @@ class FieldDataCache(object):
             return descriptors
 
         with modulestore().bulk_operations(descriptor.location.course_key):
-            descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
-
-        self.add_descriptors_to_cache(descriptors)
+            return get_child_descriptors(descriptor, depth, descriptor_filter)
 
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
@@ -988,6 +1021,150 @@ class ScoresClient(object):
         client.fetch_scores(fd_cache.scorable_locations)
         return client
 
+    @classmethod
+    def from_prefetched_scores(cls, course_key, user_id, locations_to_scores):
+        """
+        Create a ScoresClient from scores that have already been loaded, e.g.
+        in bulk for many users at once.
+
+        `locations_to_scores` maps locations (with full course run information)
+        to `(correct, total)` tuples, and must contain every scorable location
+        the user has a StudentModule for.
+        """
+        client = cls(course_key, user_id)
+        client._locations_to_scores.update(
+            (location, cls.Score(correct, total))
+            for location, (correct, total) in locations_to_scores.iteritems()
+        )
+        client._has_fetched = True
+        return client
+
+
+class MultiUserFieldDataCache(object):
+    """
+    A snapshot of the Scope.user_state data and scores of many users for a
+    set of blocks, for code that runs the same blocks for each of those users
+    (e.g. grading a whole course), so that the StudentModules of all users are
+    loaded in a few chunked queries instead of at least one per user.
+
+    Use `field_data_cache_for` and `scores_client_for` to get a per user
+    FieldDataCache and ScoresClient backed by the snapshot. Writes go through
+    to the database as usual; they aren't visible to the other users' caches,
+    which is fine since user state is never shared between users. The
+    Scope.user_state_summary data is shared though, so it's only loaded once.
+    """
+    def __init__(self, descriptors, course_id, users, asides=None, chunk_size=500):
+        """
+        Arguments:
+            descriptors: A list of XModuleDescriptors.
+            course_id: The id of the current course
+            users: The users for which to cache data
+            asides: The list of aside types to load, or None to prefetch no asides.
+            chunk_size: The number of users (and of blocks) per query.
+        """
+        assert isinstance(course_id, CourseKey)
+        self.course_id = course_id
+        self.descriptors = list(descriptors)
+        self.asides = asides if asides is not None else []
+        self.user_ids = set(user.id for user in users)
+        self.scorable_locations = set(desc.location for desc in self.descriptors if desc.has_score)
+
+        # user id -> usage key -> field state (or score)
+        self._user_state = defaultdict(dict)
+        self._scores = defaultdict(dict)
+        # user id -> the error that kept the user's state from being loaded
+        self._load_errors = {}
+        self._load_student_modules(chunk_size)
+
+        self._user_state_summary_cache = UserStateSummaryCache(self.course_id)
+        summary_fields = set(
+            field
+            for descriptor in self.descriptors
+            for field in descriptor.fields.values()
+            if field.scope == Scope.user_state_summary
+        )
+        if summary_fields:
+            self._user_state_summary_cache.cache_fields(summary_fields, self.descriptors, self.asides)
+
+    def _load_student_modules(self, chunk_size):
+        """
+        Load the StudentModules of all users for the cached blocks, leaving out
+        state that has never been set or was deleted, as
+        `DjangoXBlockUserStateClient.get_many` does.
+
+        A user whose state can't be decoded is only logged here; asking for
+        that user's caches raises the error.
+        """
+        usage_keys = _all_usage_keys(self.descriptors, self.asides)
+        block_filter = {}
+        if len(usage_keys) <= chunk_size:
+            block_filter['module_state_key__in'] = usage_keys
+
+        for user_ids in chunks(self.user_ids, chunk_size):
+            rows = StudentModule.objects.filter(
+                course_id=self.course_id,
+                student_id__in=user_ids,
+                **block_filter
+            ).values_list('student_id', 'module_state_key', 'state', 'grade', 'max_grade')
+
+            for user_id, module_state_key, state, correct, total in rows:
+                # Locations in StudentModule don't necessarily have course key info
+                # attached to them (since old mongo identifiers don't include runs).
+                try:
+                    usage_key = UsageKey.from_string(module_state_key).map_into_course(self.course_id)
+                except InvalidKeyError:
+                    continue
+                if usage_key not in usage_keys:
+                    continue
+                if usage_key in self.scorable_locations:
+                    self._scores[user_id][usage_key] = (correct, total)
+                if state is not None:
+                    try:
+                        field_state = json.loads(state)
+                    except ValueError as exc:
+                        log.exception(
+                            u"Cannot decode the state of user %s for %s in course %s",
+                            user_id, usage_key, self.course_id
+                        )
+                        self._load_errors[user_id] = exc
+                        continue
+                    # The empty dict means the state has been deleted.
+                    if field_state:
+                        self._user_state[user_id][usage_key] = field_state
+
+    def _check_user(self, user):
+        """
+        Raise a ValueError unless `user` is one of the users of the snapshot,
+        or re-raise the error that kept the user's state from being loaded.
+        """
+        if user.id not in self.user_ids:
+            raise ValueError(u"User {} is not in this MultiUserFieldDataCache".format(user.id))
+        if user.id in self._load_errors:
+            raise self._load_errors[user.id]
+
+    def field_data_cache_for(self, user):
+        """
+        Return a FieldDataCache for `user`, which must be one of the users of
+        the snapshot, with the snapshot's Scope.user_state data.
+        """
+        self._check_user(user)
+        cache = FieldDataCache([], self.course_id, user, asides=self.asides)
+        cache.cache[Scope.user_state].cache_states(self._user_state[user.id])
+        cache.cache[Scope.user_state_summary] = self._user_state_summary_cache
+        cache.add_descriptors_to_cache(
+            self.descriptors,
+            prefetched_scopes=(Scope.user_state, Scope.user_state_summary),
+        )
+        return cache
+
+    def scores_client_for(self, user):
+        """
+        Return a ScoresClient for `user`, which must be one of the users of
+        the snapshot, with the snapshot's scores.
+        """
+        self._check_user(user)
+        return ScoresClient.from_prefetched_scores(self.course_id, user.id, self._scores[user.id])
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
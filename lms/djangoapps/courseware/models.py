@@ -12,18 +12,23 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import json
 import logging
 import itertools
 
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import IntegrityError, models
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver, Signal
+from django.utils import timezone
 
 from model_utils.models import TimeStampedModel
+from opaque_keys.edx.keys import CourseKey
 from student.models import user_by_anonymous_id
 from submissions.models import score_set, score_reset
+from xmodule.modulestore.django import SignalHandler
 
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField  # pylint: disable=import-error
 log = logging.getLogger(__name__)
@@ -112,23 +117,6 @@ class StudentModule(models.Model):
     created = models.DateTimeField(auto_now_add=True, db_index=True)
     modified = models.DateTimeField(auto_now=True, db_index=True)
 
-    @classmethod
-    def all_submitted_problems_read_only(cls, course_id):
-        """
-        Return all model instances that correspond to problems that have been
-        submitted for a given course. So module_type='problem' and a non-null
-        grade. Use a read replica if one exists for this environment.
-        """
-        queryset = cls.objects.filter(
-            course_id=course_id,
-            module_type='problem',
-            grade__isnull=False
-        )
-        if "read_replica" in settings.DATABASES:
-            return queryset.using("read_replica")
-        else:
-            return queryset
-
     def __repr__(self):
         return 'StudentModule<%r>' % ({
             'course_id': self.course_id,
@@ -324,6 +312,104 @@ class StudentFieldOverride(TimeStampedModel):
     value = models.TextField(default='null')
 
 
+class StudentGradeSummary(models.Model):
+    """
+    The last computed grade summary of a user in a course.
+
+    Summaries are only valid for the version of the course they were computed
+    against (`course_version`); they are thrown away whenever one of the
+    user's scores in the course changes and recomputed the next time the user
+    is graded.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('user', 'course_id'),)
+
+    user = models.ForeignKey(User)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    course_version = models.CharField(max_length=255, blank=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    grade_summary = models.TextField()  # grade summary, stored as JSON
+
+    # How long to remember that a summary was invalidated, so that a grading
+    # that was already running at the time doesn't persist a summary computed
+    # from the old scores.
+    INVALIDATION_TIMEOUT = 60 * 60
+
+    def __unicode__(self):
+        return "[StudentGradeSummary] %s: %s (%s)" % (self.user, self.course_id, self.course_version)
+
+    @classmethod
+    def invalidate(cls, user_id, course_id):
+        """
+        Throw away the grade summary of the user with id `user_id` in
+        `course_id` (a CourseKey).
+        """
+        cls.objects.filter(user_id=user_id, course_id=course_id).delete()
+        cache.set(cls._invalidation_cache_key(user_id, course_id), timezone.now(), cls.INVALIDATION_TIMEOUT)
+
+    @classmethod
+    def invalidated_since(cls, user_id, course_id, timestamp):
+        """
+        Return whether the grade summary of the user with id `user_id` in
+        `course_id` was invalidated at or after `timestamp`.
+        """
+        invalidated_at = cache.get(cls._invalidation_cache_key(user_id, course_id))
+        return invalidated_at is not None and invalidated_at >= timestamp
+
+    @staticmethod
+    def _invalidation_cache_key(user_id, course_id):
+        """
+        The cache key under which the last invalidation of a grade summary is
+        remembered.
+        """
+        return u"courseware.grade_summary_invalidated.{}.{}".format(course_id, user_id)
+
+
+class CourseMaxScores(models.Model):
+    """
+    The max scores of the scorable blocks of a published version of a course
+    (`course_version`), computed once for the whole course so that grading
+    doesn't have to instantiate problems to find out what they're worth.
+    Only the latest version of each course is kept.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('course_id', 'course_version'),)
+
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    course_version = models.CharField(max_length=255)
+    created = models.DateTimeField(auto_now_add=True)
+
+    max_scores = models.TextField()  # dict of block locations to max scores, stored as JSON
+
+    def __unicode__(self):
+        return "[CourseMaxScores] %s (%s)" % (self.course_id, self.course_version)
+
+    @classmethod
+    def get_max_scores(cls, course_id, course_version):
+        """
+        Return the dict of max scores stored for version `course_version` of
+        `course_id`, keyed by block location string, or None if there is none.
+        """
+        try:
+            return json.loads(cls.objects.get(course_id=course_id, course_version=course_version).max_scores)
+        except cls.DoesNotExist:
+            return None
+
+    @classmethod
+    def set_max_scores(cls, course_id, course_version, max_scores):
+        """
+        Store `max_scores` for version `course_version` of `course_id`,
+        replacing the max scores of any other version.
+        """
+        cls.objects.filter(course_id=course_id).exclude(course_version=course_version).delete()
+        try:
+            cls.objects.create(course_id=course_id, course_version=course_version, max_scores=json.dumps(max_scores))
+        except IntegrityError:
+            # The same version was stored concurrently.
+            log.info('Max scores of course %s (%s) were stored concurrently', course_id, course_version)
+
+
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
 # platform or in the Submissions module. Note that this signal will be triggered
@@ -420,3 +506,34 @@ def submissions_score_reset_handler(sender, **kwargs):  # pylint: disable=unused
             u"Failed to process score_reset signal from Submissions API. "
             "user: %s, course_id: %s, usage_id: %s", user, course_id, usage_id
         )
+
+
+@receiver(SCORE_CHANGED)
+def invalidate_grade_summary_on_score_change(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Throw away the persisted grade summary of a user whose score for a problem
+    has changed.
+    """
+    StudentGradeSummary.invalidate(kwargs['user_id'], CourseKey.from_string(kwargs['course_id']))
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_grade_summary_on_state_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Throw away the persisted grade summary of a user whose state for a problem
+    was deleted (e.g. by an instructor resetting the problem).
+    """
+    StudentGradeSummary.invalidate(instance.student_id, instance.course_id)
+
+
+@receiver(SignalHandler.course_published)
+def compute_max_scores_on_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Compute the max scores of a course's problems when it is published.
+    """
+    if settings.FEATURES.get('ENABLE_PRECOMPUTED_MAX_SCORES'):
+        # Import here to avoid a circular import.
+        from courseware.tasks import compute_course_max_scores
+        # As for the course structure, the countdown makes sure the task doesn't
+        # look at the course before the publish is complete.
+        compute_course_max_scores.apply_async([unicode(course_key)], countdown=0)
@@ -84,6 +84,7 @@ from edx_proctoring.services import ProctoringService
 from openedx.core.djangoapps.credit.services import CreditService
 
 from .field_overrides import OverrideFieldData
+from .toc import get_toc_skeleton
 
 log = logging.getLogger(__name__)
 
@@ -145,17 +146,31 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
     None if this is not the case.
 
     field_data_cache must include data from the course module and 2 levels of its descendents
+
+    If FEATURES['ENABLE_CACHED_COURSE_TOC'] is set, the table of contents is
+    built from a skeleton cached per version of the course (see
+    courseware.toc), filtered by the user's access to its chapters and
+    sections, rather than by instantiating them.
     '''
 
     with modulestore().bulk_operations(course.id):
-        course_module = get_module_for_descriptor(
-            user, request, course, field_data_cache, course.id, course=course
-        )
-        if course_module is None:
-            return None
+        toc_skeleton = None
+        if settings.FEATURES.get('ENABLE_CACHED_COURSE_TOC'):
+            toc_skeleton = get_toc_skeleton(course)
+
+        if toc_skeleton is not None:
+            if not has_access(user, 'load', course, course.id):
+                return None
+            chapters = [chapter for chapter in toc_skeleton if has_access(user, 'load', chapter, course.id)]
+        else:
+            course_module = get_module_for_descriptor(
+                user, request, course, field_data_cache, course.id, course=course
+            )
+            if course_module is None:
+                return None
+            chapters = course_module.get_display_items()
 
         toc_chapters = list()
-        chapters = course_module.get_display_items()
 
         # See if the course is gated by one or more content milestones
         required_content = milestones_helpers.get_required_content(course, user)
@@ -177,7 +192,13 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
                 continue
 
             sections = list()
-            for section in chapter.get_display_items():
+            display_items = chapter.get_display_items()
+            if toc_skeleton is not None:
+                # Bound chapters only have the sections the user has access to
+                display_items = [
+                    section for section in display_items if has_access(user, 'load', section, course.id)
+                ]
+            for section in display_items:
 
                 active = (chapter.url_name == active_chapter and
                           section.url_name == active_section)
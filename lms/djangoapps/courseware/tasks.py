@@ -0,0 +1,49 @@
+"""
+Asynchronous tasks for the courseware app.
+"""
+import logging
+
+from django.core.cache import cache
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.grades import compute_max_scores, course_version_for_grading
+from courseware.models import CourseMaxScores
+from lms import CELERY_APP
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+# How long to wait for a queued computation of a course's max scores before
+# queueing another one.
+MAX_SCORES_QUEUED_TIMEOUT = 60 * 60
+
+
+def queue_course_max_scores(course_key, course_version):
+    """
+    Queue the computation of the max scores of version `course_version` of
+    the course `course_key`, unless it was queued recently.
+    """
+    queued_key = u"courseware.max_scores_queued.{}.{}".format(course_key, course_version)
+    if cache.add(queued_key, True, MAX_SCORES_QUEUED_TIMEOUT):
+        compute_course_max_scores.delay(unicode(course_key))
+
+
+@CELERY_APP.task
+def compute_course_max_scores(course_id):
+    """
+    Compute the max scores of the problems of the published version of the
+    course `course_id` (a string), and store them with the course version.
+    """
+    course_key = CourseKey.from_string(course_id)
+    course = modulestore().get_course(course_key, depth=None)
+    if course is None or course.subtree_edited_on is None:
+        # Courses without a version (XML courses) can't be stored.
+        return
+
+    course_version = course_version_for_grading(course)
+    if CourseMaxScores.objects.filter(course_id=course_key, course_version=course_version).exists():
+        return
+
+    max_scores = compute_max_scores(course)
+    CourseMaxScores.set_max_scores(course_key, course_version, max_scores)
+    log.info(u'Computed the max scores of %s problems of course %s (%s)', len(max_scores), course_id, course_version)
@@ -1,21 +1,34 @@
 """
 Test grade calculation.
 """
+import threading
+import unittest
+
+from django.db import connection, connections, DEFAULT_DB_ALIAS
 from django.http import Http404
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
 
+from capa.tests.response_xml_factory import OptionResponseXMLFactory
 from mock import patch
 from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import field_data_cache_for_grading, grade, iterate_grades_for, MaxScoresCache
+from courseware import grades
+from courseware.grades import (
+    course_version_for_grading, field_data_cache_for_grading, grade, grade_many, iterate_grades_for, MaxScoresCache
+)
+from courseware.models import CourseMaxScores, SCORE_CHANGED, StudentGradeSummary, StudentModule
+from courseware.tasks import compute_course_max_scores
+from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from xmodule.modulestore.django import SignalHandler
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, **kwargs):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -26,7 +39,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, **kwargs)
 
 
 @attr('shard_1')
@@ -126,6 +139,289 @@ class TestGradeIteration(ModuleStoreTestCase):
         return students_to_gradesets, students_to_errors
 
 
+@attr('shard_1')
+class TestGradeMany(ModuleStoreTestCase):
+    """
+    Test that batch grading gives the same results as grading each student.
+    """
+    def setUp(self):
+        super(TestGradeMany, self).setUp()
+        self.course = CourseFactory.create(
+            grading_policy={
+                "GRADER": [{"type": "Homework", "min_count": 1, "drop_count": 0, "short_label": "HW", "weight": 1.0}],
+            },
+        )
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        sequential = ItemFactory.create(category='sequential', parent=chapter, graded=True, format='Homework')
+        self.problems = [ItemFactory.create(category='problem', parent=sequential) for __ in xrange(3)]
+        self.course = self.store.get_course(self.course.id)
+        self.students = [UserFactory.create(username='student{}'.format(i)) for i in xrange(4)]
+        for student in self.students:
+            CourseEnrollment.enroll(student, self.course.id)
+
+        # The first student has no state at all; the others have answered
+        # a growing number of problems.
+        for i, student in enumerate(self.students):
+            for problem in self.problems[:i]:
+                StudentModuleFactory.create(
+                    student=student,
+                    course_id=self.course.id,
+                    module_state_key=problem.location,
+                    state='{"attempts": 1}',
+                    grade=1,
+                    max_grade=2,
+                )
+
+    def test_same_as_grade(self):
+        """grade_many yields exactly what grade() returns for each student, in order."""
+        request = RequestFactory().get('/')
+        expected = []
+        for student in self.students:
+            request.user = student
+            request.session = {}
+            expected.append((student, grade(student, request, self.course, keep_raw_scores=True), ""))
+
+        self.assertEqual(list(grade_many(self.course, self.students, keep_raw_scores=True, batch_size=3)), expected)
+
+    def _grade_many_in_background(self, students, **kwargs):
+        """
+        Call grade_many with prefetching enabled, letting the background thread
+        use this thread's database connection, as LiveServerTestCase does, so
+        that it sees the test's uncommitted data.
+        """
+        main_connection = connections[DEFAULT_DB_ALIAS]
+        real_load_in_background = grades._load_in_background  # pylint: disable=protected-access
+
+        def load_in_background(load, items, depth, tags=None):
+            """Load each item with the main thread's connection."""
+            def load_with_main_connection(item):
+                """Switch to the main thread's connection before loading `item`."""
+                connections[DEFAULT_DB_ALIAS] = main_connection
+                return load(item)
+            return real_load_in_background(load_with_main_connection, items, depth, tags)
+
+        main_connection.allow_thread_sharing = True
+        try:
+            with patch('courseware.grades._load_in_background', side_effect=load_in_background) as mock_load:
+                with override_settings(GRADES_PREFETCH_BATCHES=2):
+                    for result in grade_many(self.course, students, **kwargs):
+                        yield result
+            self.assertTrue(mock_load.called)
+        finally:
+            main_connection.allow_thread_sharing = False
+
+    def test_same_with_prefetch(self):
+        """Prefetching batches in the background doesn't change the grades."""
+        expected = list(grade_many(self.course, self.students, keep_raw_scores=True, batch_size=1, prefetch_batches=0))
+        self.assertEqual(
+            list(self._grade_many_in_background(self.students, keep_raw_scores=True, batch_size=1)),
+            expected
+        )
+
+    def test_prefetch_errors_reach_caller(self):
+        """An error getting the students to prefetch is raised to the caller once its batch is reached."""
+        def students():
+            """Fail after the first two students."""
+            yield self.students[0]
+            yield self.students[1]
+            raise ValueError("Cannot get students")
+
+        results = self._grade_many_in_background(students(), batch_size=1)
+        self.assertEqual([next(results)[0], next(results)[0]], self.students[:2])
+        with self.assertRaises(ValueError):
+            next(results)
+
+    def _count_student_module_queries(self, students):
+        """Grade `students` in a single batch, returning the number of queries of StudentModules."""
+        connection.use_debug_cursor = True
+        try:
+            start = len(connection.queries)
+            list(grade_many(self.course, students, batch_size=len(students), prefetch_batches=0))
+            return len([query for query in connection.queries[start:] if 'courseware_studentmodule' in query['sql']])
+        finally:
+            connection.use_debug_cursor = False
+
+    def test_bounded_queries(self):
+        """The StudentModules of a batch are loaded together, whatever the number of students."""
+        self.assertEqual(self._count_student_module_queries(self.students[:2]), 1)
+        self.assertEqual(self._count_student_module_queries(self.students), 1)
+
+    def test_batch_load_errors(self):
+        """If a batch can't be loaded, its students are loaded, and can fail, one at a time."""
+        expected = list(grade_many(self.course, self.students, keep_raw_scores=True, prefetch_batches=0))
+        expected[1] = (self.students[1], {}, "Cannot load")
+        real_multi_user_cache = grades.MultiUserFieldDataCache
+
+        def load(descriptors, course_id, users):
+            """Fail to load more than one student at a time, or the second student."""
+            if len(users) > 1 or users[0] == self.students[1]:
+                raise Exception("Cannot load")
+            return real_multi_user_cache(descriptors, course_id, users)
+
+        with patch('courseware.grades.MultiUserFieldDataCache', side_effect=load):
+            results = list(grade_many(self.course, self.students, keep_raw_scores=True, prefetch_batches=0))
+        self.assertEqual(results, expected)
+
+    def test_corrupt_state(self):
+        """A student whose state can't be decoded fails alone, without stopping the batch."""
+        StudentModule.objects.filter(student=self.students[2]).update(state='{"attempts": ')
+        results = list(grade_many(self.course, self.students, batch_size=4))
+
+        self.assertEqual([student for student, __, __ in results], self.students)
+        self.assertEqual(results[2][1], {})
+        self.assertNotEqual(results[2][2], "")
+        for index in (0, 1, 3):
+            self.assertNotEqual(results[index][1], {})
+            self.assertEqual(results[index][2], "")
+
+
+class TestLoadInBackground(unittest.TestCase):  # pylint: disable=protected-access
+    """
+    Test the background loading of grade_many's batches.
+    """
+    def test_preserves_order(self):
+        self.assertEqual(
+            list(grades._load_in_background(lambda item: item * 2, iter(xrange(20)), 3)),
+            [item * 2 for item in xrange(20)],
+        )
+
+    def test_reraises_load_errors(self):
+        def load(item):
+            """Fail to load the third item."""
+            if item == 2:
+                raise ValueError(item)
+            return item
+
+        loaded = grades._load_in_background(load, iter(xrange(5)), 2)
+        self.assertEqual([next(loaded), next(loaded)], [0, 1])
+        with self.assertRaises(ValueError):
+            next(loaded)
+
+    def test_stops_when_closed(self):
+        loaded_items = []
+        thread_names = []
+
+        def load(item):
+            """Record which items were loaded, and by which thread."""
+            loaded_items.append(item)
+            thread_names.append(threading.current_thread().name)
+            return item
+
+        loaded = grades._load_in_background(load, iter(xrange(1000)), 2)
+        self.assertEqual(next(loaded), 0)
+        loaded.close()
+        for thread in threading.enumerate():
+            if thread.name == 'load_in_background':
+                thread.join(1)
+        # At most the yielded item, a full queue and the one being put
+        self.assertLessEqual(len(loaded_items), 4)
+        self.assertNotIn(threading.current_thread().name, thread_names)
+
+
+@patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_GRADE_SUMMARIES": True})
+class TestPersistentGradeSummaries(ModuleStoreTestCase):
+    """
+    Test that grade summaries are persisted between gradings until a score
+    or the course changes.
+    """
+    def setUp(self):
+        super(TestPersistentGradeSummaries, self).setUp()
+        self.course = CourseFactory.create(
+            grading_policy={
+                "GRADER": [{"type": "Homework", "min_count": 1, "drop_count": 0, "short_label": "HW", "weight": 1.0}],
+            },
+        )
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        self.sequential = ItemFactory.create(category='sequential', parent=chapter, graded=True, format='Homework')
+        self.problem = ItemFactory.create(category='problem', parent=self.sequential)
+        self.course = self.store.get_course(self.course.id)
+        self.student = UserFactory.create()
+        CourseEnrollment.enroll(self.student, self.course.id)
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problem.location,
+            state='{"attempts": 1}',
+            grade=1,
+            max_grade=2,
+        )
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _grade(self):
+        """Grade the student, returning the summary and whether it was computed."""
+        with patch('courseware.grades._grade', wraps=grades._grade) as mock_grade:
+            grade_summary = grade(self.student, self.request, self.course)
+        return grade_summary, mock_grade.called
+
+    def test_persisted_summary_is_used(self):
+        grade_summary, computed = self._grade()
+        self.assertTrue(computed)
+        self.assertEqual(StudentGradeSummary.objects.filter(user=self.student).count(), 1)
+
+        persisted_summary, computed = self._grade()
+        self.assertFalse(computed)
+        self.assertEqual(persisted_summary, grade_summary)
+
+    def test_persisted_summary_sends_grades_updated(self):
+        grade_summary, __ = self._grade()
+        with patch('courseware.grades.GRADES_UPDATED.send_robust', return_value=[]) as mock_send:
+            __, computed = self._grade()
+        self.assertFalse(computed)
+        mock_send.assert_called_once_with(
+            sender=None,
+            username=self.student.username,
+            grade_summary=grade_summary,
+            course_key=self.course.id,
+            deadline=self.course.end,
+        )
+
+    def test_raw_scores_are_not_persisted(self):
+        grade(self.student, self.request, self.course, keep_raw_scores=True)
+        self.assertFalse(StudentGradeSummary.objects.filter(user=self.student).exists())
+
+    def test_score_change_invalidates(self):
+        self._grade()
+        SCORE_CHANGED.send(
+            sender=None,
+            points_possible=2,
+            points_earned=2,
+            user_id=self.student.id,
+            course_id=unicode(self.course.id),
+            usage_id=unicode(self.problem.location),
+        )
+        self.assertFalse(StudentGradeSummary.objects.filter(user=self.student).exists())
+        __, computed = self._grade()
+        self.assertTrue(computed)
+
+    def test_invalidated_during_grading_is_not_persisted(self):
+        def _grade_and_invalidate(*args, **kwargs):
+            """Simulate a score changing while the student is being graded."""
+            grade_summary = grades._grade(*args, **kwargs)
+            StudentGradeSummary.invalidate(self.student.id, self.course.id)
+            return grade_summary
+
+        with patch('courseware.grades._grade', side_effect=_grade_and_invalidate):
+            grade(self.student, self.request, self.course)
+        self.assertFalse(StudentGradeSummary.objects.filter(user=self.student).exists())
+
+    def test_publish_invalidates(self):
+        self._grade()
+        self.sequential.display_name = 'Renamed'
+        self.store.update_item(self.sequential, self.user.id)
+        self.course = self.store.get_course(self.course.id)
+        __, computed = self._grade()
+        self.assertTrue(computed)
+
+    def test_grade_many_uses_persisted_summaries(self):
+        grade_summary, __ = self._grade()
+        with patch('courseware.grades._grade') as mock_grade:
+            results = list(grade_many(self.course, [self.student]))
+        self.assertFalse(mock_grade.called)
+        self.assertEqual(results, [(self.student, grade_summary, "")])
+
+
 class TestMaxScoresCache(ModuleStoreTestCase):
     """
     Tests for the MaxScoresCache
@@ -167,6 +463,97 @@ class TestMaxScoresCache(ModuleStoreTestCase):
         self.assertEqual(max_scores_cache.num_cached_from_remote(), 1)
 
 
+@patch.dict("django.conf.settings.FEATURES", {"ENABLE_PRECOMPUTED_MAX_SCORES": True})
+class TestPrecomputedMaxScores(ModuleStoreTestCase):
+    """
+    Test that max scores are computed once per course version, and used when
+    grading.
+    """
+    def setUp(self):
+        super(TestPrecomputedMaxScores, self).setUp()
+        self.course = CourseFactory.create(
+            grading_policy={
+                "GRADER": [{"type": "Homework", "min_count": 1, "drop_count": 0, "short_label": "HW", "weight": 1.0}],
+            },
+        )
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        sequential = ItemFactory.create(category='sequential', parent=chapter, graded=True, format='Homework')
+        problem_xml = OptionResponseXMLFactory().build_xml(
+            question_text='The correct answer is Correct',
+            options=['Correct', 'Incorrect'],
+            correct_option='Correct'
+        )
+        self.problems = [
+            ItemFactory.create(category='problem', parent=sequential, data=problem_xml) for __ in xrange(2)
+        ]
+        self.course = self.store.get_course(self.course.id)
+        self.course_version = course_version_for_grading(self.course)
+        grades._PRECOMPUTED_MAX_SCORES.clear()  # pylint: disable=protected-access
+        self.addCleanup(grades._PRECOMPUTED_MAX_SCORES.clear)  # pylint: disable=protected-access
+
+    def test_compute_course_max_scores(self):
+        compute_course_max_scores(unicode(self.course.id))
+        self.assertEqual(
+            CourseMaxScores.get_max_scores(self.course.id, self.course_version),
+            {unicode(problem.location): 1 for problem in self.problems}
+        )
+
+    def test_publish_computes_max_scores(self):
+        with patch('courseware.tasks.compute_course_max_scores.apply_async') as mock_apply_async:
+            SignalHandler.course_published.send(sender=None, course_key=self.course.id)
+        mock_apply_async.assert_called_once_with([unicode(self.course.id)], countdown=0)
+
+    def test_grading_uses_precomputed_max_scores(self):
+        # A max score that instantiating the problem wouldn't give
+        CourseMaxScores.set_max_scores(
+            self.course.id, self.course_version, {unicode(problem.location): 5 for problem in self.problems}
+        )
+        student = UserFactory.create()
+        CourseEnrollment.enroll(student, self.course.id)
+        StudentModuleFactory.create(
+            student=student,
+            course_id=self.course.id,
+            module_state_key=self.problems[0].location,
+            state='{"attempts": 1}',
+            grade=1,
+            max_grade=1,
+        )
+        request = RequestFactory().get('/')
+        request.user = student
+        request.session = {}
+
+        with patch('courseware.grades.get_module_for_descriptor') as mock_get_module:
+            grade_summary = grade(student, request, self.course, keep_raw_scores=True)
+        self.assertFalse(mock_get_module.called)
+        self.assertEqual(
+            [(score.earned, score.possible) for score in grade_summary['raw_scores']],
+            [(1, 1), (0.0, 5)]
+        )
+
+    def test_missing_max_scores_are_computed_once(self):
+        with patch('courseware.tasks.compute_course_max_scores.delay') as mock_delay:
+            for __ in xrange(2):
+                MaxScoresCache.create_for_course(self.course).fetch_from_remote(
+                    [problem.location for problem in self.problems]
+                )
+        mock_delay.assert_called_once_with(unicode(self.course.id))
+
+    def test_precomputed_max_scores_are_loaded_once(self):
+        # Only the first problem has a precomputed max score
+        CourseMaxScores.set_max_scores(
+            self.course.id, self.course_version, {unicode(self.problems[0].location): 5}
+        )
+        with patch.object(
+            CourseMaxScores, 'get_max_scores', wraps=CourseMaxScores.get_max_scores
+        ) as mock_get_max_scores:
+            for __ in xrange(2):
+                max_scores_cache = MaxScoresCache.create_for_course(self.course)
+                max_scores_cache.fetch_from_remote([problem.location for problem in self.problems])
+                self.assertEqual(max_scores_cache.get(self.problems[0].location), 5)
+                self.assertIsNone(max_scores_cache.get(self.problems[1].location))
+        self.assertEqual(mock_get_max_scores.call_count, 1)
+
+
 class TestFieldDataCacheScorableLocations(ModuleStoreTestCase):
     """
     Make sure we can filter the locations we pull back student state for via
@@ -6,7 +6,7 @@ from mock import Mock, patch
 from nose.plugins.attrib import attr
 from functools import partial
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError, MultiUserFieldDataCache
 from courseware.models import StudentModule
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
@@ -415,3 +415,69 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@attr('shard_1')
+class TestMultiUserFieldDataCache(TestCase):
+    """Tests for loading the user_state of many users at once"""
+    def setUp(self):
+        super(TestMultiUserFieldDataCache, self).setUp()
+        self.descriptor = mock_descriptor([mock_field(Scope.user_state, 'a_field')])
+        self.descriptor.location = location('usage_id')
+        self.descriptor.has_score = True
+        self.users = [
+            StudentModuleFactory(state=json.dumps({'a_field': index}), grade=index, max_grade=3).student
+            for index in range(3)
+        ]
+        # A user who has never seen the problem
+        self.users.append(UserFactory.create())
+
+    def test_per_user_caches(self):
+        # There should be one query per chunk of users
+        with self.assertNumQueries(2):
+            multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users, chunk_size=2)
+
+        with self.assertNumQueries(0):
+            for index, user in enumerate(self.users[:3]):
+                kvs = DjangoKeyValueStore(multi_user_cache.field_data_cache_for(user))
+                key = DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field')
+                self.assertEqual(kvs.get(key), index)
+                self.assertEqual(
+                    multi_user_cache.scores_client_for(user).get(location('usage_id')),
+                    (index, 3)
+                )
+
+            kvs = DjangoKeyValueStore(multi_user_cache.field_data_cache_for(self.users[3]))
+            self.assertFalse(kvs.has(DjangoKeyValueStore.Key(
+                Scope.user_state, self.users[3].id, location('usage_id'), 'a_field'
+            )))
+            self.assertIsNone(multi_user_cache.scores_client_for(self.users[3]).get(location('usage_id')))
+
+    def test_writes_go_to_the_database(self):
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        user = self.users[0]
+        kvs = DjangoKeyValueStore(multi_user_cache.field_data_cache_for(user))
+        kvs.set(DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field'), 'new_value')
+
+        student_module = StudentModule.objects.get(student=user, module_state_key=location('usage_id'))
+        self.assertEqual(json.loads(student_module.state), {'a_field': 'new_value'})
+
+    def test_unknown_user(self):
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users[:2])
+        with self.assertRaises(ValueError):
+            multi_user_cache.field_data_cache_for(self.users[2])
+
+    def test_corrupt_state(self):
+        StudentModule.objects.filter(student=self.users[1]).update(state='{"a_field": ')
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+
+        # Only the user with the corrupt state fails
+        with self.assertRaises(ValueError):
+            multi_user_cache.field_data_cache_for(self.users[1])
+        with self.assertRaises(ValueError):
+            multi_user_cache.scores_client_for(self.users[1])
+        for index in (0, 2):
+            user = self.users[index]
+            kvs = DjangoKeyValueStore(multi_user_cache.field_data_cache_for(user))
+            key = DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field')
+            self.assertEqual(kvs.get(key), index)
@@ -5,6 +5,7 @@ Test for lms courseware app, module render unit
 import ddt
 import itertools
 import json
+from datetime import datetime, timedelta
 from nose.plugins.attrib import attr
 from functools import partial
 
@@ -19,6 +20,7 @@ from mock import MagicMock, patch, Mock
 from opaque_keys.edx.keys import UsageKey, CourseKey
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from pyquery import PyQuery
+from pytz import UTC
 from courseware.module_render import hash_resource
 from xblock.field_data import FieldData
 from xblock.runtime import Runtime
@@ -36,6 +38,7 @@ from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory, UserFactory, GlobalStaffFactory, StaffFactory, InstructorFactory
 from courseware.tests.tests import LoginEnrollmentTestCase
 from courseware.tests.test_submitting_problems import TestSubmittingProblems
+from courseware.toc import get_toc_skeleton
 from lms.djangoapps.lms_xblock.runtime import quote_slashes
 from lms.djangoapps.lms_xblock.field_data import LmsFieldData
 from student.models import anonymous_id_for_user
@@ -741,6 +744,71 @@ class TestTOC(ModuleStoreTestCase):
                 self.assertIn(toc_section, actual)
 
 
+@attr('shard_1')
+@ddt.ddt
+class TestCachedTOC(ModuleStoreTestCase):
+    """
+    Check that the cached table of contents skeleton gives the same table of
+    contents as instantiating the course.
+    """
+    def setUp(self):
+        super(TestCachedTOC, self).setUp()
+        self.course = CourseFactory.create()
+        future = datetime.now(UTC) + timedelta(days=1)
+        for chapter_name, chapter_settings in (
+                ('open', {}),
+                ('future', {'start': future}),
+                ('staff_only', {'visible_to_staff_only': True}),
+                ('hidden', {'hide_from_toc': True}),
+        ):
+            chapter = ItemFactory.create(
+                parent=self.course, category='chapter', display_name=chapter_name, **chapter_settings
+            )
+            ItemFactory.create(parent=chapter, category='sequential', display_name='open_section', format='Homework')
+            ItemFactory.create(parent=chapter, category='sequential', display_name='future_section', start=future)
+        self.course = self.store.get_course(self.course.id, depth=2)
+
+    def _toc(self, user, cached):
+        """Return the table of contents of the course for `user`."""
+        request = RequestFactory().get('/')
+        request.user = user
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(self.course.id, user, self.course, depth=2)
+        with patch.dict('django.conf.settings.FEATURES', {'ENABLE_CACHED_COURSE_TOC': cached}):
+            return render.toc_for_course(user, request, self.course, None, None, field_data_cache)
+
+    @ddt.data(UserFactory, GlobalStaffFactory)
+    def test_same_as_uncached(self, user_factory):
+        user = user_factory.create()
+        self.assertEqual(self._toc(user, cached=True), self._toc(user, cached=False))
+
+    def test_hides_unavailable_blocks(self):
+        toc = self._toc(UserFactory.create(), cached=True)
+        self.assertEqual([chapter['display_name'] for chapter in toc], ['open'])
+        self.assertEqual(
+            toc[0]['sections'],
+            [{
+                'display_name': 'open_section',
+                'url_name': self.course.get_children()[0].get_children()[0].url_name,
+                'format': 'Homework',
+                'due': None,
+                'active': False,
+                'graded': False,
+            }],
+        )
+
+    def test_no_skeleton_with_group_access(self):
+        chapter = self.course.get_children()[0]
+        chapter.group_access = {0: [0]}
+        self.store.update_item(chapter, self.user.id)
+        self.course = self.store.get_course(self.course.id, depth=2)
+        self.assertIsNone(get_toc_skeleton(self.course))
+
+    def test_no_skeleton_with_field_overrides(self):
+        self.assertIsNotNone(get_toc_skeleton(self.course))
+        with patch.object(OverrideFieldData, 'has_providers_for_course', return_value=True):
+            self.assertIsNone(get_toc_skeleton(self.course))
+
+
 @attr('shard_1')
 @ddt.ddt
 @patch.dict('django.conf.settings.FEATURES', {'ENABLE_PROCTORED_EXAMS': True})
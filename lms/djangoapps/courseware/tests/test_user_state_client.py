@@ -4,13 +4,12 @@ defined in edx_user_state_client.
 """
 
 from collections import defaultdict
-from unittest import skip
 
 from django.test import TestCase
 
 from edx_user_state_client.tests import UserStateClientTestBase
 from courseware.user_state_client import DjangoXBlockUserStateClient
-from courseware.tests.factories import UserFactory
+from courseware.tests.factories import course_id, location, StudentModuleFactory, UserFactory
 
 
 class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
@@ -32,36 +31,62 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
 
-    # We're skipping these tests because the iter_all_by_block and iter_all_by_course
-    # are not implemented in the DjangoXBlockUserStateClient
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_deleted_block(self):
-        pass
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_many_users(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_many_users(self):
-        pass
+class TestDjangoUserStateClientIterAll(TestCase):
+    """
+    Tests of the batching and filtering of DjangoUserStateClient.iter_all_for_block
+    and iter_all_for_course.
+    """
+    def setUp(self):
+        super(TestDjangoUserStateClientIterAll, self).setUp()
+        self.client = DjangoXBlockUserStateClient()
+        self.users = [UserFactory.create() for __ in xrange(5)]
+        for user in self.users:
+            StudentModuleFactory.create(
+                student=user, course_id=course_id, module_state_key=location('p1'), state='{"a": 1}', grade=1
+            )
+        # Not graded
+        StudentModuleFactory.create(
+            student=self.users[0], course_id=course_id, module_state_key=location('p2'), state='{"a": 2}'
+        )
+        StudentModuleFactory.create(
+            student=self.users[0],
+            course_id=course_id,
+            module_state_key=course_id.make_usage_key('html', 'h1'),
+            module_type='html',
+            state='{"a": 3}',
+        )
+        # Deleted, missing or broken state isn't yielded
+        for state in ('{}', None, 'invalid json!'):
+            StudentModuleFactory.create(
+                student=UserFactory.create(), course_id=course_id, module_state_key=location('p1'), state=state
+            )
+
+    def test_iter_all_for_block_in_batches(self):
+        # One query per batch of 2 of the 8 StudentModules of p1, and one
+        # that finds there are no more
+        with self.assertNumQueries(5):
+            user_states = list(self.client.iter_all_for_block(location('p1'), batch_size=2))
+        self.assertItemsEqual(
+            [(user_state.username, user_state.block_key, user_state.state) for user_state in user_states],
+            [(user.username, location('p1'), {'a': 1}) for user in self.users],
+        )
+
+    def test_iter_all_for_block_graded_only(self):
+        self.assertEqual(len(list(self.client.iter_all_for_block(location('p1'), graded_only=True))), 5)
+        self.assertEqual(list(self.client.iter_all_for_block(location('p2'), graded_only=True)), [])
+
+    def test_iter_all_for_block_include_empty(self):
+        user_states = list(self.client.iter_all_for_block(location('p1'), include_empty=True))
+        self.assertEqual(len(user_states), 7)
+        self.assertEqual(len([user_state for user_state in user_states if user_state.state == {}]), 2)
+
+    def test_iter_all_for_course(self):
+        self.assertEqual(len(list(self.client.iter_all_for_course(course_id, batch_size=3))), 7)
+        self.assertEqual(
+            [user_state.block_key for user_state in self.client.iter_all_for_course(course_id, block_type='html')],
+            [course_id.make_usage_key('html', 'h1')],
+        )
+        self.assertEqual(
+            len(list(self.client.iter_all_for_course(course_id, block_type='problem', graded_only=True))), 5
+        )
@@ -0,0 +1,123 @@
+"""
+A cached skeleton of the table of contents of each published version of a
+course, so that `toc_for_course` doesn't have to instantiate the course and
+its chapters and sections for every user.
+
+The skeleton only holds what the blocks' settings say, which is the same
+for every user. What each user may see of it is worked out by checking
+their access to its blocks (see `courseware.access`), as for the blocks
+themselves. Courses whose table of contents depends on more than that
+(field override providers, group access, A/B tests) don't get a skeleton,
+and are handled by instantiating their blocks as before.
+"""
+import logging
+
+from django.core.cache import cache, get_cache, InvalidCacheBackendError
+
+from .field_overrides import OverrideFieldData
+
+
+log = logging.getLogger(__name__)
+
+# Blocks whose displayable items depend on the user.
+PER_USER_DISPLAY_CATEGORIES = ('abtest',)
+
+
+class TocBlock(object):
+    """
+    The settings of a chapter or section needed to build a table of contents,
+    and to check a user's access to it (see `courseware.access`).
+    """
+    def __init__(self, descriptor, children=None):
+        self.location = descriptor.location
+        self.category = descriptor.category
+        self.url_name = descriptor.url_name
+        self.display_name_with_default = descriptor.display_name_with_default
+        self.format = descriptor.format
+        self.due = descriptor.due
+        self.graded = descriptor.graded
+        self.hide_from_toc = descriptor.hide_from_toc
+        self.start = descriptor.start
+        self.days_early_for_beta = descriptor.days_early_for_beta
+        self.visible_to_staff_only = descriptor.visible_to_staff_only
+        self.is_proctored_enabled = getattr(descriptor, 'is_proctored_enabled', False)
+        self._class_tags = set(descriptor._class_tags)  # pylint: disable=protected-access
+        # Skeletons are only built for blocks without group access
+        # restrictions, so there are no user partitions to check.
+        self.user_partitions = []
+        self.children = children or []
+
+    def get_display_items(self):
+        """
+        The chapter's sections, as `XModuleMixin.get_display_items`, without
+        checking access to them.
+        """
+        return self.children
+
+
+def _toc_cache():
+    """
+    The cache skeletons are stored in: alongside the course structures, if they
+    are cached.
+    """
+    try:
+        return get_cache('course_structure_cache')
+    except InvalidCacheBackendError:
+        return cache
+
+
+def _display_items(descriptor):
+    """
+    Return the displayable children of `descriptor`, or None if they may
+    depend on the user.
+    """
+    children = descriptor.get_children()
+    for child in children:
+        if child.category in PER_USER_DISPLAY_CATEGORIES or child.merged_group_access:
+            return None
+    return children
+
+
+def build_toc_skeleton(course):
+    """
+    Return the chapters of `course` as `TocBlock`s, with their sections as
+    children, or None if its table of contents can't be built from a
+    skeleton.
+    """
+    chapters = _display_items(course)
+    if chapters is None:
+        return None
+
+    toc_chapters = []
+    for chapter in chapters:
+        sections = _display_items(chapter)
+        if sections is None:
+            return None
+        toc_chapters.append(TocBlock(chapter, [TocBlock(section) for section in sections]))
+    return toc_chapters
+
+
+def get_toc_skeleton(course):
+    """
+    Return the (cached) table of contents skeleton of `course` (see
+    `build_toc_skeleton`), or None if it can't have one.
+    """
+    if OverrideFieldData.has_providers_for_course(course):
+        return None
+    course_version = course.subtree_edited_on
+    if course_version is None:
+        return None
+
+    cache_key = u'courseware.toc.{}.{}'.format(course.id, course_version.isoformat())
+    toc_cache = _toc_cache()
+    cached = toc_cache.get(cache_key)
+    if cached is not None:
+        return cached['chapters']
+
+    chapters = build_toc_skeleton(course)
+    if chapters is None:
+        log.info(u"Course %s doesn't support a cached table of contents", course.id)
+    # Courses that can't have a skeleton are cached too, so they aren't
+    # checked again until they're republished.
+    toc_cache.set(cache_key, {'chapters': chapters})
+    return chapters
@@ -4,6 +4,7 @@ data in a Django ORM model.
 """
 
 import itertools
+import logging
 from operator import attrgetter
 from time import time
 
@@ -13,12 +14,18 @@ except ImportError:
     import json
 
 import dogstats_wrapper as dog_stats_api
+from django.conf import settings
 from django.contrib.auth.models import User
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import UsageKey
 from xblock.fields import Scope, ScopeBase
 from courseware.models import StudentModule, StudentModuleHistory
 from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
 
 
+log = logging.getLogger(__name__)
+
+
 class DjangoXBlockUserStateClient(XBlockUserStateClient):
     """
     An interface that uses the Django ORM StudentModule as a backend.
@@ -42,6 +49,10 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
     # Use this sample rate for DataDog events.
     API_DATADOG_SAMPLE_RATE = 0.01
 
+    # The number of StudentModules fetched by each query of iter_all_for_block
+    # and iter_all_for_course, unless they're given a batch_size.
+    ITER_ALL_BATCH_SIZE = 1000
+
     class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
         """
         This error is raised if the service backing this client is currently unavailable.
@@ -319,22 +330,110 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
             yield XBlockUserState(username, block_key, state, history_entry.created, scope)
 
-    def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
+    def _iter_all_student_modules(self, course_key, batch_size=None, graded_only=False, include_empty=False, **kwargs):
+        """
+        Yield an `XBlockUserState` for each StudentModule in `course_key` that
+        matches `kwargs` and has stored state (or any state, if `include_empty`).
+
+        The StudentModules are fetched `batch_size` at a time, in primary key
+        order, each batch starting after the last key of the previous one, so
+        every query is a short range scan of an index and only one batch is
+        ever held in memory. The read replica is used if there is one.
+
+        Arguments:
+            course_key (CourseKey): The course of the StudentModules.
+            batch_size (int): The number of StudentModules to fetch per query.
+            graded_only (bool): Only include StudentModules with a grade, i.e.
+                problems that have been submitted.
+            include_empty (bool): Also include StudentModules with no stored
+                or deleted state, with an empty state dict.
+        """
+        batch_size = batch_size or self.ITER_ALL_BATCH_SIZE
+        student_modules = StudentModule.objects.filter(course_id=course_key, **kwargs)
+        if graded_only:
+            student_modules = student_modules.filter(grade__isnull=False)
+        if "read_replica" in settings.DATABASES:
+            student_modules = student_modules.using("read_replica")
+        student_modules = student_modules.order_by('id').values_list(
+            'id', 'student__username', 'module_state_key', 'state', 'modified'
+        )
+
+        last_id = 0
+        while True:
+            rows = list(student_modules.filter(id__gt=last_id)[:batch_size])
+            for student_module_id, username, module_state_key, state, modified in rows:
+                if not state and not include_empty:
+                    continue
+                try:
+                    usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+                    state = json.loads(state) if state else {}
+                except (InvalidKeyError, ValueError):
+                    log.warning(
+                        u"Skipping StudentModule %s in course %s, which has an invalid key or state",
+                        student_module_id,
+                        course_key,
+                    )
+                    continue
+
+                # As in get_many, deleted state is treated as if it doesn't exist.
+                if state == {} and not include_empty:
+                    continue
+                yield XBlockUserState(username, usage_key, state, modified, Scope.user_state)
+
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1][0]
+
+    def iter_all_for_block(
+            self, block_key, scope=Scope.user_state, batch_size=None, graded_only=False, include_empty=False
+    ):
         """
+        Yield an `XBlockUserState` for every user with stored state for
+        `block_key`.
+
         You get no ordering guarantees. Fetching will happen in batch_size
         increments. If you're using this method, you should be running in an
         async task.
+
+        Arguments:
+            block_key (UsageKey): The block to load the state of.
+            scope (Scope): The scope to load data from.
+            batch_size (int): The number of rows fetched by each query.
+            graded_only (bool): Only include state with a grade, i.e. of
+                problems that have been submitted.
+            include_empty (bool): Also include users whose state is missing
+                or deleted, with an empty state dict.
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        return self._iter_all_student_modules(
+            block_key.course_key,
+            batch_size=batch_size,
+            graded_only=graded_only,
+            include_empty=include_empty,
+            module_state_key=block_key,
+        )
 
-    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
+    def iter_all_for_course(
+            self, course_key, block_type=None, scope=Scope.user_state, batch_size=None, graded_only=False
+    ):
         """
+        Yield an `XBlockUserState` for every block and user with stored state
+        in `course_key`, optionally only for blocks of `block_type`.
+
         You get no ordering guarantees. Fetching will happen in batch_size
         increments. If you're using this method, you should be running in an
         async task.
+
+        Arguments:
+            course_key (CourseKey): The course to load the state of.
+            block_type (str): Only load the state of blocks of this type.
+            scope (Scope): The scope to load data from.
+            batch_size (int): The number of rows fetched by each query.
+            graded_only (bool): Only include state with a grade, i.e. of
+                problems that have been submitted.
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        kwargs = {'module_type': block_type} if block_type is not None else {}
+        return self._iter_all_student_modules(course_key, batch_size=batch_size, graded_only=graded_only, **kwargs)
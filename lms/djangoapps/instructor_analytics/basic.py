@@ -21,7 +21,7 @@ from microsite_configuration import microsite
 from student.models import CourseEnrollmentAllowed
 from edx_proctoring.api import get_all_exam_attempts
 
-from courseware.models import StudentModule
+from courseware.user_state_client import DjangoXBlockUserStateClient
 from student.models import CourseEnrollment
 
 
@@ -446,51 +446,49 @@ def iterate_problem_components(course):
                         yield component, parent_metadata
 
 
+def student_response(state_dict):
+    """
+    Returns the pretty printed answers in a student's state of a problem, or
+    None if it has no answers.
+    """
+    # Include other problems, e.g. Free Text Response, Submit And Compare Xblocks
+    # that write 'student_answer' to the state.
+    if 'student_answers' in state_dict:
+        raw_answers = state_dict['student_answers']
+        return u', '.join([
+            u"{problem}={answer}".format(
+                problem=problem,
+                answer=answer,
+            )
+            for (problem, answer) in raw_answers.items()
+        ])
+    elif 'student_answer' in state_dict:
+        raw_answer = state_dict['student_answer']
+        return u"{answer}".format(answer=raw_answer)
+    else:
+        return None
+
+
 def student_responses(course):
     """
     Yields student responses for all problems in course for writing out to a CSV file.
     """
+    user_state_client = DjangoXBlockUserStateClient()
     order = 1
     for problem_component, parent_metadata in iterate_problem_components(course):
         problem_component_info = parent_metadata + [problem_component.display_name_with_default, order, problem_component.location]
-        modules = StudentModule.objects.filter(
-            course_id=course.id,
-            grade__isnull=False,
-            module_state_key=problem_component.location,
-        ).order_by('student__username')
-        if modules:
-            has_answer = False
-            for module in modules:
-                try:
-                    state_dict = json.loads(module.state) if module.state else {}
-                except ValueError:
-                    log.error("Student responses: Could not parse module state for " +
-                              "StudentModule id={module_id}, course={course_id}".format(module_id=module.id, course_id=course.id))
-                    continue
-
-                # Include other problems, e.g. Free Text Response, Submit And Compare Xblocks
-                # that write 'student_answer' to the state.
-                if 'student_answers' in state_dict:
-                    raw_answers = state_dict['student_answers']
-                    pretty_answers = u', '.join([
-                        u"{problem}={answer}".format(
-                            problem=problem,
-                            answer=answer,
-                        )
-                        for (problem, answer) in raw_answers.items()
-                    ])
-                elif 'student_answer' in state_dict:
-                    raw_answer = state_dict['student_answer']
-                    pretty_answers = u"{answer}".format(answer=raw_answer)
-                else:
-                    raw_answers = {}
-                    pretty_answers = None
-
-                yield problem_component_info + [module.student.username, pretty_answers]
-                if not has_answer:
-                    has_answer = True
-            if has_answer:
-                order += 1
+        # Submitted problems without any state still get a row, with no response.
+        user_states = user_state_client.iter_all_for_block(
+            problem_component.location, graded_only=True, include_empty=True
+        )
+        responses = sorted(
+            (user_state.username, student_response(user_state.state)) for user_state in user_states
+        )
+        for username, pretty_answers in responses:
+            yield problem_component_info + [username, pretty_answers]
+        # Only problems with at least one row use up an order number.
+        if responses:
+            order += 1
 
 
 def student_response_rows(course):
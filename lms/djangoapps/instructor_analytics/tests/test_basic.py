@@ -582,3 +582,33 @@ class TestStudentResponsesAnalyticsBasic(ModuleStoreTestCase):
 
         datarows = list(student_responses(self.course))
         self.assertEqual(datarows[0][-1], None)
+
+    def test_problem_with_empty_state(self):
+        self.course = get_course(CourseKey.from_string('edX/graded/2012_Fall'))
+        problem_location = Location('edX', 'graded', '2012_Fall', 'problem', 'H1P2')
+        other_problem_location = Location('edX', 'graded', '2012_Fall', 'problem', 'H1P3')
+
+        for state in (None, u'{}'):
+            self.create_student()
+            StudentModuleFactory.create(
+                course_id=self.course.id,
+                module_state_key=other_problem_location,
+                student=self.student,
+                grade=0,
+                state=state,
+            )
+        StudentModuleFactory.create(
+            course_id=self.course.id,
+            module_state_key=problem_location,
+            student=self.student,
+            grade=0,
+            state=u'invalid json!',
+        )
+
+        # Submitted problems without any state get a row with no response, but
+        # a problem whose only state can't be parsed gets no row and no order.
+        datarows = list(student_responses(self.course))
+        self.assertEqual(
+            [(row[4], row[5], row[-1]) for row in datarows],
+            [(1, other_problem_location, None), (1, other_problem_location, None)],
+        )
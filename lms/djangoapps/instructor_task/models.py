@@ -18,7 +18,9 @@ from uuid import uuid4
 import csv
 import json
 import hashlib
+import os
 import os.path
+import tempfile
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -35,6 +37,10 @@ from xmodule_django.models import CourseKeyField
 QUEUING = 'QUEUING'
 PROGRESS = 'PROGRESS'
 
+# Suffix for report files that are still being assembled (e.g. the per-shard
+# pieces of a sharded grade report).  Such files are never listed for download.
+PARTIAL_REPORT_SUFFIX = '.partial'
+
 
 class InstructorTask(models.Model):
     """
@@ -193,9 +199,12 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download.
+
+    `store_rows()` accepts any iterable of rows, including a generator, and
+    writes the rows out as they are produced, so a report never has to be
+    held in memory in its entirety. A report only becomes visible once all
+    of its rows have been written.
     """
     @classmethod
     def from_config(cls, config_name):
@@ -218,6 +227,83 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    @staticmethod
+    def _get_unicode_decoded_rows(csv_file):
+        """
+        Given a file-like object containing a utf-8 encoded CSV, yield its
+        rows with every cell decoded back to unicode.
+        """
+        for row in csv.reader(csv_file):
+            yield [item.decode('utf-8') for item in row]
+
+    @staticmethod
+    def _is_listable(filename):
+        """
+        Return whether `filename` is a complete report that should be offered
+        for download, as opposed to a partial file still being assembled.
+        """
+        return not filename.endswith(PARTIAL_REPORT_SUFFIX)
+
+
+class S3MultipartUpload(object):
+    """
+    A write-only file-like object that uploads what is written to it to an S3
+    `key` in parts of `PART_SIZE` bytes.
+
+    The multipart upload is only started once a whole part has been written,
+    so that small files can be uploaded with a single request instead: if
+    `is_multipart` is False once everything has been written, the data is
+    still in `buffer`, and it's up to the caller to store it.
+    """
+    # S3 rejects parts (other than the last one) smaller than 5MB.
+    PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, bucket, key, content_type='text/csv', content_encoding='gzip'):
+        self.bucket = bucket
+        self.key = key
+        self.headers = {
+            "Content-Encoding": content_encoding,
+            "Content-Type": content_type,
+        }
+        self.buffer = StringIO()
+        self._multipart_upload = None
+        self._part_count = 0
+
+    @property
+    def is_multipart(self):
+        """Whether any part of the data has been uploaded."""
+        return self._multipart_upload is not None
+
+    def write(self, data):
+        """Buffer `data`, uploading the buffer once it's a whole part."""
+        self.buffer.write(data)
+        if self.buffer.tell() >= self.PART_SIZE:
+            self._upload_part()
+
+    def flush(self):
+        """Parts are uploaded as soon as they're complete; nothing to do."""
+        pass
+
+    def complete(self):
+        """Upload the remaining data, and complete the multipart upload."""
+        if self.buffer.tell():
+            self._upload_part()
+        self._multipart_upload.complete_upload()
+
+    def cancel(self):
+        """Abort the multipart upload, if any, discarding the uploaded parts."""
+        if self.is_multipart:
+            self._multipart_upload.cancel_upload()
+
+    def _upload_part(self):
+        """Upload the buffered data as the next part."""
+        if self._multipart_upload is None:
+            self._multipart_upload = self.bucket.initiate_multipart_upload(self.key.key, headers=self.headers)
+        self._part_count += 1
+        self.buffer.seek(0)
+        self._multipart_upload.upload_part_from_file(self.buffer, self._part_count)
+        self.buffer = StringIO()
+
 
 class S3ReportStore(ReportStore):
     """
@@ -312,20 +398,45 @@ class S3ReportStore(ReportStore):
 
     def store_rows(self, course_id, filename, rows):
         """
-        Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        Given a `course_id`, `filename`, and `rows` (an iterable of rows, each
+        of which is an iterable of strings), write the rows out as a gzip'd
+        csv file.
+
+        The rows are compressed as they are consumed, and uploaded in parts
+        of `S3MultipartUpload.PART_SIZE` bytes, so only about one part is
+        held in memory at a time. S3 doesn't show a multipart upload until it
+        is completed, so the report is published atomically. Reports smaller
+        than a single part are simply `store()`d.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
-
-        self.store(course_id, filename, output_buffer)
+        upload = S3MultipartUpload(self.bucket, self.key_for(course_id, filename))
+        try:
+            gzip_file = GzipFile(fileobj=upload, mode="wb")
+            csvwriter = csv.writer(gzip_file)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            gzip_file.close()
+
+            if upload.is_multipart:
+                upload.complete()
+            else:
+                self.store(course_id, filename, upload.buffer)
+        except Exception:
+            upload.cancel()
+            raise
+
+    def read_rows(self, course_id, filename):
+        """
+        Return the rows previously stored by `store_rows()` for `course_id`
+        and `filename` as a list of lists of unicode strings, or None if there
+        is no such file.
+        """
+        key = self.bucket.get_key(self.key_for(course_id, filename).key)
+        if key is None:
+            return None
+        gzip_file = GzipFile(fileobj=StringIO(key.get_contents_as_string()), mode="rb")
+        return list(self._get_unicode_decoded_rows(gzip_file))
 
     def delete_file(self, course_id, filename):
         """
@@ -343,6 +454,7 @@ class S3ReportStore(ReportStore):
         return [
             (key.key.split("/")[-1], key.generate_url(expires_in=300))
             for key in sorted(self.bucket.list(prefix=course_dir.key), reverse=True, key=lambda k: k.last_modified)
+            if self._is_listable(key.key)
         ]
 
 
@@ -391,23 +503,54 @@ class LocalFSReportStore(ReportStore):
         to string using `.getvalue()`).
         """
         full_path = self.path_to(course_id, filename)
-        directory = os.path.dirname(full_path)
-        if not os.path.exists(directory):
-            os.mkdir(directory)
+        self._ensure_directory(full_path)
 
         with open(full_path, "wb") as f:
             f.write(buff.getvalue())
 
     def store_rows(self, course_id, filename, rows):
         """
-        Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        Given a course_id, filename, and rows (an iterable of rows, each of
+        which is an iterable of strings), write this data out.
+
+        Rows are written to a partial file as they are consumed, which is then
+        renamed to `filename`, so the report is never listed half written.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        full_path = self.path_to(course_id, filename)
+        self._ensure_directory(full_path)
+
+        handle, partial_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=PARTIAL_REPORT_SUFFIX)
+        try:
+            # mkstemp makes the file private to its owner; give it the mode open() would have.
+            umask = os.umask(0)
+            os.umask(umask)
+            os.fchmod(handle, 0o666 & ~umask)
+            with os.fdopen(handle, "wb") as partial_file:
+                csvwriter = csv.writer(partial_file)
+                csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            os.rename(partial_path, full_path)
+        except Exception:
+            os.remove(partial_path)
+            raise
 
-        self.store(course_id, filename, output_buffer)
+    @staticmethod
+    def _ensure_directory(full_path):
+        """Create the course directory that `full_path` is in, if needed."""
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
+    def read_rows(self, course_id, filename):
+        """
+        Return the rows previously stored by `store_rows()` for `course_id`
+        and `filename` as a list of lists of unicode strings, or None if there
+        is no such file.
+        """
+        full_path = self.path_to(course_id, filename)
+        if not os.path.exists(full_path):
+            return None
+        with open(full_path, "rb") as csv_file:
+            return list(self._get_unicode_decoded_rows(csv_file))
 
     def delete_file(self, course_id, filename):
         """
@@ -427,7 +570,11 @@ class LocalFSReportStore(ReportStore):
         course_dir = self.path_to(course_id, '')
         if not os.path.exists(course_dir):
             return []
-        files = [(filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)]
+        files = [
+            (filename, os.path.join(course_dir, filename))
+            for filename in os.listdir(course_dir)
+            if self._is_listable(filename)
+        ]
         files.sort(key=lambda (filename, full_path): os.path.getmtime(full_path), reverse=True)
 
         return [
@@ -38,6 +38,7 @@ from instructor_task.tasks_helper import (
     push_ora2_responses_to_s3,
     push_course_forums_data_to_s3,
     upload_grades_csv,
+    upload_grades_csv_shard,
     upload_problem_grade_report,
     upload_students_csv,
     push_student_forums_data_to_s3,
@@ -165,6 +166,17 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_shard(entry_id, xmodule_instance_args, shard_input, subtask_status_dict):
+    """
+    Grade one range of students of a sharded grade report.
+
+    These subtasks are queued by `calculate_grades_csv` for large courses;
+    see `upload_grades_csv_shard` for the meaning of the arguments.
+    """
+    return upload_grades_csv_shard(xmodule_instance_args, entry_id, shard_input, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
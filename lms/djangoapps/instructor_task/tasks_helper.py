@@ -8,8 +8,9 @@ from collections import OrderedDict
 from datetime import datetime
 from django.conf import settings
 from eventtracking import tracker
-from itertools import chain
+from itertools import chain, count, islice
 from time import time
+import traceback
 import unicodecsv
 import logging
 import urllib
@@ -17,6 +18,7 @@ import urllib
 from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
 from django.db.models import Q
@@ -50,7 +52,14 @@ from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import student_response_rows
 from instructor_analytics.basic import enrolled_students_features, list_may_enroll, get_proctored_exam_results
 from instructor_analytics.csvs import format_dictlist
-from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.models import ReportStore, InstructorTask, PROGRESS, PARTIAL_REPORT_SUFFIX
+from instructor_task.subtasks import (
+    SUBTASK_LOCK_EXPIRE,
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -75,6 +84,10 @@ UPDATE_STATUS_SKIPPED = 'skipped'
 # The setting name used for events when "settings" (account settings, preferences, profile information) change.
 REPORT_REQUESTED_EVENT_NAME = u'edx.instructor.report.requested'
 
+# Format of the parent task's timestamp passed to grade report shards.  It
+# matches the timestamp used in report filenames by upload_csv_to_report_store.
+GRADE_REPORT_SHARD_TIMESTAMP_FORMAT = "%Y-%m-%d-%H%M"
+
 
 class BaseInstructorTask(Task):
     """
@@ -617,6 +630,8 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
+            This may also be a generator, in which case rows are written out
+            as they are generated.
         csv_name: Name of the resulting CSV
         course_id: ID of the course
     """
@@ -663,14 +678,20 @@ def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at
     tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": report_name})
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):  # pylint: disable=too-many-statements
+def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
+    `ReportStore.from_config()`) and calling `link_for()` on it. Rows are
+    streamed to the `ReportStore` as students are graded, but it only
+    publishes complete files -- i.e. any files that are visible in
+    ReportStore will be complete ones.
+
+    If `settings.GRADES_DOWNLOAD_STUDENTS_PER_SHARD` is set and the course has
+    more enrolled students than that, the enrollment is split into student id
+    ranges which are graded by `calculate_grades_csv_shard` subtasks instead;
+    see `upload_grades_csv_shard`.
 
     As we start to add more CSV downloads, it will probably be worthwhile to
     make a more general CSVDoc class instead of building out the rows like we
@@ -678,9 +699,21 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     """
     start_time = time()
     start_date = datetime.now(UTC)
-    status_interval = 100
     enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
-    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
+    total_enrolled_students = enrolled_students.count()
+
+    students_per_shard = settings.GRADES_DOWNLOAD_STUDENTS_PER_SHARD
+    if _entry_id is not None and students_per_shard and total_enrolled_students > students_per_shard:
+        return _queue_grade_report_shards(
+            _xmodule_instance_args,
+            _entry_id,
+            action_name,
+            enrolled_students,
+            total_enrolled_students,
+            start_date,
+        )
+
+    task_progress = TaskProgress(action_name, total_enrolled_students, start_time)
 
     fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
     task_info_string = fmt.format(
@@ -691,6 +724,42 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
+    # Students are graded as their rows are uploaded
+    err_rows = [["id", "username", "error_msg"]]
+    rows = _grade_report_rows(
+        course_id, enrolled_students, total_enrolled_students, task_progress, task_info_string, err_rows
+    )
+    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+
+    current_step = {'step': 'Uploading CSVs'}
+    task_progress.update_task_state(extra_meta=current_step)
+    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
+
+    # If there are any error rows (don't count the header), write them out as well
+    if len(err_rows) > 1:
+        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+
+    # One last update before we close out...
+    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
+def _grade_report_rows(  # pylint: disable=too-many-statements
+        course_id, students, total_students, task_progress, task_info_string, err_rows
+):
+    """
+    Grade `students` in the course identified by `course_id`, recording
+    progress on `task_progress`.
+
+    Generates the rows of the grade report, starting with the header row as
+    soon as the first student could be graded, so that only one student's
+    row is in memory at a time. The rows of the students that could not be
+    graded are appended to the `err_rows` list instead, which is only
+    complete once all rows have been generated.
+    """
+    action_name = task_progress.action_name
+    status_interval = 100
+
     course = get_course_by_id(course_id)
     course_is_cohorted = is_course_cohorted(course.id)
     cohorts_header = ['Cohort Name'] if course_is_cohorted else []
@@ -702,22 +771,18 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course_id, whitelist=True)
     whitelisted_user_ids = [entry.user_id for entry in certificate_whitelist]
 
-    # Loop over all our students and build our CSV lists in memory
     header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
 
-    total_enrolled_students = enrolled_students.count()
     student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
         task_info_string,
         action_name,
         current_step,
-        total_enrolled_students
+        total_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -732,7 +797,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             action_name,
             current_step,
             student_counter,
-            total_enrolled_students
+            total_students
         )
 
         if gradeset:
@@ -740,7 +805,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.succeeded += 1
             if not header:
                 header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
+                yield (
                     ["id", "email", "username", "grade"] + header + cohorts_header +
                     group_configs_header + ['Enrollment Track', 'Verification Status'] + certificate_info_header
                 )
@@ -781,7 +846,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
+            yield (
                 [student.id, student.email, student.username, gradeset['percent']] +
                 row_percents + cohorts_group_name + group_configs_group_names +
                 [enrollment_mode] + [verification_status] + certificate_info
@@ -797,24 +862,233 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         action_name,
         current_step,
         student_counter,
-        total_enrolled_students
+        total_students
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
-    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+def _rows_if_any(rows, min_rows=1):
+    """
+    Return an iterator over the iterable `rows`, or None if it has fewer than
+    `min_rows` rows. Only the first `min_rows` rows are consumed to find out.
+    """
+    rows = iter(rows)
+    first_rows = list(islice(rows, min_rows))
+    if len(first_rows) < min_rows:
+        return None
+    return chain(first_rows, rows)
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
 
-    # One last update before we close out...
-    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
-    return task_progress.update_task_state(extra_meta=current_step)
+def _grade_report_shard_filename(csv_name, course_id, timestamp_str, shard_index):
+    """
+    Return the name of the partial file in which a grade report shard stores
+    its `csv_name` rows.  The name ends with `PARTIAL_REPORT_SUFFIX` so that
+    `ReportStore.links_for()` never offers it for download.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}_shard{shard_index:05d}.csv{suffix}".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp_str,
+        shard_index=shard_index,
+        suffix=PARTIAL_REPORT_SUFFIX,
+    )
+
+
+def _queue_grade_report_shards(
+        xmodule_instance_args, entry_id, action_name, enrolled_students, total_num_students, start_date
+):
+    """
+    Split `enrolled_students` into contiguous student id ranges of at most
+    `settings.GRADES_DOWNLOAD_STUDENTS_PER_SHARD` students, and queue a
+    `calculate_grades_csv_shard` subtask for each range.
+
+    Progress of the shards is accumulated in the InstructorTask entry, so the
+    instructor dashboard keeps showing a single task.  Returns the task
+    progress as stored in the InstructorTask object.
+    """
+    # Imported here to avoid a circular import, since the tasks module imports this one.
+    from instructor_task.tasks import calculate_grades_csv_shard
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    # As for bulk email, the parent task may be requeued after its subtasks
+    # were defined; don't queue a second set of shards in that case.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued its grade report shards", entry.task_id)
+        return json.loads(entry.task_output)
+
+    shard_input = {
+        'action_name': action_name,
+        'timestamp': start_date.strftime(GRADE_REPORT_SHARD_TIMESTAMP_FORMAT),
+    }
+    shard_indexes = count()
+
+    def _create_grade_report_shard_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade the id range spanned by `student_list`."""
+        student_ids = [student['pk'] for student in student_list]
+        subtask_input = dict(
+            shard_input,
+            shard_index=next(shard_indexes),
+            first_student_id=min(student_ids),
+            last_student_id=max(student_ids),
+        )
+        return calculate_grades_csv_shard.subtask(
+            (
+                entry_id,
+                xmodule_instance_args,
+                subtask_input,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_grade_report_shard_subtask,
+        [enrolled_students.order_by('id')],
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_SHARD,
+        total_num_students,
+    )
+
+
+def upload_grades_csv_shard(_xmodule_instance_args, entry_id, shard_input, subtask_status_dict):
+    """
+    Grade the enrolled students of the course of InstructorTask `entry_id`
+    whose ids fall in the range described by `shard_input`, and store the resulting rows as partial files
+    in the `ReportStore`.
+
+    `shard_input` is a dict with the keys 'action_name', 'timestamp' (of the
+    parent task), 'shard_index', 'first_student_id' and 'last_student_id'.
+    The shard's counts are accumulated into the parent InstructorTask, and the
+    shard that completes last merges all partial files into the final grade
+    report (and error report, if any student could not be graded).
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    course_id = InstructorTask.objects.get(pk=entry_id).course_id
+    students = CourseEnrollment.objects.users_enrolled_in(course_id).filter(
+        id__gte=shard_input['first_student_id'],
+        id__lte=shard_input['last_student_id'],
+    )
+    total_students = students.count()
+    task_progress = TaskProgress(shard_input['action_name'], total_students, time())
+
+    fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Shard: {shard_index}'
+    task_info_string = fmt.format(
+        task_id=current_task_id,
+        entry_id=entry_id,
+        course_id=course_id,
+        shard_index=shard_input['shard_index'],
+    )
+    TASK_LOG.info(
+        u'%s, Task type: %s, Starting grade report shard for student ids %s-%s',
+        task_info_string,
+        task_progress.action_name,
+        shard_input['first_student_id'],
+        shard_input['last_student_id'],
+    )
+
+    try:
+        err_rows = [["id", "username", "error_msg"]]
+        rows = _grade_report_rows(course_id, students, total_students, task_progress, task_info_string, err_rows)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        # The error rows are only all known once the grade rows are consumed.
+        for csv_name, shard_rows in (('grade_report', rows), ('grade_report_err', err_rows)):
+            # Don't bother storing a part that only contains its header.
+            shard_rows = _rows_if_any(shard_rows, min_rows=2)
+            if shard_rows is not None:
+                report_store.store_rows(
+                    course_id,
+                    _grade_report_shard_filename(
+                        csv_name, course_id, shard_input['timestamp'], shard_input['shard_index']
+                    ),
+                    shard_rows,
+                )
+    except Exception:
+        # Since we don't know how far the shard got, count all of its students as failed.
+        TASK_LOG.exception(u'%s, Grade report shard failed unexpectedly', task_info_string)
+        subtask_status.increment(failed=total_students, state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+        _merge_grade_report_shards(entry_id, course_id, shard_input['timestamp'])
+        raise
+
+    subtask_status.increment(succeeded=task_progress.succeeded, failed=task_progress.failed, state=SUCCESS)
+    # The parent task is only marked as completed once the report is merged.
+    update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+    _merge_grade_report_shards(entry_id, course_id, shard_input['timestamp'])
+    return subtask_status.to_dict()
+
+
+def _merge_grade_report_shards(entry_id, course_id, timestamp_str):
+    """
+    If every shard of the grade report task `entry_id` has completed, merge
+    their partial files into the final grade report and error report, and
+    delete the partial files.
+
+    Only the shard that takes the merge lock does the work, so the merge
+    happens exactly once even if the last shards finish at the same time.
+    That shard then marks the task as succeeded, or as failed if the merge
+    fails.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    if subtask_dict['succeeded'] + subtask_dict['failed'] < subtask_dict['total']:
+        return
+    if not cache.add(u'grade-report-merge-{}'.format(entry_id), 'true', SUBTASK_LOCK_EXPIRE):
+        return
+
+    if subtask_dict['failed']:
+        TASK_LOG.warning(
+            u'InstructorTask ID: %s, %s of %s grade report shards failed; merging the remaining ones',
+            entry_id,
+            subtask_dict['failed'],
+            subtask_dict['total'],
+        )
+
+    try:
+        start_date = datetime.strptime(timestamp_str, GRADE_REPORT_SHARD_TIMESTAMP_FORMAT).replace(tzinfo=UTC)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for csv_name in ('grade_report', 'grade_report_err'):
+            rows = _merged_grade_report_shard_rows(
+                report_store, course_id, csv_name, timestamp_str, subtask_dict['total']
+            )
+            if csv_name == 'grade_report_err':
+                # Unlike the grade report, the error report is only uploaded if any student failed.
+                rows = _rows_if_any(rows)
+            if rows is not None:
+                upload_csv_to_report_store(rows, csv_name, course_id, start_date)
+    except Exception as exc:
+        TASK_LOG.exception(u'InstructorTask ID: %s, Failed to merge grade report shards', entry_id)
+        entry.task_output = InstructorTask.create_output_for_failure(exc, traceback.format_exc())
+        entry.task_state = FAILURE
+        entry.save_now()
+        raise
+
+    entry.task_state = SUCCESS
+    entry.save_now()
+    TASK_LOG.info(u'InstructorTask ID: %s, Merged %s grade report shards', entry_id, subtask_dict['total'])
+
+
+def _merged_grade_report_shard_rows(report_store, course_id, csv_name, timestamp_str, num_shards):
+    """
+    Generate the rows of the `csv_name` partial files of all `num_shards`
+    shards, reading one partial file at a time and deleting it once its rows
+    have been generated.
+    """
+    has_header = False
+    for shard_index in range(num_shards):
+        filename = _grade_report_shard_filename(csv_name, course_id, timestamp_str, shard_index)
+        shard_rows = report_store.read_rows(course_id, filename)
+        if shard_rows is None:
+            continue
+        # Every part starts with its own copy of the header row.
+        for row in (shard_rows[1:] if has_header else shard_rows):
+            yield row
+        has_header = has_header or bool(shard_rows)
+        report_store.delete_file(course_id, filename)
 
 
 def push_student_responses_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
@@ -1014,47 +1288,55 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
             extra_meta={'step': 'Generating course structure. Please refresh and try again.'}
         )
 
-    # Just generate the static fields for now.
-    rows = [list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))]
     error_rows = [list(header_row.values()) + ['error_msg']]
     current_step = {'step': 'Calculating Grades'}
 
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students, keep_raw_scores=True):
-        student_fields = [getattr(student, field_name) for field_name in header_row]
-        task_progress.attempted += 1
+    def problem_grade_rows():
+        """
+        Generate the header row and then the row of each student who could be
+        graded, appending the students who couldn't to `error_rows`.
+        """
+        # Just generate the static fields for now.
+        yield list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))
 
-        if 'percent' not in gradeset or 'raw_scores' not in gradeset:
-            # There was an error grading this student.
-            # Generally there will be a non-empty err_msg, but that is not always the case.
-            if not err_msg:
-                err_msg = u"Unknown error"
-            error_rows.append(student_fields + [err_msg])
-            task_progress.failed += 1
-            continue
+        for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students, keep_raw_scores=True):
+            student_fields = [getattr(student, field_name) for field_name in header_row]
+            task_progress.attempted += 1
 
-        final_grade = gradeset['percent']
-        # Only consider graded problems
-        problem_scores = {unicode(score.module_id): score for score in gradeset['raw_scores'] if score.graded}
-        earned_possible_values = list()
-        for problem_id in problems:
-            try:
-                problem_score = problem_scores[problem_id]
-                earned_possible_values.append([problem_score.earned, problem_score.possible])
-            except KeyError:
-                # The student has not been graded on this problem.  For example,
-                # iterate_grades_for skips problems that students have never
-                # seen in order to speed up report generation.  It could also be
-                # the case that the student does not have access to it (e.g. A/B
-                # test or cohorted courseware).
-                earned_possible_values.append(['N/A', 'N/A'])
-        rows.append(student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values)))
-
-        task_progress.succeeded += 1
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
+            if 'percent' not in gradeset or 'raw_scores' not in gradeset:
+                # There was an error grading this student.
+                # Generally there will be a non-empty err_msg, but that is not always the case.
+                if not err_msg:
+                    err_msg = u"Unknown error"
+                error_rows.append(student_fields + [err_msg])
+                task_progress.failed += 1
+                continue
 
-    # Perform the upload if any students have been successfully graded
-    if len(rows) > 1:
+            final_grade = gradeset['percent']
+            # Only consider graded problems
+            problem_scores = {unicode(score.module_id): score for score in gradeset['raw_scores'] if score.graded}
+            earned_possible_values = list()
+            for problem_id in problems:
+                try:
+                    problem_score = problem_scores[problem_id]
+                    earned_possible_values.append([problem_score.earned, problem_score.possible])
+                except KeyError:
+                    # The student has not been graded on this problem.  For example,
+                    # iterate_grades_for skips problems that students have never
+                    # seen in order to speed up report generation.  It could also be
+                    # the case that the student does not have access to it (e.g. A/B
+                    # test or cohorted courseware).
+                    earned_possible_values.append(['N/A', 'N/A'])
+            yield student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values))
+
+            task_progress.succeeded += 1
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+
+    # Perform the upload if any students have been successfully graded. Either
+    # way, all students have been graded once this returns.
+    rows = _rows_if_any(problem_grade_rows(), min_rows=2)
+    if rows is not None:
         upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
     # If there are any error rows, write them out as well
     if len(error_rows) > 1:
@@ -1117,13 +1399,9 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    # Loop over all our students and build our CSV lists in memory
-    rows = []
-    header = None
     current_step = {'step': 'Gathering Profile Information'}
     enrollment_report_provider = PaidCourseEnrollmentReportProvider()
     total_students = students_in_course.count()
-    student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, generating detailed enrollment report for total students: %s',
         task_info_string,
@@ -1132,85 +1410,94 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
         total_students
     )
 
-    for student in students_in_course:
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
+    def enrollment_report_rows():
+        """
+        Generate the header row and then the row of each student, gathering
+        their profile as the row is needed.
+        """
+        header = None
+        student_counter = 0
+        for student in students_in_course:
+            # Periodically update task status (this is a cache write)
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
 
-        # Now add a log entry after certain intervals to get a hint that task is in progress
-        student_counter += 1
-        if student_counter % 100 == 0:
-            TASK_LOG.info(
-                u'%s, Task type: %s, Current step: %s, gathering enrollment profile for students in progress: %s/%s',
-                task_info_string,
-                action_name,
-                current_step,
-                student_counter,
-                total_students
-            )
+            # Now add a log entry after certain intervals to get a hint that task is in progress
+            student_counter += 1
+            if student_counter % 100 == 0:
+                TASK_LOG.info(
+                    u'%s, Task type: %s, Current step: %s, '
+                    u'gathering enrollment profile for students in progress: %s/%s',
+                    task_info_string,
+                    action_name,
+                    current_step,
+                    student_counter,
+                    total_students
+                )
 
-        user_data = enrollment_report_provider.get_user_profile(student.id)
-        course_enrollment_data = enrollment_report_provider.get_enrollment_info(student, course_id)
-        payment_data = enrollment_report_provider.get_payment_info(student, course_id)
-
-        # display name map for the column headers
-        enrollment_report_headers = {
-            'User ID': _('User ID'),
-            'Username': _('Username'),
-            'Full Name': _('Full Name'),
-            'First Name': _('First Name'),
-            'Last Name': _('Last Name'),
-            'Company Name': _('Company Name'),
-            'Title': _('Title'),
-            'Language': _('Language'),
-            'Year of Birth': _('Year of Birth'),
-            'Gender': _('Gender'),
-            'Level of Education': _('Level of Education'),
-            'Mailing Address': _('Mailing Address'),
-            'Goals': _('Goals'),
-            'City': _('City'),
-            'Country': _('Country'),
-            'Enrollment Date': _('Enrollment Date'),
-            'Currently Enrolled': _('Currently Enrolled'),
-            'Enrollment Source': _('Enrollment Source'),
-            'Enrollment Role': _('Enrollment Role'),
-            'List Price': _('List Price'),
-            'Payment Amount': _('Payment Amount'),
-            'Coupon Codes Used': _('Coupon Codes Used'),
-            'Registration Code Used': _('Registration Code Used'),
-            'Payment Status': _('Payment Status'),
-            'Transaction Reference Number': _('Transaction Reference Number')
-        }
+            user_data = enrollment_report_provider.get_user_profile(student.id)
+            course_enrollment_data = enrollment_report_provider.get_enrollment_info(student, course_id)
+            payment_data = enrollment_report_provider.get_payment_info(student, course_id)
+
+            # display name map for the column headers
+            enrollment_report_headers = {
+                'User ID': _('User ID'),
+                'Username': _('Username'),
+                'Full Name': _('Full Name'),
+                'First Name': _('First Name'),
+                'Last Name': _('Last Name'),
+                'Company Name': _('Company Name'),
+                'Title': _('Title'),
+                'Language': _('Language'),
+                'Year of Birth': _('Year of Birth'),
+                'Gender': _('Gender'),
+                'Level of Education': _('Level of Education'),
+                'Mailing Address': _('Mailing Address'),
+                'Goals': _('Goals'),
+                'City': _('City'),
+                'Country': _('Country'),
+                'Enrollment Date': _('Enrollment Date'),
+                'Currently Enrolled': _('Currently Enrolled'),
+                'Enrollment Source': _('Enrollment Source'),
+                'Enrollment Role': _('Enrollment Role'),
+                'List Price': _('List Price'),
+                'Payment Amount': _('Payment Amount'),
+                'Coupon Codes Used': _('Coupon Codes Used'),
+                'Registration Code Used': _('Registration Code Used'),
+                'Payment Status': _('Payment Status'),
+                'Transaction Reference Number': _('Transaction Reference Number')
+            }
 
-        if not header:
-            header = user_data.keys() + course_enrollment_data.keys() + payment_data.keys()
-            display_headers = []
-            for header_element in header:
-                # translate header into a localizable display string
-                display_headers.append(enrollment_report_headers.get(header_element, header_element))
-            rows.append(display_headers)
+            if not header:
+                header = user_data.keys() + course_enrollment_data.keys() + payment_data.keys()
+                display_headers = []
+                for header_element in header:
+                    # translate header into a localizable display string
+                    display_headers.append(enrollment_report_headers.get(header_element, header_element))
+                yield display_headers
+
+            yield user_data.values() + course_enrollment_data.values() + payment_data.values()
+            task_progress.succeeded += 1
 
-        rows.append(user_data.values() + course_enrollment_data.values() + payment_data.values())
-        task_progress.succeeded += 1
+        TASK_LOG.info(
+            u'%s, Task type: %s, Current step: %s, Detailed enrollment report generated for students: %s/%s',
+            task_info_string,
+            action_name,
+            current_step,
+            student_counter,
+            total_students
+        )
 
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Detailed enrollment report generated for students: %s/%s',
-        task_info_string,
-        action_name,
-        current_step,
-        student_counter,
-        total_students
+    # The profiles are gathered as their rows are uploaded
+    upload_csv_to_report_store(
+        enrollment_report_rows(), 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS'
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS')
-
     # One last update before we close out...
     TASK_LOG.info(u'%s, Task type: %s, Finalizing detailed enrollment task', task_info_string, action_name)
     return task_progress.update_task_state(extra_meta=current_step)
@@ -3,8 +3,12 @@ Tests for instructor_task/models.py.
 """
 
 from cStringIO import StringIO
+import csv
+from gzip import GzipFile
 import mock
+import os
 import time
+from uuid import uuid4
 from datetime import datetime
 from unittest import TestCase
 
@@ -93,6 +97,49 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
+    def test_store_rows_from_generator(self):
+        report_store = self.create_report_store()
+        rows = ([unicode(index), u'caf\xe9'] for index in xrange(3))
+        report_store.store_rows(self.course_id, 'report.csv', rows)
+
+        self.assertEqual(
+            report_store.read_rows(self.course_id, 'report.csv'),
+            [[u'0', u'caf\xe9'], [u'1', u'caf\xe9'], [u'2', u'caf\xe9']]
+        )
+        self.assertEqual(os.listdir(report_store.path_to(self.course_id, '')), ['report.csv'])
+
+    def test_store_rows_file_mode(self):
+        """
+        Test that stored reports get the umask's default file mode, like
+        those written by `store()`.
+        """
+        report_store = self.create_report_store()
+        old_umask = os.umask(0o027)
+        try:
+            report_store.store_rows(self.course_id, 'report.csv', [[u'header']])
+            report_store.store(self.course_id, 'other.csv', StringIO('header\r\n'))
+        finally:
+            os.umask(old_umask)
+
+        for filename in ('report.csv', 'other.csv'):
+            mode = os.stat(report_store.path_to(self.course_id, filename)).st_mode
+            self.assertEqual(mode & 0o777, 0o640)
+
+    def test_store_rows_failure(self):
+        """
+        Test that a report whose rows can't all be generated isn't stored.
+        """
+        def failing_rows():
+            """Generates a row, and then fails."""
+            yield [u'header']
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+
+        self.assertEqual(os.listdir(report_store.path_to(self.course_id, '')), [])
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +152,47 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+
+    @mock.patch('instructor_task.models.S3MultipartUpload.PART_SIZE', new=100)
+    def test_store_rows_multipart(self):
+        """
+        Test that large reports are uploaded in parts.
+        """
+        report_store = self.create_report_store()
+        report_store.bucket = mock.Mock()
+        multipart_upload = report_store.bucket.initiate_multipart_upload.return_value
+        parts = []
+        multipart_upload.upload_part_from_file.side_effect = lambda part, part_num: parts.append(part.getvalue())
+
+        rows = [[unicode(index), uuid4().hex] for index in xrange(1000)]
+        report_store.store_rows(self.course_id, 'report.csv', iter(rows))
+
+        self.assertGreater(len(parts), 1)
+        self.assertEqual(
+            [call[0][1] for call in multipart_upload.upload_part_from_file.call_args_list],
+            range(1, len(parts) + 1)
+        )
+        multipart_upload.complete_upload.assert_called_once_with()
+        gzip_file = GzipFile(fileobj=StringIO(''.join(parts)), mode='rb')
+        self.assertEqual(list(csv.reader(gzip_file)), rows)
+
+    @mock.patch('instructor_task.models.S3MultipartUpload.PART_SIZE', new=100)
+    def test_store_rows_multipart_failure(self):
+        """
+        Test that the upload of a report whose rows can't all be generated is
+        cancelled.
+        """
+        def failing_rows():
+            """Generates rows, and then fails."""
+            for index in xrange(10000):
+                yield [unicode(index), uuid4().hex]
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        report_store.bucket = mock.Mock()
+        multipart_upload = report_store.bucket.initiate_multipart_upload.return_value
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+
+        multipart_upload.cancel_upload.assert_called_once_with()
+        self.assertFalse(multipart_upload.complete_upload.called)
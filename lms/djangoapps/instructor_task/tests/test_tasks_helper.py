@@ -6,12 +6,15 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 Tests that CSV grade report generation works with unicode emails.
 
 """
+import json
 import os
 import shutil
 from datetime import datetime
 import urllib
+from uuid import uuid4
 
 import ddt
+from celery.states import SUCCESS, FAILURE
 from mock import Mock, patch
 import tempfile
 import unicodecsv
@@ -64,7 +67,8 @@ from student.models import CourseEnrollment, CourseEnrollmentAllowed, ManualEnro
 from verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
-from instructor_task.models import ReportStore
+from instructor_task.models import InstructorTask, ReportStore
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tasks_helper import (
     cohort_students_and_upload,
     upload_grades_csv,
@@ -296,6 +300,52 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
             ''
         )
 
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SHARD=2)
+    def test_sharded_grade_report(self):
+        """
+        Test that a grade report graded in shards is merged into a single
+        CSV, and that the shards' progress is accumulated in the task entry.
+        """
+        usernames = [u'student{}'.format(i) for i in range(5)]
+        for username in usernames:
+            self.create_student(username, u'{}@example.com'.format(username))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course', task_id=str(uuid4()))
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0, 'total': 5},
+            json.loads(entry.task_output)
+        )
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        rows = report_store.read_rows(self.course.id, links[0][0])
+        self.assertEqual(rows[0][:4], [u'id', u'email', u'username', u'grade'])
+        self.assertItemsEqual([row[2] for row in rows[1:]], usernames)
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SHARD=2)
+    def test_sharded_grade_report_merge_failure(self):
+        """
+        Test that a sharded grade report whose shards can't be merged is
+        marked as failed, rather than as succeeded by its last shard.
+        """
+        for i in range(3):
+            self.create_student(u'student{}'.format(i), u'student{}@example.com'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course', task_id=str(uuid4()))
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            with patch('instructor_task.tasks_helper.upload_csv_to_report_store', side_effect=IOError('disk full')):
+                upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertDictContainsSubset({'exception': 'IOError', 'message': 'disk full'}, json.loads(entry.task_output))
+
     @patch('instructor_task.tasks_helper._get_current_task')
     @patch('instructor_task.tasks_helper.iterate_grades_for')
     def test_unicode_in_csv_header(self, mock_iterate_grades_for, _mock_current_task):
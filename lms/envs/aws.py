@@ -300,6 +300,7 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
         CODE_JAIL[name] = value
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
+SAFE_EXEC_LOCAL_CACHE_SIZE = ENV_TOKENS.get('SAFE_EXEC_LOCAL_CACHE_SIZE', SAFE_EXEC_LOCAL_CACHE_SIZE)
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
 
@@ -448,6 +449,32 @@ XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
+
+COURSE_STRUCTURE_LOCAL_CACHE_ENABLED = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_ENABLED', COURSE_STRUCTURE_LOCAL_CACHE_ENABLED
+)
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES', COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES
+)
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES', COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES
+)
+COURSE_STRUCTURE_CACHE_CODEC = ENV_TOKENS.get('COURSE_STRUCTURE_CACHE_CODEC', COURSE_STRUCTURE_CACHE_CODEC)
+COURSE_STRUCTURE_CACHE_COMPRESSOR = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_CACHE_COMPRESSOR', COURSE_STRUCTURE_CACHE_COMPRESSOR
+)
+STATIC_CONTENT_MAX_AGE = ENV_TOKENS.get('STATIC_CONTENT_MAX_AGE', STATIC_CONTENT_MAX_AGE)
+STATIC_CONTENT_COURSE_MAX_AGE = ENV_TOKENS.get('STATIC_CONTENT_COURSE_MAX_AGE', STATIC_CONTENT_COURSE_MAX_AGE)
+STATIC_CONTENT_STREAM_CHUNK_SIZE = ENV_TOKENS.get('STATIC_CONTENT_STREAM_CHUNK_SIZE', STATIC_CONTENT_STREAM_CHUNK_SIZE)
+STATIC_CONTENT_CACHE_MAX_SIZE = ENV_TOKENS.get('STATIC_CONTENT_CACHE_MAX_SIZE', STATIC_CONTENT_CACHE_MAX_SIZE)
+STATIC_CONTENT_CACHE_CHUNK_SIZE = ENV_TOKENS.get('STATIC_CONTENT_CACHE_CHUNK_SIZE', STATIC_CONTENT_CACHE_CHUNK_SIZE)
+STATIC_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE_DIR', STATIC_CONTENT_DISK_CACHE_DIR)
+STATIC_CONTENT_DISK_CACHE_MAX_BYTES = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_MAX_BYTES', STATIC_CONTENT_DISK_CACHE_MAX_BYTES
+)
+STATIC_CONTENT_DISK_CACHE_MAX_ITEM_BYTES = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_MAX_ITEM_BYTES', STATIC_CONTENT_DISK_CACHE_MAX_ITEM_BYTES
+)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
 
 OPEN_ENDED_GRADING_INTERFACE = AUTH_TOKENS.get('OPEN_ENDED_GRADING_INTERFACE',
@@ -522,6 +549,10 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_STUDENTS_PER_SHARD = ENV_TOKENS.get(
+    "GRADES_DOWNLOAD_STUDENTS_PER_SHARD", GRADES_DOWNLOAD_STUDENTS_PER_SHARD
+)
+GRADES_PREFETCH_BATCHES = ENV_TOKENS.get("GRADES_PREFETCH_BATCHES", GRADES_PREFETCH_BATCHES)
 
 # Student Responses Download
 STUDENT_RESPONSES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
@@ -438,6 +438,20 @@ FEATURES = {
     # Enable the max score cache to speed up grading
     'ENABLE_MAX_SCORE_CACHE': True,
 
+    # Persist students' grade summaries between gradings until one of their
+    # scores or the course changes.
+    'ENABLE_PERSISTENT_GRADE_SUMMARIES': False,
+
+    # Compute the max scores of a course's problems once per published version
+    # of the course, instead of learning them while grading. Requires the max
+    # score cache to be enabled.
+    'ENABLE_PRECOMPUTED_MAX_SCORES': False,
+
+    # Build the courseware table of contents from a skeleton cached per
+    # published version of the course, instead of instantiating the course's
+    # chapters and sections on every page load.
+    'ENABLE_CACHED_COURSE_TOC': False,
+
     # Enable LTI Provider feature.
     'ENABLE_LTI_PROVIDER': False,
 }
@@ -742,6 +756,31 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 
 MODULESTORE_BRANCH = 'published-only'
 CONTENTSTORE = None
+
+# Cache-Control max-age, in seconds, of the course assets served by the
+# StaticContentServer, by content type (e.g. 'text/css'), major type (e.g.
+# 'image') or '*' for any type. STATIC_CONTENT_COURSE_MAX_AGE maps course ids to
+# policies like this, which take precedence for that course's assets. Assets
+# without a max-age get no Cache-Control header; locked assets are only cached
+# privately.
+STATIC_CONTENT_MAX_AGE = {}
+STATIC_CONTENT_COURSE_MAX_AGE = {}
+
+# Size of the chunks that assets are streamed from the contentstore in.
+STATIC_CONTENT_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Assets of up to STATIC_CONTENT_CACHE_MAX_SIZE bytes are cached by the
+# StaticContentServer. Assets of 1MB or more are cached in chunks of
+# STATIC_CONTENT_CACHE_CHUNK_SIZE bytes, which must fit in a cache entry.
+STATIC_CONTENT_CACHE_MAX_SIZE = 16 * 1024 * 1024
+STATIC_CONTENT_CACHE_CHUNK_SIZE = 512 * 1024
+
+# Directory of the node-local cache of assets on disk, in front of the
+# contentstore; None turns it off. The least recently used assets are evicted
+# to keep its size under STATIC_CONTENT_DISK_CACHE_MAX_BYTES.
+STATIC_CONTENT_DISK_CACHE_DIR = None
+STATIC_CONTENT_DISK_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+STATIC_CONTENT_DISK_CACHE_MAX_ITEM_BYTES = 64 * 1024 * 1024
 DOC_STORE_CONFIG = {
     'host': 'localhost',
     'db': 'xmodule',
@@ -789,6 +828,19 @@ MODULESTORE = {
     }
 }
 
+# Process-local cache of deserialized split modulestore course structures, in
+# front of the 'course_structure_cache' cache. Sizes are of the serialized structures.
+COURSE_STRUCTURE_LOCAL_CACHE_ENABLED = False
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_ITEM_BYTES = 64 * 1024 * 1024
+
+# How split modulestore course structures are serialized and compressed in the
+# 'course_structure_cache' cache: see xmodule.modulestore.split_mongo.structure_codecs.
+# Only the default pickle and zlib can be read by servers which predate the codecs,
+# so don't change these while any such server shares the cache.
+COURSE_STRUCTURE_CACHE_CODEC = 'pickle'
+COURSE_STRUCTURE_CACHE_COMPRESSOR = 'zlib'
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -802,8 +854,20 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # A pool of pre-warmed sandbox workers that execute code in forked
+    # children, so that each execution doesn't start a new sandboxed Python.
+    # A size of 0 turns it off. Workers are replaced after max_executions.
+    'pool': {
+        'size': 0,
+        'max_executions': 100,
+    },
 }
 
+# Number of results of executing the python code of problems kept in each
+# process, in front of the django cache they are cached in. 0 turns it off.
+SAFE_EXEC_LOCAL_CACHE_SIZE = 0
+
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
 # of them must match the course id for that course to run unsafe code.
 #
@@ -2219,6 +2283,17 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Courses with more enrolled students than this have their grade report split
+# into student id ranges of this size, each graded by a separate subtask on
+# the GRADES_DOWNLOAD_ROUTING_KEY queue.  Set to None to always grade in a
+# single task.
+GRADES_DOWNLOAD_STUDENTS_PER_SHARD = None
+
+# Number of batches of students whose StudentModules are loaded by a background
+# thread while the current batch is being graded.  Set to 0 to load each batch
+# just before grading it.
+GRADES_PREFETCH_BATCHES = 0
+
 #################### Student Responses Reports Downloads #################
 STUDENT_RESPONSES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
@@ -42,6 +42,13 @@ def run():
     if settings.FEATURES.get('ENABLE_THIRD_PARTY_AUTH', False):
         enable_third_party_auth()
 
+    if settings.CODE_JAIL.get('pool', {}).get('size'):
+        enable_codejail_pool()
+
+    if settings.SAFE_EXEC_LOCAL_CACHE_SIZE:
+        from capa.safe_exec.safe_exec import configure_local_cache
+        configure_local_cache(settings.SAFE_EXEC_LOCAL_CACHE_SIZE)
+
     # Initialize Segment.io analytics module. Flushes first time a message is received and
     # every 50 messages thereafter, or if 10 seconds have passed since last flush
     if settings.FEATURES.get('SEGMENT_IO_LMS') and hasattr(settings, 'SEGMENT_IO_LMS_KEY'):
@@ -153,3 +160,31 @@ def enable_third_party_auth():
 
     from third_party_auth import settings as auth_settings
     auth_settings.apply_settings(settings)
+
+
+def enable_codejail_pool():
+    """
+    Execute the python code of problems in a pool of pre-warmed sandbox
+    workers, as configured by CODE_JAIL['pool']. See
+    common/lib/capa/capa/safe_exec/jail_pool.py.
+
+    Codejail is configured here too, the way ConfigureCodeJailMiddleware does
+    it: processes that don't serve requests, like the celery workers that
+    rescore problems, would otherwise never use the pool.
+    """
+    from codejail import jail_code
+    from capa.safe_exec import jail_pool
+    from capa.safe_exec.safe_exec import ASSUMED_IMPORTS
+
+    python_bin = settings.CODE_JAIL.get('python_bin')
+    if python_bin:
+        jail_code.configure('python', python_bin, user=settings.CODE_JAIL['user'])
+    for name, value in settings.CODE_JAIL.get('limits', {}).items():
+        jail_code.set_limit(name, value)
+
+    pool_settings = settings.CODE_JAIL['pool']
+    jail_pool.configure_pool(
+        pool_settings['size'],
+        pool_settings.get('max_executions', jail_pool.DEFAULT_MAX_EXECUTIONS),
+        preimports=[module_name for __, module_name in ASSUMED_IMPORTS],
+    )
@@ -25,7 +25,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
 
         if options['all']:
-            course_keys = [course.id for course in modulestore().get_courses()]
+            course_keys = modulestore().get_courses_keys()
         else:
             course_keys = [CourseKey.from_string(arg) for arg in args]
 
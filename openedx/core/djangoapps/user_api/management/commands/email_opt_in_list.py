@@ -157,12 +157,12 @@ class Command(BaseCommand):
             List of `CourseKey`s
 
         """
-        all_courses = modulestore().get_courses()
+        all_course_keys = modulestore().get_courses_keys()
         orgs_lowercase = [org.lower() for org in org_aliases]
         return [
-            course.id
-            for course in all_courses
-            if course.id.org.lower() in orgs_lowercase
+            course_key
+            for course_key in all_course_keys
+            if course_key.org.lower() in orgs_lowercase
         ]
 
     @contextlib.contextmanager